@@ -172,13 +172,21 @@ class AgentMessagePrompt:
         else:
             step_info_description = ""
 
+        elements_text = self.state.element_tree.clickable_elements_to_string(
+            include_attributes=self.include_attributes
+        )
+        if self.state.elements_above:
+            elements_text = f"... {self.state.elements_above} more elements above - scroll up to reveal them ...\n{elements_text}"
+        if self.state.elements_below:
+            elements_text = f"{elements_text}\n... {self.state.elements_below} more elements below - scroll down to reveal them ..."
+
         state_description = f"""
 {step_info_description}
 Current url: {self.state.url}
 Available tabs:
 {self.state.tabs}
 Interactive elements:
-{self.state.element_tree.clickable_elements_to_string(include_attributes=self.include_attributes)}
+{elements_text}
         """
 
         if self.result:
@@ -200,7 +208,7 @@ Interactive elements:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{self.state.screenshot}"
+                            "url": f"data:{self.state.screenshot_mime_type};base64,{self.state.screenshot}"
                         },
                     },
                 ]
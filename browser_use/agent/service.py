@@ -171,6 +171,15 @@ class Agent:
             self.message_manager._remove_last_state_message()  # we dont want the whole state in the chat history
             self.message_manager.add_model_output(model_output)
 
+            # selectors are generated on demand, only for the elements recorded in the history
+            await self.browser_context.get_pyne_selectors(
+                [
+                    index
+                    for action in model_output.action
+                    if (index := action.get_index()) is not None
+                ]
+            )
+
             result: list[ActionResult] = await self.controller.multi_act(
                 model_output.action, self.browser_context
             )
@@ -249,6 +258,7 @@ class Agent:
             tabs=state.tabs,
             interacted_element=interacted_elements,
             screenshot=state.screenshot,
+            screenshot_mime_type=state.screenshot_mime_type,
         )
 
         history_item = AgentHistory(
@@ -531,8 +541,8 @@ class Agent:
         if not historical_element or not current_state.element_tree:
             return action
 
-        current_element = HistoryTreeProcessor.find_history_element_in_tree(
-            historical_element, current_state.element_tree
+        current_element = HistoryTreeProcessor.find_history_element_in_state(
+            historical_element, current_state
         )
 
         if not current_element or current_element.highlight_index is None:
@@ -0,0 +1,197 @@
+"""
+Aborts requests for unwanted resource types and for ad / analytics hosts with context.route,
+so they are neither downloaded nor rendered.
+"""
+
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import Route
+
+logger = logging.getLogger(__name__)
+
+# Hosts blocked with BrowserContextConfig.block_ads_and_trackers, subdomains included
+DEFAULT_BLOCKED_DOMAINS = (
+    # Ads
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "adservice.google.com",
+    "amazon-adsystem.com",
+    "adnxs.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+    "pubmatic.com",
+    "rubiconproject.com",
+    "moatads.com",
+    # Analytics and tracking
+    "google-analytics.com",
+    "googletagmanager.com",
+    "scorecardresearch.com",
+    "hotjar.com",
+    "mixpanel.com",
+    "segment.io",
+    "segment.com",
+    "fullstory.com",
+    "newrelic.com",
+    "nr-data.net",
+    "quantserve.com",
+    "clarity.ms",
+    "connect.facebook.net",
+    # Push notifications
+    "onesignal.com",
+    "pushwoosh.com",
+)
+
+# Adblock element hiding / scriptlet rules, they hide parts of a page and never block a host
+COSMETIC_RULE_MARKERS = ("##", "#@#", "#?#", "#$#")
+
+# Adblock rule options that only narrow down when a domain rule applies. Blocking every request to the
+# domain is what hosts lists do anyway, rules with other options (domain=, ~third-party, csp=, ...) are skipped
+DOMAIN_RULE_OPTIONS = frozenset(
+    (
+        "third-party",
+        "3p",
+        "important",
+        "all",
+        "script",
+        "image",
+        "stylesheet",
+        "css",
+        "font",
+        "media",
+        "object",
+        "subdocument",
+        "frame",
+        "xmlhttprequest",
+        "xhr",
+        "ping",
+        "beacon",
+        "websocket",
+        "other",
+    )
+)
+
+DOMAIN_REGEX = re.compile(r"^[a-z0-9_-]+(\.[a-z0-9_-]+)+$")
+
+
+class DomainBlocklist:
+    """
+    Set of blocked domains, a host matches if it or any of its parent domains is in the set.
+    A lookup costs one set membership test per label of the host, independent of the list size.
+    """
+
+    def __init__(self, domains: Iterable[str] = ()):
+        self.domains: set[str] = set()
+        self.update(domains)
+
+    def __len__(self) -> int:
+        return len(self.domains)
+
+    def update(self, domains: Iterable[str]):
+        for domain in domains:
+            domain = domain.strip().strip(".").lower()
+            if domain:
+                self.domains.add(domain)
+
+    def load(self, path: str):
+        """
+        Add the domains of a blocklist file: one domain per line, hosts file lines
+        ("0.0.0.0 ads.example.com") or adblock domain rules ("||ads.example.com^", also with
+        third-party and resource type options). Comments (# and !), exception (@@) and cosmetic
+        rules and all other rules are skipped.
+        """
+        count = len(self.domains)
+        with open(path, "r", encoding="utf-8") as f:
+            self.update(filter(None, (self._parse_line(line) for line in f)))
+        logger.debug(f"Loaded {len(self.domains) - count} blocked domains from {path}")
+
+    @staticmethod
+    def _parse_line(line: str) -> Optional[str]:
+        line = line.strip().lower()
+        if not line or line.startswith(("!", "#", "@@")) or any(m in line for m in COSMETIC_RULE_MARKERS):
+            return None
+
+        if line.startswith("||"):
+            rule, _, options = line[2:].partition("$")
+            if options and not all(option.strip() in DOMAIN_RULE_OPTIONS for option in options.split(",")):
+                return None
+            # rules with paths are not domain rules
+            domain, _, rest = rule.partition("^")
+            if rest.strip("|"):
+                return None
+        else:
+            # hosts file or plain domain, possibly with a trailing comment
+            parts = line.split("#", 1)[0].split()
+            if not parts:
+                return None
+            domain = parts[1] if len(parts) >= 2 else parts[0]
+            if domain in ("localhost", "0.0.0.0", "127.0.0.1"):
+                return None
+
+        return domain if DOMAIN_REGEX.match(domain) else None
+
+    def matches(self, host: str) -> bool:
+        host = host.lower()
+        while host:
+            if host in self.domains:
+                return True
+            _, _, host = host.partition(".")
+        return False
+
+
+@dataclass
+class BlockerStats:
+    """
+    Requests aborted during the run. Aborted responses are never downloaded, so the bytes they would
+    have cost are unknown and not counted, only request bodies that were not sent are.
+    """
+
+    requests: int = 0
+    # request bodies that were not sent (beacons, analytics payloads)
+    upload_bytes: int = 0
+    by_resource_type: Counter = field(default_factory=Counter)
+    by_host: Counter = field(default_factory=Counter)
+
+
+class ResourceBlocker:
+    """Route handler of a browser context, see BrowserContextConfig.block_resource_types"""
+
+    def __init__(
+        self,
+        resource_types: Iterable[str] = (),
+        blocklist: Optional[DomainBlocklist] = None,
+    ):
+        self.resource_types = frozenset(resource_types)
+        self.blocklist = blocklist or DomainBlocklist()
+        self.stats = BlockerStats()
+
+    @property
+    def enabled(self) -> bool:
+        # routing disables the browser cache, so it is only set up when something is blocked
+        return bool(self.resource_types or len(self.blocklist))
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if resource_type in self.resource_types:
+            return True
+        host = urlparse(url).hostname
+        return bool(host) and self.blocklist.matches(host)  # type: ignore
+
+    async def handle(self, route: Route):
+        request = route.request
+        # pages the agent navigates to are never blocked, only what they load
+        is_page = request.is_navigation_request() and request.frame.parent_frame is None
+        if is_page or not self.should_block(request.url, request.resource_type):
+            await route.continue_()
+            return
+
+        self.stats.requests += 1
+        self.stats.upload_bytes += len(request.post_data_buffer or b"")
+        self.stats.by_resource_type[request.resource_type] += 1
+        self.stats.by_host[urlparse(request.url).hostname or ""] += 1
+        await route.abort("blockedbyclient")
@@ -11,7 +11,7 @@ import re
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Optional, TypedDict
+from typing import TYPE_CHECKING, Awaitable, Literal, Optional, TypedDict, TypeVar
 
 from playwright.async_api import Browser as PlaywrightBrowser
 from playwright.async_api import (
@@ -19,12 +19,28 @@ from playwright.async_api import (
 )
 from playwright.async_api import (
     ElementHandle,
+    Frame,
     FrameLocator,
     Page,
 )
 
+from browser_use.browser.blocker import (
+    DEFAULT_BLOCKED_DOMAINS,
+    BlockerStats,
+    DomainBlocklist,
+    ResourceBlocker,
+)
+from browser_use.browser.network import NetworkIdleTracker
+from browser_use.browser.timing import PageTiming, PageTimingModel
 from browser_use.browser.views import BrowserError, BrowserState, TabInfo
-from browser_use.dom.service import DomService
+from browser_use.dom.service import (
+    CHANGE_TOKEN_JS,
+    ELEMENT_BY_INDEX_JS,
+    DomBackend,
+    DomService,
+    DomWireFormat,
+    get_build_dom_tree_script,
+)
 from browser_use.dom.views import DOMElementNode, SelectorMap
 from browser_use.utils import time_execution_sync
 
@@ -33,6 +49,19 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+ScreenshotFormat = Literal["png", "jpeg", "webp"]
+
+
+async def _timed(timings: dict[str, float], name: str, awaitable: Awaitable[T]) -> T:
+    """Await and record the duration in seconds under `name`"""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[name] = time.perf_counter() - start
+
 
 class BrowserContextWindowSize(TypedDict):
     width: int
@@ -77,6 +106,62 @@ class BrowserContextConfig:
 
             trace_path: None
                     Path to save trace files. It will auto name the file with the TRACE_PATH/{context_id}.zip
+
+            incremental_dom_snapshots: True
+                    Reuse the previous DOM state of a page and only patch attribute / text changes
+                    reported by an in-page MutationObserver instead of re-extracting the whole tree
+
+            dom_wire_format: 'nested'
+                    Format in which the extracted DOM is sent from the page. 'columnar' sends parallel
+                    arrays and a string table, which is much smaller on large pages
+
+            viewport_expansion: None
+                    Only extract elements within this many pixels above and below the viewport, elements
+                    further away are counted and reported so the agent knows to scroll. 0 extracts only the
+                    visible viewport, None extracts the whole page
+
+            concurrent_frame_extraction: True
+                    Extract every frame of a page on its own and concurrently, including cross-origin iframes,
+                    and stitch them under their iframe elements. False only walks same-origin iframes from the page
+
+            dom_backend: 'js'
+                    How the DOM is extracted. 'js' runs buildDomTree.js in the page, 'cdp' builds the tree from a
+                    single DOMSnapshot.captureSnapshot call (Chromium only, always a full extraction). 'ax' only lists
+                    the interactive elements of the accessibility tree, a much smaller state for form-heavy tasks
+
+            adaptive_page_timing: False
+                    Learn the network idle and minimum waits per domain from the requests seen after a page was
+                    considered loaded: fast static sites wait less, sites with late content longer (up to
+                    maximum_wait_page_load_time). The fixed values above are used for unknown domains
+
+            page_timing_file: None
+                    Path to persist the learned page timings between runs, with adaptive_page_timing
+
+            screenshot_format: 'png'
+                    Image format of the state screenshots, 'jpeg' and 'webp' are much smaller to encode and send
+
+            screenshot_quality: None
+                    Compression quality (0-100) of jpeg and webp screenshots, None for the browser default
+
+            screenshot_max_size: None
+                    Downscale state screenshots so that neither side is larger than this many pixels
+
+            include_page_html: False
+                    Serialize the page HTML (page.content()) into every BrowserState and agent history item.
+                    Only needed to persist the HTML with the history, use get_page_html() to read it on demand
+
+            block_resource_types: []
+                    Playwright resource types to abort instead of loading, e.g. ['image', 'font', 'media'].
+                    Cuts page load time, bandwidth and renderer memory when the agent does not need them
+
+            block_ads_and_trackers: False
+                    Abort requests to well-known ad and analytics hosts (and their subdomains)
+
+            blocklist_file: None
+                    Path to a blocklist of further hosts to abort: one domain per line, hosts file lines or
+                    adblock "||domain^" rules. Blocked requests are counted in BrowserContext.blocker_stats,
+                    their download size is unknown (aborted responses are never fetched) and not counted.
+                    Requests are only routed when something is blocked, routing disables the browser cache
     """
 
     cookies_file: str | None = None
@@ -95,6 +180,30 @@ class BrowserContextConfig:
     save_recording_path: str | None = None
     trace_path: str | None = None
 
+    incremental_dom_snapshots: bool = True
+    dom_wire_format: DomWireFormat = "nested"
+    viewport_expansion: int | None = None
+    concurrent_frame_extraction: bool = True
+    dom_backend: DomBackend = "js"
+    screenshot_format: ScreenshotFormat = "png"
+    screenshot_quality: int | None = None
+    screenshot_max_size: int | None = None
+    include_page_html: bool = False
+    adaptive_page_timing: bool = False
+    page_timing_file: str | None = None
+    block_resource_types: list[str] = field(default_factory=list)
+    block_ads_and_trackers: bool = False
+    blocklist_file: str | None = None
+
+
+@dataclass
+class ElementCache:
+    """Resolved handles and derived facts of the elements of one state, by highlight index"""
+
+    state: BrowserState | None = None
+    handles: dict[int, ElementHandle] = field(default_factory=dict)
+    file_uploaders: dict[int, bool] = field(default_factory=dict)
+
 
 @dataclass
 class BrowserSession:
@@ -118,6 +227,28 @@ class BrowserContext:
         # Initialize these as None - they'll be set up when needed
         self.session: BrowserSession | None = None
 
+        # One DomService per page, so the cached DOM state survives between steps
+        self._dom_services: dict[Page, DomService] = {}
+
+        # Tab titles kept up to date from page events, see _track_tab
+        self._tab_titles: dict[Page, str] = {}
+        # In-flight requests of every page, tracked from the page creation on
+        self._network_trackers: dict[Page, NetworkIdleTracker] = {}
+
+        # Valid while the session's cached_state is the same and no frame navigated
+        self._element_cache = ElementCache()
+
+        self._page_timing: PageTimingModel | None = None
+        if config.adaptive_page_timing:
+            self._page_timing = PageTimingModel(
+                minimum_wait=config.minimum_wait_page_load_time,
+                idle_time=config.wait_for_network_idle_page_load_time,
+                maximum_wait=config.maximum_wait_page_load_time,
+                path=config.page_timing_file,
+            )
+
+        self._blocker = self._create_blocker()
+
     async def __aenter__(self):
         """Async context manager entry"""
         await self._initialize_session()
@@ -137,6 +268,8 @@ class BrowserContext:
                 return
 
             await self.save_cookies()
+            if self._page_timing:
+                self._page_timing.save()
 
             if self.config.trace_path:
                 try:
@@ -189,7 +322,6 @@ class BrowserContext:
             ),
             selector_map={},
             url=page.url,
-            html=await page.content(),
             title=await page.title(),
             screenshot=None,
             tabs=[],
@@ -206,7 +338,13 @@ class BrowserContext:
         return self.session
 
     async def _add_new_page_listener(self, context: PlaywrightBrowserContext):
+        for page in context.pages:
+            self._track_tab(page)
+            self._get_network_tracker(page)
+
         async def on_page(page: Page):
+            self._track_tab(page)
+            self._get_network_tracker(page)
             await page.wait_for_load_state()
             logger.debug(f"New page opened: {page.url}")
             if self.session is not None:
@@ -214,6 +352,84 @@ class BrowserContext:
 
         context.on("page", on_page)
 
+    async def _get_element_cache(self) -> ElementCache:
+        """The element cache of the current state, a new state starts an empty one"""
+        session = await self.get_session()
+        if self._element_cache.state is not session.cached_state:
+            self._clear_element_cache()
+            self._element_cache.state = session.cached_state
+        return self._element_cache
+
+    def _clear_element_cache(self, *_):
+        handles = list(self._element_cache.handles.values())
+        self._element_cache = ElementCache()
+        if handles:
+            # release the remote objects in the background
+            asyncio.ensure_future(
+                asyncio.gather(
+                    *(handle.dispose() for handle in handles), return_exceptions=True
+                )
+            )
+
+    def _drop_frame_elements(self, frame: Frame):
+        """
+        Drop the cached entries of elements that can belong to a navigated child frame: elements
+        extracted from it or from a frame below it, and elements walked through an iframe.
+        """
+        cache = self._element_cache
+        if cache.state is None:
+            return
+
+        def in_frame(index: int) -> bool:
+            element = cache.state.selector_map.get(index)  # type: ignore
+            if element is None:
+                return True
+            if element.frame is not None:
+                return element.frame == frame or element.frame.is_detached()
+            parent = element.parent
+            while parent is not None:
+                if parent.tag_name == "iframe":
+                    return True
+                parent = parent.parent
+            return False
+
+        stale = [index for index in {*cache.handles, *cache.file_uploaders} if in_frame(index)]
+        handles = [cache.handles.pop(index) for index in stale if index in cache.handles]
+        for index in stale:
+            cache.file_uploaders.pop(index, None)
+        if handles:
+            asyncio.ensure_future(
+                asyncio.gather(*(handle.dispose() for handle in handles), return_exceptions=True)
+            )
+
+    def _track_tab(self, page: Page):
+        """Update the cached title of a tab when it navigates, get_tabs_info then needs no round trips"""
+
+        async def update_title(*_):
+            try:
+                title = await page.title()
+            except Exception:
+                # closed or navigating again, the next event updates it
+                return
+            if not page.is_closed():
+                self._tab_titles[page] = title
+
+        async def on_framenavigated(frame: Frame):
+            if frame == page.main_frame:
+                await update_title()
+
+        def invalidate_element_cache(frame: Frame):
+            # handles and facts of the current state are stale after a navigation of their document
+            if frame == page.main_frame:
+                self._clear_element_cache()
+            else:
+                self._drop_frame_elements(frame)
+
+        page.on("framenavigated", on_framenavigated)
+        page.on("framenavigated", invalidate_element_cache)
+        page.on("domcontentloaded", update_title)
+        page.on("close", lambda _: self._tab_titles.pop(page, None))
+
     async def get_session(self) -> BrowserSession:
         """Lazy initialization of the browser and related components"""
         if self.session is None:
@@ -288,184 +504,55 @@ class BrowserContext:
             """
         )
 
-        return context
+        # Install the DOM extractor once per document instead of shipping it with every state fetch
+        await context.add_init_script(get_build_dom_tree_script())
 
-    async def _wait_for_stable_network(self):
-        page = await self.get_current_page()
+        if self._blocker.enabled:
+            await context.route("**/*", self._blocker.handle)
 
-        pending_requests = set()
-        last_activity = asyncio.get_event_loop().time()
-
-        # Define relevant resource types and content types
-        RELEVANT_RESOURCE_TYPES = {
-            "document",
-            "stylesheet",
-            "image",
-            "font",
-            "script",
-            "iframe",
-        }
-
-        RELEVANT_CONTENT_TYPES = {
-            "text/html",
-            "text/css",
-            "application/javascript",
-            "image/",
-            "font/",
-            "application/json",
-        }
-
-        # Additional patterns to filter out
-        IGNORED_URL_PATTERNS = {
-            # Analytics and tracking
-            "analytics",
-            "tracking",
-            "telemetry",
-            "beacon",
-            "metrics",
-            # Ad-related
-            "doubleclick",
-            "adsystem",
-            "adserver",
-            "advertising",
-            # Social media widgets
-            "facebook.com/plugins",
-            "platform.twitter",
-            "linkedin.com/embed",
-            # Live chat and support
-            "livechat",
-            "zendesk",
-            "intercom",
-            "crisp.chat",
-            "hotjar",
-            # Push notifications
-            "push-notifications",
-            "onesignal",
-            "pushwoosh",
-            # Background sync/heartbeat
-            "heartbeat",
-            "ping",
-            "alive",
-            # WebRTC and streaming
-            "webrtc",
-            "rtmp://",
-            "wss://",
-            # Common CDNs for dynamic content
-            "cloudfront.net",
-            "fastly.net",
-        }
-
-        async def on_request(request):
-            # Filter by resource type
-            if request.resource_type not in RELEVANT_RESOURCE_TYPES:
-                return
-
-            # Filter out streaming, websocket, and other real-time requests
-            if request.resource_type in {
-                "websocket",
-                "media",
-                "eventsource",
-                "manifest",
-                "other",
-            }:
-                return
-
-            # Filter out by URL patterns
-            url = request.url.lower()
-            if any(pattern in url for pattern in IGNORED_URL_PATTERNS):
-                return
-
-            # Filter out data URLs and blob URLs
-            if url.startswith(("data:", "blob:")):
-                return
-
-            # Filter out requests with certain headers
-            headers = request.headers
-            if headers.get("purpose") == "prefetch" or headers.get(
-                "sec-fetch-dest"
-            ) in [
-                "video",
-                "audio",
-            ]:
-                return
-
-            nonlocal last_activity
-            pending_requests.add(request)
-            last_activity = asyncio.get_event_loop().time()
-            # logger.debug(f'Request started: {request.url} ({request.resource_type})')
-
-        async def on_response(response):
-            request = response.request
-            if request not in pending_requests:
-                return
-
-            # Filter by content type if available
-            content_type = response.headers.get("content-type", "").lower()
-
-            # Skip if content type indicates streaming or real-time data
-            if any(
-                t in content_type
-                for t in [
-                    "streaming",
-                    "video",
-                    "audio",
-                    "webm",
-                    "mp4",
-                    "event-stream",
-                    "websocket",
-                    "protobuf",
-                ]
-            ):
-                pending_requests.remove(request)
-                return
-
-            # Only process relevant content types
-            if not any(ct in content_type for ct in RELEVANT_CONTENT_TYPES):
-                pending_requests.remove(request)
-                return
-
-            # Skip if response is too large (likely not essential for page load)
-            content_length = response.headers.get("content-length")
-            if content_length and int(content_length) > 5 * 1024 * 1024:  # 5MB
-                pending_requests.remove(request)
-                return
-
-            nonlocal last_activity
-            pending_requests.remove(request)
-            last_activity = asyncio.get_event_loop().time()
-            # logger.debug(f'Request resolved: {request.url} ({content_type})')
-
-        # Attach event listeners
-        page.on("request", on_request)
-        page.on("response", on_response)
+        return context
 
-        try:
-            # Wait for idle time
-            start_time = asyncio.get_event_loop().time()
-            while True:
-                await asyncio.sleep(0.1)
-                now = asyncio.get_event_loop().time()
-                if (
-                    len(pending_requests) == 0
-                    and (now - last_activity)
-                    >= self.config.wait_for_network_idle_page_load_time
-                ):
-                    break
-                if now - start_time > self.config.maximum_wait_page_load_time:
-                    logger.debug(
-                        f"Network timeout after {self.config.maximum_wait_page_load_time}s with {len(pending_requests)} "
-                        f"pending requests: {[r.url for r in pending_requests]}"
-                    )
-                    break
+    def _create_blocker(self) -> ResourceBlocker:
+        blocklist = DomainBlocklist()
+        if self.config.block_ads_and_trackers:
+            blocklist.update(DEFAULT_BLOCKED_DOMAINS)
+        if self.config.blocklist_file:
+            try:
+                blocklist.load(self.config.blocklist_file)
+            except Exception as e:
+                logger.warning(f"Failed to load blocklist {self.config.blocklist_file}: {str(e)}")
+        return ResourceBlocker(self.config.block_resource_types, blocklist)
+
+    @property
+    def blocker_stats(self) -> BlockerStats:
+        """Requests aborted by block_resource_types, block_ads_and_trackers and blocklist_file in this context"""
+        return self._blocker.stats
+
+    def _get_network_tracker(self, page: Page) -> NetworkIdleTracker:
+        """The in-flight request tracker of a page, started when the page was created"""
+        for closed_page in [p for p in self._network_trackers if p.is_closed()]:
+            del self._network_trackers[closed_page]
+        if page not in self._network_trackers:
+            self._network_trackers[page] = NetworkIdleTracker(page)
+        return self._network_trackers[page]
+
+    def _get_page_timing(self, page: Page) -> PageTiming:
+        """Waits for the current domain of a page, learned with adaptive_page_timing"""
+        if self._page_timing is not None:
+            return self._page_timing.get(page.url)
+        return PageTiming(
+            minimum_wait=self.config.minimum_wait_page_load_time,
+            idle_time=self.config.wait_for_network_idle_page_load_time,
+        )
 
-        finally:
-            # Clean up event listeners
-            page.remove_listener("request", on_request)
-            page.remove_listener("response", on_response)
+    async def _wait_for_stable_network(self):
+        page = await self.get_current_page()
+        idle_time = self._get_page_timing(page).idle_time
 
-        logger.debug(
-            f"Network stabilized for {self.config.wait_for_network_idle_page_load_time} seconds"
-        )
+        if await self._get_network_tracker(page).wait_for_idle(
+            idle_time, self.config.maximum_wait_page_load_time
+        ):
+            logger.debug(f"Network stabilized for {idle_time:.2f} seconds")
 
     async def _wait_for_page_and_frames_load(
         self, timeout_overwrite: float | None = None
@@ -476,6 +563,8 @@ class BrowserContext:
         """
         # Start timing
         start_time = time.time()
+        page = await self.get_current_page()
+        minimum_wait = self._get_page_timing(page).minimum_wait
 
         # await asyncio.sleep(self.minimum_wait_page_load_time)
 
@@ -489,7 +578,7 @@ class BrowserContext:
         # Calculate remaining time to meet minimum WAIT_TIME
         elapsed = time.time() - start_time
         remaining = max(
-            (timeout_overwrite or self.config.minimum_wait_page_load_time) - elapsed, 0
+            (timeout_overwrite or minimum_wait) - elapsed, 0
         )
 
         logger.debug(
@@ -555,6 +644,13 @@ class BrowserContext:
         session = await self.get_session()
         session.cached_state = await self._update_state(use_vision=use_vision)
 
+        if self._page_timing is not None:
+            # requests that started while the state was extracted were missed by the wait
+            page = await self.get_current_page()
+            self._page_timing.observe(
+                page.url, self._get_network_tracker(page).stop_watching()
+            )
+
         # Save cookies if a file is specified
         if self.config.cookies_file:
             asyncio.create_task(self.save_cookies())
@@ -582,22 +678,64 @@ class BrowserContext:
                 raise BrowserError("No valid pages available")
 
         try:
-            await self.remove_highlights()
-            dom_service = DomService(page)
-            content = await dom_service.get_clickable_elements()
+            timings: dict[str, float] = {}
+
+            async def get_content_and_screenshot():
+                await _timed(timings, "remove_highlights", self.remove_highlights())
+                dom_service = self._get_dom_service(page)
+                # Highlights are only needed for the screenshot
+                content = await _timed(
+                    timings,
+                    "dom",
+                    dom_service.get_clickable_elements(
+                        highlight_elements=use_vision,
+                        incremental=self.config.incremental_dom_snapshots,
+                    ),
+                )
+                screenshot = (None, "image/png")
+                if use_vision:
+                    # after the highlights were rendered
+                    screenshot = await _timed(
+                        timings, "screenshot", self._take_state_screenshot(page)
+                    )
+                return content, screenshot
+
+            async def get_html():
+                if not self.config.include_page_html:
+                    return None
+                return await _timed(timings, "html", page.content())
+
+            start = time.perf_counter()
+            (content, (screenshot_b64, mime_type)), html, title, tabs = await asyncio.gather(
+                get_content_and_screenshot(),
+                get_html(),
+                _timed(timings, "title", page.title()),
+                _timed(timings, "tabs", self.get_tabs_info()),
+            )
+            timings["total"] = time.perf_counter() - start
 
-            screenshot_b64 = None
-            if use_vision:
-                screenshot_b64 = await self.take_screenshot()
+            # the current tab can change its title without navigating
+            self._tab_titles[page] = title
+            pages = session.context.pages
+            if page in pages and pages.index(page) < len(tabs):
+                tabs[pages.index(page)].title = title
 
             self.current_state = BrowserState(
                 element_tree=content.element_tree,
                 selector_map=content.selector_map,
+                elements_above=content.elements_above,
+                elements_below=content.elements_below,
                 url=page.url,
-                html=await page.content(),
-                title=await page.title(),
-                tabs=await self.get_tabs_info(),
+                html=html,
+                title=title,
+                tabs=tabs,
                 screenshot=screenshot_b64,
+                screenshot_mime_type=mime_type,
+                timings=timings,
+            )
+            logger.debug(
+                "State timings: "
+                + ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items())
             )
 
             return self.current_state
@@ -608,6 +746,52 @@ class BrowserContext:
                 return self.current_state
             raise
 
+    def _get_dom_service(self, page: Page) -> DomService:
+        """Get the DomService of a page, dropping the ones of closed pages"""
+        for closed_page in [p for p in self._dom_services if p.is_closed()]:
+            del self._dom_services[closed_page]
+
+        if page not in self._dom_services:
+            self._dom_services[page] = DomService(
+                page,
+                wire_format=self.config.dom_wire_format,
+                viewport_expansion=self.config.viewport_expansion,
+                concurrent_frames=self.config.concurrent_frame_extraction,
+                backend=self.config.dom_backend,
+            )
+        return self._dom_services[page]
+
+    async def get_pyne_selectors(self, indices: list[int]) -> dict[int, str]:
+        """Generate the pyne selectors of elements of the current state, they are not part of the extraction"""
+        try:
+            page = await self.get_current_page()
+            return await self._get_dom_service(page).get_pyne_selectors(indices)
+        except Exception as e:
+            logger.debug(f"Failed to get pyne selectors: {str(e)}")
+            return {}
+
+    async def get_page_change_token(self) -> Optional[tuple]:
+        """
+        Cheap token of the current page (one evaluate per frame, no extraction) that changes when
+        new elements may have appeared: added elements, revealed containers, scrolling, navigation.
+        Returns None if the main frame cannot be queried, treat that as a change.
+        """
+        try:
+            page = await self.get_current_page()
+            frames = [frame for frame in page.frames if not frame.is_detached()]
+            tokens = await asyncio.gather(
+                *(frame.evaluate(CHANGE_TOKEN_JS) for frame in frames),
+                return_exceptions=True,
+            )
+        except Exception as e:
+            logger.debug(f"Failed to get page change token: {str(e)}")
+            return None
+
+        if not isinstance(tokens[0], str):
+            return None
+        # frames without the extractor (e.g. about:blank) keep a constant None
+        return tuple(token if isinstance(token, str) else None for token in tokens)
+
     # region - Browser Actions
 
     async def take_screenshot(self, full_page: bool = False) -> str:
@@ -627,6 +811,44 @@ class BrowserContext:
 
         return screenshot_b64
 
+    async def _take_state_screenshot(self, page: Page) -> tuple[str, str]:
+        """
+        Viewport screenshot in the configured format, quality and size, with its mime type.
+        Captured with CDP, which returns base64 directly and downscales in the browser.
+        """
+        screenshot_format = self.config.screenshot_format
+        try:
+            screenshot_b64 = await self._capture_screenshot_cdp(page)
+        except Exception as e:
+            # not Chromium: Playwright only encodes png and jpeg, and does not downscale
+            logger.debug(f"CDP screenshot failed, using Playwright: {str(e)}")
+            if screenshot_format == "webp":
+                screenshot_format = "png"
+            screenshot = await page.screenshot(
+                type="jpeg" if screenshot_format == "jpeg" else "png",
+                quality=self.config.screenshot_quality if screenshot_format == "jpeg" else None,
+                animations="disabled",
+            )
+            screenshot_b64 = base64.b64encode(screenshot).decode("utf-8")
+        return screenshot_b64, f"image/{screenshot_format}"
+
+    async def _capture_screenshot_cdp(self, page: Page) -> str:
+        cdp = await self._get_dom_service(page).get_cdp_session()
+        params: dict = {"format": self.config.screenshot_format}
+        if self.config.screenshot_format != "png" and self.config.screenshot_quality is not None:
+            params["quality"] = self.config.screenshot_quality
+
+        if self.config.screenshot_max_size:
+            x, y, width, height, ratio = await page.evaluate(
+                "() => [scrollX, scrollY, innerWidth, innerHeight, devicePixelRatio]"
+            )
+            scale = min(1, self.config.screenshot_max_size / (max(width, height) * ratio))
+            # the clip is in CSS pixels of the document, the image has (size * ratio * scale) pixels
+            params["clip"] = {"x": x, "y": y, "width": width, "height": height, "scale": scale}
+
+        result = await cdp.send("Page.captureScreenshot", params)
+        return result["data"]
+
     async def remove_highlights(self):
         """
         Removes all highlight overlays and labels created by the highlightElement function.
@@ -634,24 +856,18 @@ class BrowserContext:
         """
         try:
             page = await self.get_current_page()
-            await page.evaluate(
-                """
+            # Separately extracted frames draw their highlights in their own document
+            frames = [frame for frame in page.frames if not frame.is_detached()]
+            # The extractor tracks the elements it marked, no need to scan the document
+            script = """
                 try {
-                    // Remove the highlight container and all its contents
-                    const container = document.getElementById('playwright-highlight-container');
-                    if (container) {
-                        container.remove();
-                    }
-
-                    // Remove highlight attributes from elements
-                    const highlightedElements = document.querySelectorAll('[browser-user-highlight-id^="playwright-highlight-"]');
-                    highlightedElements.forEach(el => {
-                        el.removeAttribute('browser-user-highlight-id');
-                    });
+                    window.__browserUse?.removeHighlights?.();
                 } catch (e) {
                     console.error('Failed to remove highlights:', e);
                 }
                 """
+            await asyncio.gather(
+                *(frame.evaluate(script) for frame in frames), return_exceptions=True
             )
         except Exception as e:
             logger.debug(f"Failed to remove highlights (this is usually ok): {str(e)}")
@@ -807,8 +1023,49 @@ class BrowserContext:
             return f"{tag_name}[highlight_index='{element.highlight_index}']"
 
     async def get_locate_element(self, element: DOMElementNode) -> ElementHandle | None:
+        """
+        Handle of an element of the current state, resolved once per state and highlight index.
+        Scrolling it into view also checks that a cached handle is still attached.
+        """
+        cache = await self._get_element_cache()
+        index = element.highlight_index
+        cacheable = index is not None and cache.state.selector_map.get(index) is element  # type: ignore
+
+        if cacheable and index in cache.handles:
+            try:
+                await cache.handles[index].scroll_into_view_if_needed()
+                return cache.handles[index]
+            except Exception:
+                # re-rendered since, resolve it again
+                del cache.handles[index]
+
+        element_handle = await self._resolve_element(element)
+        if cacheable and element_handle is not None:
+            cache.handles[index] = element_handle  # type: ignore
+        return element_handle
+
+    async def _resolve_element(self, element: DOMElementNode) -> ElementHandle | None:
         current_frame = await self.get_current_page()
 
+        # Highlighted elements are kept by the extractor, one lookup instead of building selectors
+        element_handle = await self._get_registered_element(current_frame, element)
+        if element_handle is not None:
+            await element_handle.scroll_into_view_if_needed()
+            return element_handle
+
+        # Elements of separately extracted frames know their frame
+        if element.frame is not None and not element.frame.is_detached():
+            try:
+                element_handle = await element.frame.query_selector(
+                    self._enhanced_css_selector_for_element(element)
+                )
+                if element_handle:
+                    await element_handle.scroll_into_view_if_needed()
+                return element_handle
+            except Exception as e:
+                logger.error(f"Failed to locate element: {str(e)}")
+                return None
+
         # Start with the target element and collect all parents
         parents: list[DOMElementNode] = []
         current = element
@@ -841,6 +1098,28 @@ class BrowserContext:
             logger.error(f"Failed to locate element: {str(e)}")
             return None
 
+    async def _get_registered_element(
+        self, page: Page, element: DOMElementNode
+    ) -> ElementHandle | None:
+        """The element from the in-page highlight registry, None if it is not (or no longer) there"""
+        if element.highlight_index is None:
+            return None
+        # Same-origin iframe elements are registered in the main frame, unless extracted separately
+        frame = element.frame if element.frame is not None else page.main_frame
+        if frame.is_detached():
+            return None
+        try:
+            handle = await frame.evaluate_handle(
+                ELEMENT_BY_INDEX_JS, [element.highlight_index, element.tag_name]
+            )
+        except Exception as e:
+            logger.debug(f"Failed to look up element {element.highlight_index}: {str(e)}")
+            return None
+        element_handle = handle.as_element()
+        if element_handle is None:
+            await handle.dispose()
+        return element_handle
+
     async def _input_text_element_node(self, element_node: DOMElementNode, text: str):
         try:
             page = await self.get_current_page()
@@ -892,12 +1171,21 @@ class BrowserContext:
         """Get information about all tabs"""
         session = await self.get_session()
 
-        tabs_info = []
-        for page_id, page in enumerate(session.context.pages):
-            tab_info = TabInfo(page_id=page_id, url=page.url, title=await page.title())
-            tabs_info.append(tab_info)
+        pages = session.context.pages
+        # only tabs that did not report a title yet are asked for it
+        missing = [page for page in pages if page not in self._tab_titles]
+        if missing:
+            titles = await asyncio.gather(
+                *(page.title() for page in missing), return_exceptions=True
+            )
+            for page, title in zip(missing, titles):
+                if isinstance(title, str) and not page.is_closed():
+                    self._tab_titles[page] = title
 
-        return tabs_info
+        return [
+            TabInfo(page_id=page_id, url=page.url, title=self._tab_titles.get(page, ""))
+            for page_id, page in enumerate(pages)
+        ]
 
     async def switch_to_tab(self, page_id: int) -> None:
         """Switch to a specific tab by its page_id
@@ -968,6 +1256,21 @@ class BrowserContext:
         self, element_node: DOMElementNode, max_depth: int = 3, current_depth: int = 0
     ) -> bool:
         """Check if element or its children are file uploaders"""
+        if current_depth == 0 and element_node.highlight_index is not None:
+            # memoized for the elements of the current state
+            cache = await self._get_element_cache()
+            index = element_node.highlight_index
+            if cache.state.selector_map.get(index) is element_node:  # type: ignore
+                if index not in cache.file_uploaders:
+                    cache.file_uploaders[index] = await self._is_file_uploader(
+                        element_node, max_depth, current_depth
+                    )
+                return cache.file_uploaders[index]
+        return await self._is_file_uploader(element_node, max_depth, current_depth)
+
+    async def _is_file_uploader(
+        self, element_node: DOMElementNode, max_depth: int, current_depth: int
+    ) -> bool:
         if current_depth > max_depth:
             return False
 
@@ -991,7 +1294,7 @@ class BrowserContext:
         if element_node.children and current_depth < max_depth:
             for child in element_node.children:
                 if isinstance(child, DOMElementNode):
-                    if await self.is_file_uploader(child, max_depth, current_depth + 1):
+                    if await self._is_file_uploader(child, max_depth, current_depth + 1):
                         return True
 
         return False
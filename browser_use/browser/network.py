@@ -0,0 +1,230 @@
+"""
+Tracks the in-flight requests of a page for its whole lifetime, so waiting for a stable
+network does not have to attach listeners and observe the page from scratch every step.
+"""
+
+import asyncio
+import logging
+import re
+
+from playwright.async_api import Page, Request, Response
+
+logger = logging.getLogger(__name__)
+
+# Define relevant resource types and content types
+RELEVANT_RESOURCE_TYPES = frozenset(
+    [
+        "document",
+        "stylesheet",
+        "image",
+        "font",
+        "script",
+        "iframe",
+    ]
+)
+
+RELEVANT_CONTENT_TYPES = (
+    "text/html",
+    "text/css",
+    "application/javascript",
+    "image/",
+    "font/",
+    "application/json",
+)
+
+# Responses that are streamed or real-time data, they do not delay the page load
+STREAMING_CONTENT_TYPES = (
+    "streaming",
+    "video",
+    "audio",
+    "webm",
+    "mp4",
+    "event-stream",
+    "websocket",
+    "protobuf",
+)
+
+# Additional patterns to filter out
+IGNORED_URL_PATTERNS = (
+    # Analytics and tracking
+    "analytics",
+    "tracking",
+    "telemetry",
+    "beacon",
+    "metrics",
+    # Ad-related
+    "doubleclick",
+    "adsystem",
+    "adserver",
+    "advertising",
+    # Social media widgets
+    "facebook.com/plugins",
+    "platform.twitter",
+    "linkedin.com/embed",
+    # Live chat and support
+    "livechat",
+    "zendesk",
+    "intercom",
+    "crisp.chat",
+    "hotjar",
+    # Push notifications
+    "push-notifications",
+    "onesignal",
+    "pushwoosh",
+    # Background sync/heartbeat
+    "heartbeat",
+    "ping",
+    "alive",
+    # WebRTC and streaming
+    "webrtc",
+    "rtmp://",
+    "wss://",
+    # Common CDNs for dynamic content
+    "cloudfront.net",
+    "fastly.net",
+)
+
+# One pass over the URL for all patterns, instead of one substring scan per pattern
+IGNORED_URL_REGEX = re.compile("|".join(re.escape(pattern) for pattern in IGNORED_URL_PATTERNS))
+
+
+def is_relevant_request(request: Request) -> bool:
+    """Requests that delay the page load, not analytics, streaming or prefetches"""
+    if request.resource_type not in RELEVANT_RESOURCE_TYPES:
+        return False
+
+    # Filter out data URLs and blob URLs
+    url = request.url.lower()
+    if url.startswith(("data:", "blob:")) or IGNORED_URL_REGEX.search(url):
+        return False
+
+    # Filter out requests with certain headers
+    headers = request.headers
+    if headers.get("purpose") == "prefetch" or headers.get("sec-fetch-dest") in (
+        "video",
+        "audio",
+    ):
+        return False
+    return True
+
+
+class NetworkIdleTracker:
+    """
+    Counts the relevant in-flight requests of a page from its creation on. `idle` is set while
+    none are pending, `last_activity` is the loop time of the last relevant request start or finish.
+    Requests that never finish (long-polls, stalled beacons) are given up after one wait timeout.
+    """
+
+    def __init__(self, page: Page):
+        self.page = page
+        # In-flight requests with the loop time they started
+        self.pending: dict[Request, float] = {}
+        self.idle = asyncio.Event()
+        self.idle.set()
+        self.last_activity = asyncio.get_event_loop().time()
+        # Longest quiet period that ended with new requests, from the start of the last
+        # wait_for_idle until stop_watching: how long the network has to stay quiet so that
+        # late content is not missed
+        self.late_gap = 0.0
+        self._watching = False
+        self._watch_start = 0.0
+
+        page.on("request", self._on_request)
+        page.on("response", self._on_response)
+        # requests that never get a response must not stay pending forever
+        page.on("requestfailed", self._finish)
+        page.on("close", lambda _: self._clear())
+
+    def _on_request(self, request: Request):
+        if not is_relevant_request(request):
+            return
+        now = asyncio.get_event_loop().time()
+        if self._watching and not self.pending:
+            # activity before the wait started (e.g. before the last action) does not count
+            self.late_gap = max(self.late_gap, now - max(self.last_activity, self._watch_start))
+        self.pending[request] = now
+        self.idle.clear()
+        self.last_activity = now
+
+    def _on_response(self, response: Response):
+        request = response.request
+        if request not in self.pending:
+            return
+
+        # Streamed, irrelevant or large (> 5MB) responses finish without counting as activity
+        content_type = response.headers.get("content-type", "").lower()
+        content_length = response.headers.get("content-length")
+        if (
+            any(t in content_type for t in STREAMING_CONTENT_TYPES)
+            or not any(ct in content_type for ct in RELEVANT_CONTENT_TYPES)
+            or (content_length and content_length.isdigit() and int(content_length) > 5 * 1024 * 1024)
+        ):
+            del self.pending[request]
+            if not self.pending:
+                self.idle.set()
+            return
+
+        self._finish(request)
+
+    def _finish(self, request: Request):
+        if request not in self.pending:
+            return
+        del self.pending[request]
+        self.last_activity = asyncio.get_event_loop().time()
+        if not self.pending:
+            self.idle.set()
+
+    def _clear(self):
+        self.pending.clear()
+        self.idle.set()
+
+    def _expire(self, started_before: float):
+        """Stop waiting for requests that started before this loop time and are still pending"""
+        stale = [request for request, started in self.pending.items() if started < started_before]
+        if not stale:
+            return
+        logger.debug(f"Ignoring {len(stale)} stale requests: {[r.url for r in stale]}")
+        for request in stale:
+            del self.pending[request]
+        if not self.pending:
+            self.idle.set()
+
+    async def wait_for_idle(self, idle_time: float, timeout: float) -> bool:
+        """
+        Wait until no request is pending and none started or finished for `idle_time` seconds.
+        Returns immediately if the page has been quiet long enough, False on timeout.
+        Requests already pending for longer than `timeout` are not waited for, they would only
+        make every wait run into the timeout. Starts watching for late content, see `late_gap`.
+        """
+        loop = asyncio.get_event_loop()
+        self.late_gap = 0.0
+        self._watching = True
+        self._watch_start = loop.time()
+        self._expire(self._watch_start - timeout)
+        deadline = self._watch_start + timeout
+        while True:
+            now = loop.time()
+            if now >= deadline:
+                logger.debug(
+                    f"Network timeout after {timeout}s with {len(self.pending)} "
+                    f"pending requests: {[r.url for r in self.pending]}"
+                )
+                return False
+
+            if self.pending:
+                try:
+                    await asyncio.wait_for(self.idle.wait(), deadline - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            quiet = now - self.last_activity
+            if quiet >= idle_time:
+                return True
+            # a request starting meanwhile is seen by the next iteration
+            await asyncio.sleep(min(idle_time - quiet, deadline - now))
+
+    def stop_watching(self) -> float:
+        """Stop recording quiet gaps, returns the longest one since the last wait_for_idle"""
+        self._watching = False
+        return self.late_gap
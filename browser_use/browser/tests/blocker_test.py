@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+from browser_use.browser.blocker import DEFAULT_BLOCKED_DOMAINS, DomainBlocklist, ResourceBlocker
+
+
+class FakeRoute:
+	def __init__(self, url: str, resource_type: str = 'script', post_data: bytes | None = None, navigation: bool = False):
+		self.request = SimpleNamespace(
+			url=url,
+			resource_type=resource_type,
+			post_data_buffer=post_data,
+			frame=SimpleNamespace(parent_frame=None),
+			is_navigation_request=lambda: navigation,
+		)
+		self.result = None
+
+	async def continue_(self):
+		self.result = 'continued'
+
+	async def abort(self, error_code=None):
+		self.result = 'aborted'
+
+
+def test_domain_blocklist_matches_subdomains():
+	blocklist = DomainBlocklist(DEFAULT_BLOCKED_DOMAINS)
+
+	assert blocklist.matches('www.google-analytics.com')
+	assert blocklist.matches('stats.g.doubleclick.net')
+	assert blocklist.matches('DoubleClick.net')
+	assert not blocklist.matches('example.com')
+	assert not blocklist.matches('notdoubleclick.net')
+	assert not blocklist.matches('net')
+
+
+def test_domain_blocklist_load(tmp_path):
+	path = tmp_path / 'hosts.txt'
+	path.write_text(
+		'# hosts file\n'
+		'0.0.0.0 ads.example.com\n'
+		'127.0.0.1 localhost\n'
+		'tracker.example.org  # plain domain\n'
+		'||pixel.example.net^\n'
+		'||tracker.example.com^$third-party,script\n'
+		'||example.net/ads/*\n'
+		'! adblock comment\n'
+	)
+	blocklist = DomainBlocklist()
+	blocklist.load(str(path))
+
+	assert blocklist.domains == {
+		'ads.example.com',
+		'tracker.example.org',
+		'pixel.example.net',
+		'tracker.example.com',
+	}
+	assert blocklist.matches('cdn.ads.example.com')
+	assert not blocklist.matches('example.com')
+
+
+def test_domain_blocklist_skips_cosmetic_and_exception_rules():
+	lines = [
+		'[Adblock Plus 2.0]',
+		'reddit.com##.promoted',
+		'example.com#@#.ad',
+		'example.org#?#div:-abp-has(.sponsored)',
+		'@@||good.com^',
+		'@@||good.com^$document',
+		'||ads.example.com^$domain=example.org',
+		'||ads.example.com^$~third-party',
+		'||ads.example.com^$script,csp=default-src',
+		'example.net^',
+	]
+	assert [DomainBlocklist._parse_line(line) for line in lines] == [None] * len(lines)
+
+
+async def test_resource_blocker_counts_aborted_requests():
+	blocker = ResourceBlocker(['image', 'font'], DomainBlocklist(['doubleclick.net']))
+	assert blocker.enabled
+	assert not ResourceBlocker().enabled
+
+	routes = [
+		FakeRoute('https://example.com/', 'document', navigation=True),
+		FakeRoute('https://example.com/app.js'),
+		FakeRoute('https://example.com/logo.png', 'image'),
+		FakeRoute('https://fonts.example.com/a.woff2', 'font'),
+		FakeRoute('https://ad.doubleclick.net/collect', 'fetch', post_data=b'x' * 100),
+		# pages the agent opens are loaded even from blocked hosts
+		FakeRoute('https://doubleclick.net/', 'document', navigation=True),
+	]
+	for route in routes:
+		await blocker.handle(route)  # type: ignore
+
+	assert [route.result for route in routes] == ['continued', 'continued', 'aborted', 'aborted', 'aborted', 'continued']
+	assert blocker.stats.requests == 3
+	assert blocker.stats.upload_bytes == 100
+	assert blocker.stats.by_resource_type == {'image': 1, 'font': 1, 'fetch': 1}
+	assert blocker.stats.by_host['ad.doubleclick.net'] == 1
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+from browser_use.browser.network import NetworkIdleTracker, is_relevant_request
+
+
+class EventPage:
+	"""Only the event emitter part of a Playwright page"""
+
+	def __init__(self):
+		self.listeners = {}
+
+	def on(self, event, handler):
+		self.listeners.setdefault(event, []).append(handler)
+
+	def emit(self, event, arg):
+		for handler in self.listeners.get(event, []):
+			handler(arg)
+
+
+class FakeRequest(SimpleNamespace):
+	__hash__ = object.__hash__
+
+
+def request(url: str, resource_type: str = 'script', headers: dict = {}):
+	return FakeRequest(url=url, resource_type=resource_type, headers=headers)
+
+
+def response(req, content_type: str = 'application/javascript'):
+	return SimpleNamespace(request=req, headers={'content-type': content_type})
+
+
+def test_is_relevant_request():
+	assert is_relevant_request(request('https://example.com/app.js'))
+	assert not is_relevant_request(request('https://www.google-analytics.com/collect'))
+	assert not is_relevant_request(request('https://example.com/api/PING'))
+	assert not is_relevant_request(request('data:text/plain,a'))
+	assert not is_relevant_request(request('https://example.com/data', resource_type='xhr'))
+	assert not is_relevant_request(request('https://example.com/next.js', headers={'purpose': 'prefetch'}))
+
+
+async def test_idle_page_returns_immediately():
+	tracker = NetworkIdleTracker(EventPage())  # type: ignore
+	tracker.last_activity -= 5
+
+	start = time.perf_counter()
+	assert await tracker.wait_for_idle(idle_time=1, timeout=5)
+	assert time.perf_counter() - start < 0.05
+
+
+async def test_waits_for_pending_requests():
+	page = EventPage()
+	tracker = NetworkIdleTracker(page)  # type: ignore
+
+	script, image = request('https://example.com/app.js'), request('https://example.com/a.png', 'image')
+	page.emit('request', script)
+	page.emit('request', image)
+	assert not tracker.idle.is_set()
+
+	async def finish():
+		await asyncio.sleep(0.1)
+		page.emit('response', response(script))
+		page.emit('requestfailed', image)
+
+	start = time.perf_counter()
+	_, idle = await asyncio.gather(finish(), tracker.wait_for_idle(idle_time=0.1, timeout=5))
+	elapsed = time.perf_counter() - start
+	assert idle and not tracker.pending
+	assert 0.2 <= elapsed < 0.5
+
+	page.emit('request', request('https://example.com/slow.js'))
+	assert not await tracker.wait_for_idle(idle_time=0.1, timeout=0.2)
+
+
+async def test_late_gap():
+	page = EventPage()
+	tracker = NetworkIdleTracker(page)  # type: ignore
+	tracker.last_activity -= 5
+
+	assert await tracker.wait_for_idle(idle_time=0.1, timeout=1)
+	# content loaded after the page was considered settled
+	await asyncio.sleep(0.2)
+	page.emit('request', request('https://example.com/late.js'))
+	gap = tracker.stop_watching()
+	assert 0.2 <= gap < 0.4
+
+	# nothing is recorded after stop_watching
+	page.emit('requestfailed', next(iter(tracker.pending)))
+	page.emit('request', request('https://example.com/later.js'))
+	assert tracker.late_gap == gap
+
+
+async def test_stale_requests_are_not_waited_for():
+	page = EventPage()
+	tracker = NetworkIdleTracker(page)  # type: ignore
+
+	# a long-poll started with the page, it never finishes
+	page.emit('request', request('https://example.com/poll.js'))
+	tracker.pending = {req: started - 10 for req, started in tracker.pending.items()}
+	tracker.last_activity -= 10
+
+	start = time.perf_counter()
+	assert await tracker.wait_for_idle(idle_time=0.1, timeout=5)
+	assert time.perf_counter() - start < 0.05
+	assert not tracker.pending
+
+	# requests of the last action are still waited for
+	page.emit('request', request('https://example.com/new.js'))
+	assert not await tracker.wait_for_idle(idle_time=0.1, timeout=0.2)
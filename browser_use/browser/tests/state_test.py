@@ -0,0 +1,74 @@
+import base64
+import struct
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.browser.context import BrowserContextConfig
+
+
+async def test_state_timings():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content('<html><head><title>Form</title></head><body><button>Go</button></body></html>')
+
+		state = await context.get_state(use_vision=True)
+		assert state.title == 'Form'
+		assert state.screenshot and state.html is None
+		assert {'remove_highlights', 'dom', 'screenshot', 'title', 'tabs', 'total'} <= set(state.timings)
+
+	async with await browser.new_context(BrowserContextConfig(include_page_html=True)) as context:
+		page = await context.get_current_page()
+		await page.set_content('<html><body><button>Go</button></body></html>')
+
+		state = await context.get_state()
+		assert state.html and '<button>Go</button>' in state.html
+		assert 'html' in state.timings and 'screenshot' not in state.timings
+
+	await browser.close()
+
+
+async def test_tab_titles_follow_navigation():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.goto('data:text/html,<title>First</title>')
+		await context.create_new_tab('data:text/html,<title>Second</title>')
+		assert [tab.title for tab in await context.get_tabs_info()] == ['First', 'Second']
+
+		await page.goto('data:text/html,<title>Third</title>')
+		assert [tab.title for tab in await context.get_tabs_info()] == ['Third', 'Second']
+
+		await (await context.get_current_page()).close()
+		assert [tab.title for tab in await context.get_tabs_info()] == ['Third']
+		assert len(context._tab_titles) == 1
+
+	await browser.close()
+
+
+async def test_state_screenshot_format_and_size():
+	browser = Browser(config=BrowserConfig(headless=True))
+	html = '<html><body><button>Go</button></body></html>'
+
+	config = BrowserContextConfig(screenshot_max_size=640)
+	async with await browser.new_context(config) as context:
+		page = await context.get_current_page()
+		await page.set_content(html)
+
+		state = await context.get_state(use_vision=True)
+		png = base64.b64decode(state.screenshot)  # type: ignore
+		assert state.screenshot_mime_type == 'image/png' and png[:8] == b'\x89PNG\r\n\x1a\n'
+		width, height = struct.unpack('>II', png[16:24])
+		assert max(width, height) <= 640
+
+	config = BrowserContextConfig(screenshot_format='jpeg', screenshot_quality=60)
+	async with await browser.new_context(config) as context:
+		page = await context.get_current_page()
+		await page.set_content(html)
+
+		state = await context.get_state(use_vision=True)
+		assert state.screenshot_mime_type == 'image/jpeg'
+		assert base64.b64decode(state.screenshot)[:2] == b'\xff\xd8'  # type: ignore
+
+	await browser.close()
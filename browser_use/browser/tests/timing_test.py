@@ -0,0 +1,56 @@
+from browser_use.browser.timing import MIN_IDLE_TIME, PageTimingModel
+
+
+def make_model(path=None) -> PageTimingModel:
+	return PageTimingModel(minimum_wait=0.5, idle_time=1.0, maximum_wait=5.0, path=path)
+
+
+def test_unknown_domain_uses_defaults():
+	timing = make_model().get('https://example.com/page')
+	assert (timing.minimum_wait, timing.idle_time) == (0.5, 1.0)
+
+
+def test_static_site_waits_shrink():
+	model = make_model()
+	idle_times = []
+	for _ in range(10):
+		model.observe('https://intranet.local/page', 0.0)
+		idle_times.append(model.get('https://intranet.local/other').idle_time)
+
+	assert idle_times == sorted(idle_times, reverse=True)
+	assert MIN_IDLE_TIME <= idle_times[-1] < 0.2
+	assert model.get('https://intranet.local/').minimum_wait == idle_times[-1]
+	# other domains are not affected
+	assert model.get('https://example.com').idle_time == 1.0
+
+
+def test_late_content_extends_waits():
+	model = make_model()
+	for _ in range(10):
+		model.observe('https://intranet.local/page', 0.0)
+	model.observe('https://intranet.local/page', 1.2)
+
+	timing = model.get('https://intranet.local/page')
+	assert timing.idle_time == 1.2 * 1.5
+	assert timing.minimum_wait == 0.5
+
+	model.observe('https://intranet.local/page', 100)
+	assert model.get('https://intranet.local/page').idle_time == 5.0
+
+
+def test_pages_without_domain_are_not_learned():
+	model = make_model()
+	model.observe('about:blank', 0.0)
+	assert model.domains == {}
+
+
+def test_timings_persist(tmp_path):
+	path = str(tmp_path / 'timings' / 'page_timing.json')
+	model = make_model(path)
+	for _ in range(10):
+		model.observe('https://intranet.local/page', 0.0)
+	model.save()
+
+	loaded = make_model(path)
+	assert loaded.get('https://intranet.local/').idle_time == model.get('https://intranet.local/').idle_time
+	assert loaded.domains['intranet.local'].samples == 10
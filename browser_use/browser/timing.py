@@ -0,0 +1,112 @@
+"""
+Per-domain page settle timing, learned from the quiet gaps after which late requests were seen
+(NetworkIdleTracker.late_gap) and optionally persisted as JSON between runs.
+"""
+
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from typing import Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Never wait for less network quiet than this
+MIN_IDLE_TIME = 0.1
+
+# Network quiet required per second of the longest observed late gap
+LATE_GAP_MARGIN = 1.5
+
+# Weight of a new observation when the gaps get shorter. Longer gaps are taken over at once,
+# missing late content is worse than waiting a bit too long.
+DECAY = 0.3
+
+
+@dataclass
+class DomainTiming:
+    # Smoothed longest quiet gap that was followed by late requests, in seconds
+    late_gap: float
+    samples: int = 0
+
+
+@dataclass
+class PageTiming:
+    minimum_wait: float
+    idle_time: float
+
+
+class PageTimingModel:
+    """
+    Learns per domain how long the network has to stay quiet before a page is settled.
+    Fast static sites shrink towards MIN_IDLE_TIME, sites that load content after quiet periods
+    get longer waits (up to `maximum_wait`). Unknown domains use the configured defaults.
+    """
+
+    def __init__(
+        self,
+        minimum_wait: float,
+        idle_time: float,
+        maximum_wait: float,
+        path: Optional[str] = None,
+    ):
+        self.minimum_wait = minimum_wait
+        self.idle_time = idle_time
+        self.maximum_wait = maximum_wait
+        self.path = path
+        self.domains: dict[str, DomainTiming] = {}
+        if path:
+            self.load()
+
+    @staticmethod
+    def _domain(url: str) -> str:
+        return urlparse(url).hostname or ""
+
+    def get(self, url: str) -> PageTiming:
+        """Waits for a page of this url"""
+        timing = self.domains.get(self._domain(url))
+        if timing is None:
+            return PageTiming(minimum_wait=self.minimum_wait, idle_time=self.idle_time)
+
+        idle_time = min(max(timing.late_gap * LATE_GAP_MARGIN, MIN_IDLE_TIME), self.maximum_wait)
+        return PageTiming(minimum_wait=min(self.minimum_wait, idle_time), idle_time=idle_time)
+
+    def observe(self, url: str, late_gap: float):
+        """Record the longest quiet gap followed by late requests after a page was considered settled"""
+        domain = self._domain(url)
+        if not domain:
+            return
+
+        timing = self.domains.get(domain)
+        if timing is None:
+            # start from the configured wait, it is only shortened gradually
+            timing = self.domains[domain] = DomainTiming(late_gap=self.idle_time / LATE_GAP_MARGIN)
+
+        if late_gap > timing.late_gap:
+            timing.late_gap = late_gap
+        else:
+            timing.late_gap += DECAY * (late_gap - timing.late_gap)
+        timing.samples += 1
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.domains = {domain: DomainTiming(**timing) for domain, timing in data.items()}
+            logger.debug(f"Loaded page timings of {len(self.domains)} domains from {self.path}")
+        except Exception as e:
+            logger.warning(f"Failed to load page timings: {str(e)}")
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            dirname = os.path.dirname(self.path)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            with open(self.path, "w") as f:
+                json.dump({domain: asdict(timing) for domain, timing in self.domains.items()}, f)
+        except Exception as e:
+            logger.warning(f"Failed to save page timings: {str(e)}")
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Optional
 
 from pydantic import BaseModel
@@ -19,25 +19,31 @@ class TabInfo(BaseModel):
 @dataclass
 class BrowserState(DOMState):
 	url: str
-	html: str
 	title: str
 	tabs: list[TabInfo]
 	screenshot: Optional[str] = None
+	screenshot_mime_type: str = field(default='image/png', kw_only=True)
+	# Only captured with BrowserContextConfig.include_page_html, serializing large pages is expensive
+	html: Optional[str] = field(default=None, kw_only=True)
+	# Seconds spent on each part of the state (dom, screenshot, title, tabs, ...) and in total
+	timings: dict[str, float] = field(default_factory=dict, kw_only=True)
 
 
 @dataclass
 class BrowserStateHistory:
 	url: str
-	html: str
 	title: str
 	tabs: list[TabInfo]
 	interacted_element: list[DOMHistoryElement | None] | list[None]
 	screenshot: Optional[str] = None
+	screenshot_mime_type: str = field(default='image/png', kw_only=True)
+	html: Optional[str] = field(default=None, kw_only=True)
 
 	def to_dict(self) -> dict[str, Any]:
 		data = {}
 		data['tabs'] = [tab.model_dump() for tab in self.tabs]
 		data['screenshot'] = self.screenshot
+		data['screenshot_mime_type'] = self.screenshot_mime_type
 		data['interacted_element'] = [
 			el.to_dict() if el else None for el in self.interacted_element
 		]
@@ -305,7 +305,9 @@ class Controller:
                 all_options = []
                 frame_index = 0
 
-                for frame in page.frames:
+                # Elements of separately extracted frames know their frame, no need to probe all of them
+                frames = [dom_element.frame] if dom_element.frame is not None else page.frames
+                for frame in frames:
                     try:
                         options = await frame.evaluate(
                             """
@@ -394,7 +396,8 @@ class Controller:
 
             try:
                 frame_index = 0
-                for frame in page.frames:
+                frames = [dom_element.frame] if dom_element.frame is not None else page.frames
+                for frame in frames:
                     try:
                         logger.debug(f"Trying frame {frame_index} URL: {frame.url}")
 
@@ -538,19 +541,24 @@ class Controller:
             e.hash.branch_path_hash for e in cached_selector_map.values()
         )
         await browser_context.remove_highlights()
+        # Only extract the state again when the page reports changes that can add elements
+        change_token = await browser_context.get_page_change_token()
 
         for i, action in enumerate(actions):
             if action.get_index() is not None and i != 0:
-                new_state = await browser_context.get_state()
-                new_path_hashes = set(
-                    e.hash.branch_path_hash for e in new_state.selector_map.values()
-                )
-                if not new_path_hashes.issubset(cached_path_hashes):
-                    # next action requires index but there are new elements on the page
-                    logger.info(
-                        f"Something new appeared after action {i } / {len(actions)}"
+                new_change_token = await browser_context.get_page_change_token()
+                if new_change_token is None or new_change_token != change_token:
+                    new_state = await browser_context.get_state()
+                    new_path_hashes = set(
+                        e.hash.branch_path_hash for e in new_state.selector_map.values()
                     )
-                    break
+                    if not new_path_hashes.issubset(cached_path_hashes):
+                        # next action requires index but there are new elements on the page
+                        logger.info(
+                            f"Something new appeared after action {i } / {len(actions)}"
+                        )
+                        break
+                    change_token = await browser_context.get_page_change_token()
 
             results.append(await self.act(action, browser_context))
 
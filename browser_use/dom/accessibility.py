@@ -0,0 +1,147 @@
+"""
+Builds a compact element tree from the CDP accessibility tree (Accessibility.getFullAXTree).
+
+Only elements with an interactive role become DOMElementNodes (with highlight indices), their
+accessible name and value become the text. Headings are kept as text for context. The result
+is much smaller than the full DOM tree, which makes it cheap for form-heavy pages.
+
+Like with the js backend, only elements that are visible on top within the viewport get highlight
+indices, and element hashes use the DOM tag path, so histories recorded with either backend match.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+from browser_use.dom.history_tree_processor.service import HistoryTreeProcessor
+from browser_use.dom.views import DOMElementNode, DOMTextNode, SelectorMap
+
+AX_INTERACTIVE_ROLES = frozenset(
+	[
+		'button', 'link', 'textbox', 'searchbox', 'checkbox', 'radio', 'combobox', 'listbox', 'option',
+		'menuitem', 'menuitemcheckbox', 'menuitemradio', 'tab', 'switch', 'slider', 'spinbutton', 'treeitem',
+	]
+)  # fmt: skip
+
+# Roles kept as plain text, to give the interactive elements some context
+AX_CONTEXT_ROLES = frozenset(['heading'])
+
+
+@dataclass
+class AXElement:
+	backend_node_id: int
+	role: str
+	name: str
+	value: str = ''
+	interactive: bool = True
+
+
+def _ax_value(node: dict, key: str) -> str:
+	value = node.get(key, {}).get('value')
+	return '' if value is None else str(value)
+
+
+def collect_ax_elements(ax_nodes: list[dict]) -> list[AXElement]:
+	"""Interactive and context nodes of an AX tree, in tree (document) order"""
+	by_id = {node['nodeId']: node for node in ax_nodes}
+	roots = [node for node in ax_nodes if not node.get('parentId')]
+
+	elements: list[AXElement] = []
+	stack = list(reversed(roots))
+	while stack:
+		node = stack.pop()
+		stack.extend(by_id[child_id] for child_id in reversed(node.get('childIds', [])) if child_id in by_id)
+
+		backend_node_id = node.get('backendDOMNodeId')
+		if node.get('ignored') or backend_node_id is None:
+			continue
+		properties = {prop['name']: prop.get('value', {}).get('value') for prop in node.get('properties', [])}
+		if properties.get('hidden'):
+			continue
+
+		role = _ax_value(node, 'role')
+		if role in AX_INTERACTIVE_ROLES:
+			elements.append(
+				AXElement(
+					backend_node_id=backend_node_id,
+					role=role,
+					name=_ax_value(node, 'name').strip(),
+					value=_ax_value(node, 'value').strip(),
+				)
+			)
+		elif role in AX_CONTEXT_ROLES and _ax_value(node, 'name').strip():
+			elements.append(
+				AXElement(
+					backend_node_id=backend_node_id,
+					role=role,
+					name=_ax_value(node, 'name').strip(),
+					interactive=False,
+				)
+			)
+	return elements
+
+
+def build_ax_tree(
+	elements: list[AXElement], descriptions: list[Optional[dict]]
+) -> tuple[DOMElementNode, SelectorMap]:
+	"""
+	Flat tree under a body node. `descriptions` holds tagName, xpath, attributes, branchPath and
+	isTopElement of the interactive elements (in the order of their highlight indices), None for
+	unresolved ones.
+	"""
+	root = DOMElementNode(
+		tag_name='body',
+		xpath='html/body',
+		pyne_selector='',
+		attributes={},
+		children=[],
+		is_visible=True,
+		parent=None,
+	)
+	selector_map: SelectorMap = {}
+
+	# highlight indices are the positions in the in-page registry, unresolved elements leave a gap
+	position = -1
+	for element in elements:
+		if not element.interactive:
+			root.children.append(DOMTextNode(text=element.name, is_visible=True, parent=root))
+			continue
+
+		position += 1
+		description = descriptions[position]
+		# native options are picked through their select (select_dropdown_option)
+		if description is None or description['tagName'] == 'option':
+			continue
+		# off-screen or covered
+		if not description['isTopElement']:
+			continue
+
+		attributes = description['attributes']
+		if 'role' not in attributes:
+			# the computed role tells the model more than the tag name for custom widgets
+			attributes = {**attributes, 'role': element.role}
+
+		node = DOMElementNode(
+			tag_name=description['tagName'],
+			xpath=description['xpath'],
+			pyne_selector='',
+			attributes=attributes,
+			children=[],
+			is_visible=True,
+			is_interactive=True,
+			is_top_element=True,
+			highlight_index=position,
+			parent=root,
+		)
+		# the element hangs directly under the root: hashes and histories use the tag path in the DOM
+		# and the attributes of the page (without the added role), as for the js backend
+		node._page_branch_path = description['branchPath']
+		node._page_attributes = description['attributes']
+		node._branch_path_hash = HistoryTreeProcessor._parent_branch_path_hash(description['branchPath'])
+		node._hash = HistoryTreeProcessor._hash_dom_element(node)
+		text = ': '.join(part for part in (element.name, element.value) if part)
+		if text:
+			node.children.append(DOMTextNode(text=text, is_visible=True, parent=node))
+		root.children.append(node)
+		selector_map[position] = node
+
+	return root, selector_map
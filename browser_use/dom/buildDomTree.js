@@ -1,766 +1,1354 @@
-(
-    doHighlightElements = true
-) => {
-    let highlightIndex = 0; // Reset highlight index
-
-    function highlightElement(element, index, parentIframe = null) {
-        // Create or get highlight container
-        let container = document.getElementById('playwright-highlight-container');
-        if (!container) {
-            container = document.createElement('div');
-            container.id = 'playwright-highlight-container';
-            container.style.position = 'fixed';
-            container.style.pointerEvents = 'none';
-            container.style.top = '0';
-            container.style.left = '0';
-            container.style.width = '100%';
-            container.style.height = '100%';
-            container.style.zIndex = '2147483647'; // Maximum z-index value
-            document.documentElement.appendChild(container);
-        }
-
-        // Generate a color based on the index
-        const colors = [
-            '#FF0000', '#00FF00', '#0000FF', '#FFA500', 
-            '#800080', '#008080', '#FF69B4', '#4B0082',
-            '#FF4500', '#2E8B57', '#DC143C', '#4682B4'
-        ];
-        const colorIndex = index % colors.length;
-        const baseColor = colors[colorIndex];
-        const backgroundColor = `${baseColor}1A`; // 10% opacity version of the color
-
-        // Create highlight overlay
-        const overlay = document.createElement('div');
-        overlay.style.position = 'absolute';
-        overlay.style.border = `2px solid ${baseColor}`;
-        overlay.style.backgroundColor = backgroundColor;
-        overlay.style.pointerEvents = 'none';
-        overlay.style.boxSizing = 'border-box';
-
-        // Position overlay based on element
-        const rect = element.getBoundingClientRect();
-        let top = rect.top;
-        let left = rect.left;
-
-        // Adjust position if element is inside an iframe
-        if (parentIframe) {
-            const iframeRect = parentIframe.getBoundingClientRect();
-            top += iframeRect.top;
-            left += iframeRect.left;
-        }
-
-        overlay.style.top = `${top}px`;
-        overlay.style.left = `${left}px`;
-        overlay.style.width = `${rect.width}px`;
-        overlay.style.height = `${rect.height}px`;
-
-        // Create label
-        const label = document.createElement('div');
-        label.className = 'playwright-highlight-label';
-        label.style.position = 'absolute';
-        label.style.background = baseColor;
-        label.style.color = 'white';
-        label.style.padding = '1px 4px';
-        label.style.borderRadius = '4px';
-        label.style.fontSize = `${Math.min(12, Math.max(8, rect.height / 2))}px`; // Responsive font size
-        label.textContent = index;
-
-        // Calculate label position
-        const labelWidth = 20; // Approximate width
-        const labelHeight = 16; // Approximate height
-        
-        // Default position (top-right corner inside the box)
-        let labelTop = top + 2;
-        let labelLeft = left + rect.width - labelWidth - 2;
-
-        // Adjust if box is too small
-        if (rect.width < labelWidth + 4 || rect.height < labelHeight + 4) {
-            // Position outside the box if it's too small
-            labelTop = top - labelHeight - 2;
-            labelLeft = left + rect.width - labelWidth;
-        }
-
-        // Ensure label stays within viewport
-        if (labelTop < 0) labelTop = top + 2;
-        if (labelLeft < 0) labelLeft = left + 2;
-        if (labelLeft + labelWidth > window.innerWidth) {
-            labelLeft = left + rect.width - labelWidth - 2;
-        }
-
-        label.style.top = `${labelTop}px`;
-        label.style.left = `${labelLeft}px`;
-
-        // Add to container
-        container.appendChild(overlay);
-        container.appendChild(label);
-
-        // Store reference for cleanup
-        element.setAttribute('browser-user-highlight-id', `playwright-highlight-${index}`);
-
-        return index + 1;
+// Installs the DOM extractor as window.__browserUse.extract(args).
+// window.__browserUse also keeps the page-level state that survives between extractions
+// (observer, node ids, highlighted elements).
+// Registered once per context as an init script; DomService only calls the entry point.
+(() => {
+    const browserUse = window.__browserUse = window.__browserUse || {};
+    if (browserUse.extract) return;
+
+    // Elements marked with browser-user-highlight-id by the last highlighting
+    browserUse.marked = [];
+
+    // Removes the highlight layer and the marks, O(highlighted elements) instead of a document scan
+    browserUse.removeHighlights = () => {
+        document.getElementById('playwright-highlight-container')?.remove();
+        for (const element of browserUse.marked) {
+            element.removeAttribute('browser-user-highlight-id');
+        }
+        browserUse.marked = [];
+    };
+
+    function isHighlightNode(node) {
+        return node?.nodeType === Node.ELEMENT_NODE &&
+            (node.id === 'playwright-highlight-container' ||
+                node.closest?.('#playwright-highlight-container') !== null);
     }
 
+    // Mutations caused by highlightElement / remove_highlights must not invalidate the cache
+    function isOwnMutation(record) {
+        if (record.type === 'attributes') {
+            return record.attributeName === 'browser-user-highlight-id' || isHighlightNode(record.target);
+        }
+        if (record.type === 'childList') {
+            if (isHighlightNode(record.target)) return true;
+            const nodes = [...record.addedNodes, ...record.removedNodes];
+            return nodes.length > 0 && nodes.every(isHighlightNode);
+        }
+        return false;
+    }
 
-    // Helper function to generate XPath as a tree
-    function getXPathTree(element, stopAtBoundary = true) {
-        const segments = [];
-        let currentElement = element;
+    // Cheap upper bound of the interactive elements of a subtree
+    const INTERACTIVE_CANDIDATES_SELECTOR = [
+        'a', 'button', 'input', 'select', 'textarea', 'summary', 'details',
+        '[role="button"]', '[role="link"]', '[role="checkbox"]', '[role="radio"]',
+        '[role="tab"]', '[role="menuitem"]', '[role="option"]', '[role="combobox"]',
+        '[tabindex]:not([tabindex="-1"])', '[onclick]'
+    ].join(', ');
+
+    // Counts changes that can make new elements appear: added elements, attributes that show or
+    // hide the content of a container or reveal an interactive leaf, revealing events and
+    // same-document navigations. A new document gets a new docId. Controller.multi_act compares
+    // changeToken() before and after an action and only extracts the full state again if it differs.
+    const REVEALING_ATTRIBUTES = ['class', 'style', 'hidden', 'open', 'aria-hidden', 'aria-expanded'];
+    const LEAF_REVEALING_ATTRIBUTES = ['class', 'style', 'hidden'];
+    browserUse.docId = Math.random().toString(36).slice(2);
+    browserUse.changes = 0;
+
+    let registered = null;
+    let registeredFrom = null;
+
+    // A leaf that is an interactive candidate, visible now and not part of the last extraction.
+    // Attribute changes of elements the agent works with (e.g. validation classes of filled
+    // inputs) reveal nothing.
+    function isRevealedLeaf(element) {
+        if (!element.matches(INTERACTIVE_CANDIDATES_SELECTOR)) return false;
+        if (registeredFrom !== browserUse.elements) {
+            registeredFrom = browserUse.elements;
+            registered = new Set(registeredFrom || []);
+        }
+        if (registered.has(element)) return false;
+        return element.checkVisibility
+            ? element.checkVisibility({ checkOpacity: true, checkVisibilityCSS: true })
+            : element.getClientRects().length > 0;
+    }
 
-        while (currentElement && currentElement.nodeType === Node.ELEMENT_NODE) {
-            // Stop if we hit a shadow root or iframe
-            if (stopAtBoundary && (currentElement.parentNode instanceof ShadowRoot || currentElement.parentNode instanceof HTMLIFrameElement)) {
-                break;
+    function recordChanges(records) {
+        for (const record of records) {
+            if (isOwnMutation(record)) continue;
+            if (record.type === 'childList') {
+                if ([...record.addedNodes].some(node => node.nodeType === Node.ELEMENT_NODE)) {
+                    browserUse.changes++;
+                    return;
+                }
+            } else if (record.target.firstElementChild ||
+                (LEAF_REVEALING_ATTRIBUTES.includes(record.attributeName) && isRevealedLeaf(record.target))) {
+                browserUse.changes++;
+                return;
             }
+        }
+    }
+
+    // Events after which elements can appear without any DOM mutation: scrolling and resizing,
+    // checked / selected state (`input:checked + .menu`), transitions and animations that show
+    // something. Typing, focus changes and focus ring transitions leave the token as it is, so
+    // chained fills are not cut short.
+    const REVEALING_EVENTS = ['popstate', 'hashchange', 'scroll', 'resize', 'animationend'];
+    const REVEALING_TRANSITIONS = [
+        'opacity', 'visibility', 'display', 'transform', 'height', 'max-height', 'width', 'max-width',
+        'top', 'right', 'bottom', 'left', 'inset', 'clip-path',
+    ];
+    const countChange = () => browserUse.changes++;
+    for (const type of REVEALING_EVENTS) {
+        window.addEventListener(type, countChange, { capture: true, passive: true });
+    }
+    window.addEventListener('change', event => {
+        const target = event.target;
+        if (target instanceof HTMLSelectElement ||
+            (target instanceof HTMLInputElement && (target.type === 'checkbox' || target.type === 'radio'))) {
+            countChange();
+        }
+    }, { capture: true, passive: true });
+    window.addEventListener('transitionend', event => {
+        if (REVEALING_TRANSITIONS.includes(event.propertyName)) countChange();
+    }, { capture: true, passive: true });
+
+    // Events after which the layout read by the last extraction can be outdated, see ensureObserver
+    const LAYOUT_EVENTS = [
+        'scroll', 'resize', 'load', 'change', 'input', 'focusin', 'focusout', 'transitionend', 'animationend',
+    ];
+
+    for (const method of ['pushState', 'replaceState']) {
+        const original = history[method];
+        history[method] = function (...args) {
+            countChange();
+            return original.apply(this, args);
+        };
+    }
 
-            let index = 0;
-            let sibling = currentElement.previousSibling;
-            while (sibling) {
-                if (sibling.nodeType === Node.ELEMENT_NODE &&
-                    sibling.nodeName === currentElement.nodeName) {
-                    index++;
+    // The observer starts with the first call, i.e. when the state the token is compared to was taken
+    browserUse.changeToken = () => {
+        if (!browserUse.changeObserver) {
+            browserUse.changeObserver = new MutationObserver(recordChanges);
+            browserUse.changeObserver.observe(document, {
+                childList: true,
+                subtree: true,
+                attributes: true,
+                attributeFilter: REVEALING_ATTRIBUTES,
+            });
+        }
+        recordChanges(browserUse.changeObserver.takeRecords());
+        return `${browserUse.docId}:${browserUse.changes}`;
+    };
+
+    // Highlighted element of the last extraction (or registration) by highlight index, null if it
+    // is gone or is not a `tagName` element (e.g. the index belongs to an older state)
+    browserUse.elementAt = (index, tagName = null) => {
+        const element = browserUse.elements?.[index - (browserUse.indexOffset || 0)];
+        if (!element?.isConnected) return null;
+        if (tagName && element.tagName.toLowerCase() !== tagName) return null;
+        return element;
+    };
+
+    browserUse.extract = (
+        args = {
+            doHighlightElements: true,
+            sinceVersion: null,
+            wireFormat: 'nested',
+            viewportExpansion: null,
+            includeIframes: true,
+            registerElements: null,
+            describeElements: false,
+        }
+    ) => {
+        const {
+            doHighlightElements = true,
+            sinceVersion = null,
+            wireFormat = 'nested',
+            viewportExpansion = null,
+            // false when DomService extracts every frame on its own, iframes are then left empty
+            includeIframes = true,
+            // elements found by the CDP snapshot backend of DomService, by highlight index
+            registerElements = null,
+            // with registerElements: return tag name, xpath, attributes, branch path and visibility
+            // of the registered elements
+            describeElements = false,
+        } = args;
+        let highlightIndex = 0; // Reset highlight index
+        let nextNodeId = 0; // Pre-order id of every serialized node, mirrored by DomService
+
+        // Interactive elements skipped because they are further than viewportExpansion px off-screen
+        const offscreen = { above: 0, below: 0 };
+
+        // Attribute changes that can alter visibility, layout or interactivity of an element.
+        // They cannot be patched into the cached tree and force a full extraction.
+        const STRUCTURAL_ATTRIBUTES = new Set([
+            'class', 'style', 'hidden', 'open', 'id', 'type', 'disabled',
+            'role', 'aria-role', 'tabindex', 'aria-hidden', 'aria-expanded',
+            'aria-pressed', 'aria-selected', 'aria-checked', 'draggable',
+            'contenteditable', 'onclick', 'ng-click', '@click', 'v-on:click',
+            'data-action', 'src', 'width', 'height'
+        ]);
+
+        function recordMutations(observer, records) {
+            let changed = false;
+            for (const record of records) {
+                if (isOwnMutation(record)) continue;
+                changed = true;
+                if (observer.full) continue;
+
+                if (record.type === 'attributes') {
+                    if (STRUCTURAL_ATTRIBUTES.has(record.attributeName) || !observer.nodeIds.has(record.target)) {
+                        observer.full = true;
+                    } else {
+                        observer.changedElements.add(record.target);
+                    }
+                } else if (record.type === 'characterData') {
+                    if (!observer.nodeIds.has(record.target)) {
+                        observer.full = true;
+                    } else {
+                        observer.changedTexts.add(record.target);
+                    }
+                } else {
+                    // Added or removed nodes shift highlight indices and top-element checks
+                    observer.full = true;
                 }
-                sibling = sibling.previousSibling;
             }
+            if (changed) observer.version++;
+        }
 
-            const tagName = currentElement.nodeName.toLowerCase();
-            const xpathIndex = index > 0 ? `[${index + 1}]` : '';
-            segments.unshift(`${tagName}${xpathIndex}`);
+        // Installs one MutationObserver per document, shared by all later extractions
+        function ensureObserver(doc) {
+            const observer = browserUse.observer = browserUse.observer || {
+                docId: Math.random().toString(36).slice(2),
+                version: 0,
+                baseVersion: 0,
+                full: true,
+                nodeIds: new WeakMap(),
+                changedElements: new Set(),
+                changedTexts: new Set(),
+                observedDocs: new WeakSet(),
+                observers: [],
+            };
+            if (observer.observedDocs.has(doc)) return observer;
+
+            const mutationObserver = new MutationObserver(records => recordMutations(observer, records));
+            mutationObserver.observe(doc, {
+                childList: true,
+                subtree: true,
+                attributes: true,
+                characterData: true,
+            });
+            observer.observedDocs.add(doc);
+            observer.observers.push(mutationObserver);
+
+            // Scrolling, resizing, late resource loads and CSS-only reveals (:checked, :focus-within,
+            // transitions and animations) change visibility without any DOM mutation
+            const markLayoutDirty = () => {
+                observer.version++;
+                observer.full = true;
+            };
+            for (const type of LAYOUT_EVENTS) {
+                doc.defaultView?.addEventListener(type, markLayoutDirty, { capture: true, passive: true });
+            }
+            return observer;
+        }
 
-            currentElement = currentElement.parentNode;
+        function flushMutations(observer) {
+            for (const mutationObserver of observer.observers) {
+                recordMutations(observer, mutationObserver.takeRecords());
+            }
         }
 
-        return segments.join('/');
-    }
+        function resetObserver(observer) {
+            observer.baseVersion = observer.version;
+            observer.full = false;
+            observer.changedElements.clear();
+            observer.changedTexts.clear();
+        }
 
-    // Helper function to check if element is accepted
-    function isElementAccepted(element) {
-        const leafElementDenyList = new Set(['svg', 'script', 'style', 'link', 'meta']);
-        return !leafElementDenyList.has(element.tagName.toLowerCase());
-    }
+        // Collects the attribute and text changes since the last extraction.
+        // Returns null if a change cannot be expressed as a patch.
+        function buildPatch(observer) {
+            const attributes = [];
+            for (const element of observer.changedElements) {
+                if (!element.isConnected) return null;
+                attributes.push([observer.nodeIds.get(element), getAttributes(element)]);
+            }
 
-    // Helper function to check if element is interactive
-    function isInteractiveElement(element) {
-        // Base interactive elements and roles
-        const interactiveElements = new Set([
-            'a', 'button', 'details', 'embed', 'input', 'label',
-            'menu', 'menuitem', 'object', 'select', 'textarea', 'summary'
-        ]);
+            const texts = [];
+            for (const textNode of observer.changedTexts) {
+                if (!textNode.isConnected) return null;
+                const textContent = textNode.textContent.trim();
+                if (!textContent) return null;
+                texts.push([observer.nodeIds.get(textNode), textContent]);
+            }
 
-        const interactiveRoles = new Set([
-            'button', 'menu', 'menuitem', 'link', 'checkbox', 'radio',
-            'slider', 'tab', 'tabpanel', 'textbox', 'combobox', 'grid',
-            'listbox', 'option', 'progressbar', 'scrollbar', 'searchbox',
-            'switch', 'tree', 'treeitem', 'spinbutton', 'tooltip', 'a-button-inner', 'a-dropdown-button', 'click',
-            'menuitemcheckbox', 'menuitemradio', 'a-button-text', 'button-text', 'button-icon', 'button-icon-only', 'button-text-icon-only', 'dropdown', 'combobox' 
-        ]);
+            return { attributes, texts };
+        }
 
-        const tagName = element.tagName.toLowerCase();
-        const role = element.getAttribute('role');
-        const ariaRole = element.getAttribute('aria-role');
-        const tabIndex = element.getAttribute('tabindex');
-
-        // Basic role/attribute checks
-        const hasInteractiveRole = interactiveElements.has(tagName) ||
-            interactiveRoles.has(role) ||
-            interactiveRoles.has(ariaRole) ||
-            (tabIndex !== null && tabIndex !== '-1') ||
-            element.getAttribute('data-action') === 'a-dropdown-select' ||
-            element.getAttribute('data-action') === 'a-dropdown-button';
-
-        if (hasInteractiveRole) return true;
-
-        // Get computed style
-        const style = window.getComputedStyle(element);
-
-        // Check if element has click-like styling
-        // const hasClickStyling = style.cursor === 'pointer' ||
-        //     element.style.cursor === 'pointer' ||
-        //     style.pointerEvents !== 'none';
-
-        // Check for event listeners
-        const hasClickHandler = element.onclick !== null ||
-            element.getAttribute('onclick') !== null ||
-            element.hasAttribute('ng-click') ||
-            element.hasAttribute('@click') ||
-            element.hasAttribute('v-on:click');
-
-        // Helper function to safely get event listeners
-        function getEventListeners(el) {
-            try {
-                // Try to get listeners using Chrome DevTools API
-                return window.getEventListeners?.(el) || {};
-            } catch (e) {
-                // Fallback: check for common event properties
-                const listeners = {};
-
-                // List of common event types to check
-                const eventTypes = [
-                    'click', 'mousedown', 'mouseup',
-                    'touchstart', 'touchend',
-                    'keydown', 'keyup', 'focus', 'blur'
-                ];
-
-                for (const type of eventTypes) {
-                    const handler = el[`on${type}`];
-                    if (handler) {
-                        listeners[type] = [{
-                            listener: handler,
-                            useCapture: false
-                        }];
+        function redrawHighlights() {
+            const offset = browserUse.indexOffset || 0;
+            (browserUse.elements || []).forEach((element, index) => {
+                if (!element?.isConnected) return;
+                const parentIframe = element.ownerDocument !== document
+                    ? element.ownerDocument.defaultView?.frameElement
+                    : null;
+                highlightElement(element, index + offset, parentIframe);
+            });
+        }
+
+        function getAttributes(element) {
+            const attributes = {};
+            // Use getAttributeNames() instead of directly iterating attributes
+            const attributeNames = element.getAttributeNames?.() || [];
+            for (const name of attributeNames) {
+                attributes[name] = element.getAttribute(name);
+            }
+            return attributes;
+        }
+
+        // Highlights are only queued while the tree is read and drawn at the end in one batch,
+        // so style / layout is not invalidated between the reads of the extraction
+        const pendingHighlights = [];
+
+        function highlightElement(element, index, parentIframe = null) {
+            pendingHighlights.push([element, index, parentIframe]);
+        }
+
+        // Single layer for all highlights of this document, created on first use
+        function getHighlightCanvas() {
+            let container = document.getElementById('playwright-highlight-container');
+            let canvas = container?.querySelector('canvas');
+            if (!canvas) {
+                container?.remove();
+                container = document.createElement('div');
+                container.id = 'playwright-highlight-container';
+                container.style.position = 'fixed';
+                container.style.pointerEvents = 'none';
+                container.style.top = '0';
+                container.style.left = '0';
+                container.style.width = '100%';
+                container.style.height = '100%';
+                container.style.zIndex = '2147483647'; // Maximum z-index value
+
+                const ratio = window.devicePixelRatio || 1;
+                canvas = document.createElement('canvas');
+                canvas.width = Math.ceil(window.innerWidth * ratio);
+                canvas.height = Math.ceil(window.innerHeight * ratio);
+                canvas.style.width = `${window.innerWidth}px`;
+                canvas.style.height = `${window.innerHeight}px`;
+                canvas.getContext('2d').scale(ratio, ratio);
+                container.appendChild(canvas);
+                document.documentElement.appendChild(container);
+            }
+            return { canvas, context: canvas.getContext('2d') };
+        }
+
+        function renderHighlights() {
+            if (pendingHighlights.length === 0) return;
+
+            // Generate a color based on the index
+            const colors = [
+                '#FF0000', '#00FF00', '#0000FF', '#FFA500', 
+                '#800080', '#008080', '#FF69B4', '#4B0082',
+                '#FF4500', '#2E8B57', '#DC143C', '#4682B4'
+            ];
+            const labelWidth = 20; // Approximate width
+            const labelHeight = 16; // Approximate height
+
+            // Read phase: positions of all highlights, mostly already cached by the extraction
+            const viewportWidth = window.innerWidth;
+            const boxes = pendingHighlights.map(([element, index, parentIframe]) => {
+                const rect = getCachedRect(element);
+                let top = rect.top;
+                let left = rect.left;
+
+                // Adjust position if element is inside an iframe
+                if (parentIframe) {
+                    const iframeRect = getCachedRect(parentIframe);
+                    top += iframeRect.top;
+                    left += iframeRect.left;
+                }
+                return { element, index, top, left, width: rect.width, height: rect.height };
+            });
+
+            // Write phase: everything is drawn on one canvas, instead of two positioned divs per element
+            const { canvas, context } = getHighlightCanvas();
+            for (const { element, index, top, left, width, height } of boxes) {
+                const baseColor = colors[index % colors.length];
+                const backgroundColor = `${baseColor}1A`; // 10% opacity version of the color
+
+                // Highlight box
+                context.fillStyle = backgroundColor;
+                context.fillRect(left, top, width, height);
+                context.strokeStyle = baseColor;
+                context.lineWidth = 2;
+                context.strokeRect(left + 1, top + 1, Math.max(0, width - 2), Math.max(0, height - 2));
+
+                // Default position (top-right corner inside the box)
+                let labelTop = top + 2;
+                let labelLeft = left + width - labelWidth - 2;
+
+                // Adjust if box is too small
+                if (width < labelWidth + 4 || height < labelHeight + 4) {
+                    // Position outside the box if it's too small
+                    labelTop = top - labelHeight - 2;
+                    labelLeft = left + width - labelWidth;
+                }
+
+                // Ensure label stays within viewport
+                if (labelTop < 0) labelTop = top + 2;
+                if (labelLeft < 0) labelLeft = left + 2;
+                if (labelLeft + labelWidth > viewportWidth) {
+                    labelLeft = left + width - labelWidth - 2;
+                }
+
+                // Label
+                const fontSize = Math.min(12, Math.max(8, height / 2)); // Responsive font size
+                context.font = `${fontSize}px sans-serif`;
+                const labelText = String(index);
+                const labelBoxWidth = Math.max(labelWidth, context.measureText(labelText).width + 8);
+                context.fillStyle = baseColor;
+                context.fillRect(labelLeft, labelTop, labelBoxWidth, labelHeight);
+                context.fillStyle = 'white';
+                context.textBaseline = 'middle';
+                context.fillText(labelText, labelLeft + 4, labelTop + labelHeight / 2);
+
+                // Store reference for cleanup, tracked so removing the marks does not scan the document
+                element.setAttribute('browser-user-highlight-id', `playwright-highlight-${index}`);
+                browserUse.marked.push(element);
+            }
+
+            stats.highlights += pendingHighlights.length;
+            pendingHighlights.length = 0;
+        }
+
+        // Computed styles and rects are read several times per element (visibility, top element,
+        // viewport and interactivity checks); cache them for the duration of one extraction.
+        // The counters are exposed as window.__browserUse.stats for profiling.
+        const styleCache = new WeakMap();
+        const rectCache = new WeakMap();
+        const parentVisibilityCache = new WeakMap();
+        const stats = { styleReads: 0, rectReads: 0, cacheHits: 0, highlights: 0, readMs: 0, writeMs: 0 };
+
+        function getCachedStyle(element) {
+            let style = styleCache.get(element);
+            if (style === undefined) {
+                style = window.getComputedStyle(element);
+                styleCache.set(element, style);
+                stats.styleReads++;
+            } else {
+                stats.cacheHits++;
+            }
+            return style;
+        }
+
+        function getCachedRect(element) {
+            let rect = rectCache.get(element);
+            if (rect === undefined) {
+                rect = element.getBoundingClientRect();
+                rectCache.set(element, rect);
+                stats.rectReads++;
+            } else {
+                stats.cacheHits++;
+            }
+            return rect;
+        }
+
+        // Helper function to generate XPath as a tree
+        function getXPathTree(element, stopAtBoundary = true) {
+            const segments = [];
+            let currentElement = element;
+
+            while (currentElement && currentElement.nodeType === Node.ELEMENT_NODE) {
+                // Stop if we hit a shadow root or iframe
+                if (stopAtBoundary && (currentElement.parentNode instanceof ShadowRoot || currentElement.parentNode instanceof HTMLIFrameElement)) {
+                    break;
+                }
+
+                let index = 0;
+                let sibling = currentElement.previousSibling;
+                while (sibling) {
+                    if (sibling.nodeType === Node.ELEMENT_NODE &&
+                        sibling.nodeName === currentElement.nodeName) {
+                        index++;
                     }
+                    sibling = sibling.previousSibling;
                 }
 
-                return listeners;
+                const tagName = currentElement.nodeName.toLowerCase();
+                const xpathIndex = index > 0 ? `[${index + 1}]` : '';
+                segments.unshift(`${tagName}${xpathIndex}`);
+
+                currentElement = currentElement.parentNode;
             }
+
+            return segments.join('/');
         }
 
-        // Check for click-related events on the element itself
-        const listeners = getEventListeners(element);
-        const hasClickListeners = listeners && (
-            listeners.click?.length > 0 ||
-            listeners.mousedown?.length > 0 ||
-            listeners.mouseup?.length > 0 ||
-            listeners.touchstart?.length > 0 ||
-            listeners.touchend?.length > 0
-        );
+        // Helper function to check if element is accepted
+        function isElementAccepted(element) {
+            const leafElementDenyList = new Set(['svg', 'script', 'style', 'link', 'meta']);
+            return !leafElementDenyList.has(element.tagName.toLowerCase());
+        }
 
-        // Check for ARIA properties that suggest interactivity
-        const hasAriaProps = element.hasAttribute('aria-expanded') ||
-            element.hasAttribute('aria-pressed') ||
-            element.hasAttribute('aria-selected') ||
-            element.hasAttribute('aria-checked');
+        // Helper function to check if element is interactive
+        function isInteractiveElement(element) {
+            // Base interactive elements and roles
+            const interactiveElements = new Set([
+                'a', 'button', 'details', 'embed', 'input', 'label',
+                'menu', 'menuitem', 'object', 'select', 'textarea', 'summary'
+            ]);
+
+            const interactiveRoles = new Set([
+                'button', 'menu', 'menuitem', 'link', 'checkbox', 'radio',
+                'slider', 'tab', 'tabpanel', 'textbox', 'combobox', 'grid',
+                'listbox', 'option', 'progressbar', 'scrollbar', 'searchbox',
+                'switch', 'tree', 'treeitem', 'spinbutton', 'tooltip', 'a-button-inner', 'a-dropdown-button', 'click',
+                'menuitemcheckbox', 'menuitemradio', 'a-button-text', 'button-text', 'button-icon', 'button-icon-only', 'button-text-icon-only', 'dropdown', 'combobox' 
+            ]);
+
+            const tagName = element.tagName.toLowerCase();
+            const role = element.getAttribute('role');
+            const ariaRole = element.getAttribute('aria-role');
+            const tabIndex = element.getAttribute('tabindex');
+
+            // Basic role/attribute checks
+            const hasInteractiveRole = interactiveElements.has(tagName) ||
+                interactiveRoles.has(role) ||
+                interactiveRoles.has(ariaRole) ||
+                (tabIndex !== null && tabIndex !== '-1') ||
+                element.getAttribute('data-action') === 'a-dropdown-select' ||
+                element.getAttribute('data-action') === 'a-dropdown-button';
+
+            if (hasInteractiveRole) return true;
+
+            // Get computed style
+            const style = getCachedStyle(element);
+
+            // Check if element has click-like styling
+            // const hasClickStyling = style.cursor === 'pointer' ||
+            //     element.style.cursor === 'pointer' ||
+            //     style.pointerEvents !== 'none';
+
+            // Check for event listeners
+            const hasClickHandler = element.onclick !== null ||
+                element.getAttribute('onclick') !== null ||
+                element.hasAttribute('ng-click') ||
+                element.hasAttribute('@click') ||
+                element.hasAttribute('v-on:click');
+
+            // Helper function to safely get event listeners
+            function getEventListeners(el) {
+                try {
+                    // Try to get listeners using Chrome DevTools API
+                    return window.getEventListeners?.(el) || {};
+                } catch (e) {
+                    // Fallback: check for common event properties
+                    const listeners = {};
+
+                    // List of common event types to check
+                    const eventTypes = [
+                        'click', 'mousedown', 'mouseup',
+                        'touchstart', 'touchend',
+                        'keydown', 'keyup', 'focus', 'blur'
+                    ];
+
+                    for (const type of eventTypes) {
+                        const handler = el[`on${type}`];
+                        if (handler) {
+                            listeners[type] = [{
+                                listener: handler,
+                                useCapture: false
+                            }];
+                        }
+                    }
+
+                    return listeners;
+                }
+            }
 
-        // Check for form-related functionality
-        const isFormRelated = element.form !== undefined ||
-            element.hasAttribute('contenteditable') ||
-            style.userSelect !== 'none';
+            // Check for click-related events on the element itself
+            const listeners = getEventListeners(element);
+            const hasClickListeners = listeners && (
+                listeners.click?.length > 0 ||
+                listeners.mousedown?.length > 0 ||
+                listeners.mouseup?.length > 0 ||
+                listeners.touchstart?.length > 0 ||
+                listeners.touchend?.length > 0
+            );
 
-        // Check if element is draggable
-        const isDraggable = element.draggable ||
-            element.getAttribute('draggable') === 'true';
+            // Check for ARIA properties that suggest interactivity
+            const hasAriaProps = element.hasAttribute('aria-expanded') ||
+                element.hasAttribute('aria-pressed') ||
+                element.hasAttribute('aria-selected') ||
+                element.hasAttribute('aria-checked');
 
-        return hasAriaProps ||
-            // hasClickStyling ||
-            hasClickHandler ||
-            hasClickListeners ||
-            // isFormRelated ||
-            isDraggable;
+            // Check for form-related functionality
+            const isFormRelated = element.form !== undefined ||
+                element.hasAttribute('contenteditable') ||
+                style.userSelect !== 'none';
 
-    }
+            // Check if element is draggable
+            const isDraggable = element.draggable ||
+                element.getAttribute('draggable') === 'true';
 
-    // Helper function to check if element is visible
-    function isElementVisible(element) {
-        const style = window.getComputedStyle(element);
-        return element.offsetWidth > 0 &&
-            element.offsetHeight > 0 &&
-            style.visibility !== 'hidden' &&
-            style.display !== 'none';
-    }
+            return hasAriaProps ||
+                // hasClickStyling ||
+                hasClickHandler ||
+                hasClickListeners ||
+                // isFormRelated ||
+                isDraggable;
 
-    // Helper function to check if element is the top element at its position
-    function isTopElement(element) {
-        // Find the correct document context and root element
-        let doc = element.ownerDocument;
+        }
 
-        // If we're in an iframe, elements are considered top by default
-        if (doc !== window.document) {
-            return true;
+        // Helper function to check if element is visible
+        function isElementVisible(element) {
+            const style = getCachedStyle(element);
+            return element.offsetWidth > 0 &&
+                element.offsetHeight > 0 &&
+                style.visibility !== 'hidden' &&
+                style.display !== 'none';
         }
 
-        // For shadow DOM, we need to check within its own root context
-        const shadowRoot = element.getRootNode();
-        if (shadowRoot instanceof ShadowRoot) {
-            const rect = element.getBoundingClientRect();
+        // Helper function to check if element is the top element at its position
+        function isTopElement(element) {
+            // Find the correct document context and root element
+            let doc = element.ownerDocument;
+
+            // If we're in an iframe, elements are considered top by default
+            if (doc !== window.document) {
+                return true;
+            }
+
+            // For shadow DOM, we need to check within its own root context
+            const shadowRoot = element.getRootNode();
+            if (shadowRoot instanceof ShadowRoot) {
+                const rect = getCachedRect(element);
+                const point = { x: rect.left + rect.width / 2, y: rect.top + rect.height / 2 };
+
+                try {
+                    // Use shadow root's elementFromPoint to check within shadow DOM context
+                    const topEl = shadowRoot.elementFromPoint(point.x, point.y);
+                    if (!topEl) return false;
+
+                    // Check if the element or any of its parents match our target element
+                    let current = topEl;
+                    while (current && current !== shadowRoot) {
+                        if (current === element) return true;
+                        current = current.parentElement;
+                    }
+                    return false;
+                } catch (e) {
+                    return true; // If we can't determine, consider it visible
+                }
+            }
+
+            // Regular DOM elements
+            const rect = getCachedRect(element);
             const point = { x: rect.left + rect.width / 2, y: rect.top + rect.height / 2 };
 
             try {
-                // Use shadow root's elementFromPoint to check within shadow DOM context
-                const topEl = shadowRoot.elementFromPoint(point.x, point.y);
+                const topEl = document.elementFromPoint(point.x, point.y);
                 if (!topEl) return false;
 
-                // Check if the element or any of its parents match our target element
                 let current = topEl;
-                while (current && current !== shadowRoot) {
+                while (current && current !== document.documentElement) {
                     if (current === element) return true;
                     current = current.parentElement;
                 }
                 return false;
             } catch (e) {
-                return true; // If we can't determine, consider it visible
+                return true;
             }
         }
 
-        // Regular DOM elements
-        const rect = element.getBoundingClientRect();
-        const point = { x: rect.left + rect.width / 2, y: rect.top + rect.height / 2 };
-
-        try {
-            const topEl = document.elementFromPoint(point.x, point.y);
-            if (!topEl) return false;
+        // Helper function to check if text node is visible
+        // One range is reused for all text nodes, sibling texts share the parent visibility check
+        let textRange = null;
+        function isTextNodeVisible(textNode) {
+            textRange = textRange || document.createRange();
+            textRange.selectNodeContents(textNode);
+            const rect = textRange.getBoundingClientRect();
+            stats.rectReads++;
+
+            return rect.width !== 0 &&
+                rect.height !== 0 &&
+                rect.top >= 0 &&
+                rect.top <= window.innerHeight &&
+                isParentVisible(textNode.parentElement);
+        }
 
-            let current = topEl;
-            while (current && current !== document.documentElement) {
-                if (current === element) return true;
-                current = current.parentElement;
+        function isParentVisible(parent) {
+            if (!parent) return undefined;
+            let visible = parentVisibilityCache.get(parent);
+            if (visible === undefined) {
+                visible = parent.checkVisibility({
+                    checkOpacity: true,
+                    checkVisibilityCSS: true
+                });
+                parentVisibilityCache.set(parent, visible);
+            } else {
+                stats.cacheHits++;
             }
-            return false;
-        } catch (e) {
-            return true;
+            return visible;
         }
-    }
 
-    // Helper function to check if text node is visible
-    function isTextNodeVisible(textNode) {
-        const range = document.createRange();
-        range.selectNodeContents(textNode);
-        const rect = range.getBoundingClientRect();
-
-        return rect.width !== 0 &&
-            rect.height !== 0 &&
-            rect.top >= 0 &&
-            rect.top <= window.innerHeight &&
-            textNode.parentElement?.checkVisibility({
-                checkOpacity: true,
-                checkVisibilityCSS: true
-            });
-    }
 
+        // -1 if the element is entirely above the viewport extended by viewportExpansion,
+        // 1 if it is entirely below, 0 otherwise. Only applies to the top level document.
+        function getViewportPosition(element) {
+            if (element.ownerDocument !== document) return 0;
 
-    // Function to traverse the DOM and create nested JSON
-    function buildDomTree(node, parentIframe = null) {
-        if (!node) return null;
+            const rect = getCachedRect(element);
+            // Zero sized wrappers (e.g. display: contents) can still have visible children
+            if (rect.width === 0 && rect.height === 0) return 0;
 
-        // Special case for text nodes
-        if (node.nodeType === Node.TEXT_NODE) {
-            const textContent = node.textContent.trim();
-            if (textContent && isTextNodeVisible(node)) {
-                return {
-                    type: "TEXT_NODE",
-                    text: textContent,
-                    isVisible: true,
-                };
-            }
-            return null;
+            if (rect.bottom < -viewportExpansion) return -1;
+            if (rect.top > window.innerHeight + viewportExpansion) return 1;
+            return 0;
         }
 
-        // Check if element is accepted
-        if (node.nodeType === Node.ELEMENT_NODE && !isElementAccepted(node)) {
-            return null;
+        // Cheap upper bound of the interactive elements in a skipped subtree
+        function countInteractiveCandidates(element) {
+            return element.querySelectorAll(INTERACTIVE_CANDIDATES_SELECTOR).length +
+                (element.matches(INTERACTIVE_CANDIDATES_SELECTOR) ? 1 : 0);
         }
 
-        const nodeData = {
-            tagName: node.tagName ? node.tagName.toLowerCase() : null,
-            attributes: {},
-            xpath: node.nodeType === Node.ELEMENT_NODE ? getXPathTree(node, true) : null,
-            children: [],
-            pyneSelector: "",
-        };
+        // Function to traverse the DOM and create nested JSON
+        function buildDomTree(node, parentIframe = null) {
+            if (!node) return null;
+
+            // Special case for text nodes
+            if (node.nodeType === Node.TEXT_NODE) {
+                const textContent = node.textContent.trim();
+                if (textContent && isTextNodeVisible(node)) {
+                    observer.nodeIds.set(node, nextNodeId++);
+                    return {
+                        type: "TEXT_NODE",
+                        text: textContent,
+                        isVisible: true,
+                    };
+                }
+                return null;
+            }
 
-        // Copy all attributes if the node is an element
-        if (node.nodeType === Node.ELEMENT_NODE && node.attributes) {
-            // Use getAttributeNames() instead of directly iterating attributes
-            const attributeNames = node.getAttributeNames?.() || [];
-            for (const name of attributeNames) {
-                nodeData.attributes[name] = node.getAttribute(name);
+            // Check if element is accepted
+            if (node.nodeType === Node.ELEMENT_NODE && !isElementAccepted(node)) {
+                return null;
             }
-        }
 
-        if (node.nodeType === Node.ELEMENT_NODE) {
-            const isInteractive = isInteractiveElement(node);
-            const isVisible = isElementVisible(node);
-            const isTop = isTopElement(node);
+            // Only summarize subtrees that are entirely above or below the extended viewport
+            if (viewportExpansion !== null && node.nodeType === Node.ELEMENT_NODE) {
+                const position = getViewportPosition(node);
+                if (position !== 0) {
+                    const count = countInteractiveCandidates(node);
+                    if (position < 0) {
+                        offscreen.above += count;
+                    } else {
+                        offscreen.below += count;
+                    }
+                    return null;
+                }
+            }
 
-            nodeData.isInteractive = isInteractive;
-            nodeData.isVisible = isVisible;
-            nodeData.isTopElement = isTop;
+            observer.nodeIds.set(node, nextNodeId++);
 
-            // Highlight if element meets all criteria and highlighting is enabled
-            if (isInteractive && isVisible && isTop) {
-                nodeData.highlightIndex = highlightIndex++;
-                if (doHighlightElements) {
-                    highlightElement(node, nodeData.highlightIndex, parentIframe);
-                    nodeData.pyneSelector = generateSelector(node);
+            const nodeData = {
+                tagName: node.tagName ? node.tagName.toLowerCase() : null,
+                attributes: {},
+                xpath: node.nodeType === Node.ELEMENT_NODE ? getXPathTree(node, true) : null,
+                children: [],
+                pyneSelector: "",
+            };
+
+            // Copy all attributes if the node is an element
+            if (node.nodeType === Node.ELEMENT_NODE && node.attributes) {
+                nodeData.attributes = getAttributes(node);
+            }
+
+            if (node.nodeType === Node.ELEMENT_NODE) {
+                const isInteractive = isInteractiveElement(node);
+                const isVisible = isElementVisible(node);
+                const isTop = isTopElement(node);
+
+                nodeData.isInteractive = isInteractive;
+                nodeData.isVisible = isVisible;
+                nodeData.isTopElement = isTop;
+
+                // Highlight if element meets all criteria and highlighting is enabled
+                if (isInteractive && isVisible && isTop) {
+                    nodeData.highlightIndex = highlightIndex++;
+                    browserUse.elements[nodeData.highlightIndex] = node;
+                    if (doHighlightElements) {
+                        highlightElement(node, nodeData.highlightIndex, parentIframe);
+                    }
                 }
             }
-        }
 
-        // Only add iframeContext if we're inside an iframe
-        // if (parentIframe) {
-        //     nodeData.iframeContext = `iframe[src="${parentIframe.src || ''}"]`;
-        // }
+            // Only add iframeContext if we're inside an iframe
+            // if (parentIframe) {
+            //     nodeData.iframeContext = `iframe[src="${parentIframe.src || ''}"]`;
+            // }
 
-        // Only add shadowRoot field if it exists
-        if (node.shadowRoot) {
-            nodeData.shadowRoot = true;
-        }
+            // Only add shadowRoot field if it exists
+            if (node.shadowRoot) {
+                nodeData.shadowRoot = true;
+            }
 
-        // Handle shadow DOM
-        if (node.shadowRoot) {
-            const shadowChildren = Array.from(node.shadowRoot.childNodes).map(child =>
-                buildDomTree(child, parentIframe)
-            );
-            nodeData.children.push(...shadowChildren);
+            // Handle shadow DOM
+            if (node.shadowRoot) {
+                const shadowChildren = Array.from(node.shadowRoot.childNodes).map(child =>
+                    buildDomTree(child, parentIframe)
+                );
+                nodeData.children.push(...shadowChildren);
+            }
+
+            // Handle iframes
+            if (node.tagName === 'IFRAME') {
+                if (!includeIframes) return nodeData;
+                try {
+                    const iframeDoc = node.contentDocument || node.contentWindow.document;
+                    if (iframeDoc) {
+                        ensureObserver(iframeDoc);
+                        const iframeChildren = Array.from(iframeDoc.body.childNodes).map(child =>
+                            buildDomTree(child, node)
+                        );
+                        nodeData.children.push(...iframeChildren);
+                    }
+                } catch (e) {
+                    console.warn('Unable to access iframe:', node);
+                }
+            } else {
+                const children = Array.from(node.childNodes).map(child =>
+                    buildDomTree(child, parentIframe)
+                );
+                nodeData.children.push(...children);
+            }
+
+            return nodeData;
         }
 
-        // Handle iframes
-        if (node.tagName === 'IFRAME') {
-            try {
-                const iframeDoc = node.contentDocument || node.contentWindow.document;
-                if (iframeDoc) {
-                    const iframeChildren = Array.from(iframeDoc.body.childNodes).map(child =>
-                        buildDomTree(child, node)
+        // Flattens the nested tree into parallel arrays plus a string table.
+        // Nodes are emitted in pre-order, so the row of a node is also its node id.
+        // Must stay in sync with the COLUMNAR_* flags in dom/service.py.
+        function encodeColumnar(root) {
+            const TEXT = 1, VISIBLE = 2, INTERACTIVE = 4, TOP = 8, SHADOW_ROOT = 16;
+
+            const strings = [];
+            const stringIds = new Map();
+            const intern = (value) => {
+                let id = stringIds.get(value);
+                if (id === undefined) {
+                    id = strings.length;
+                    strings.push(value);
+                    stringIds.set(value, id);
+                }
+                return id;
+            };
+
+            const columns = {
+                parents: [],
+                flags: [],
+                names: [], // tag name for elements, text for text nodes
+                xpaths: [],
+                selectors: [],
+                highlights: [],
+                attrOffsets: [0],
+                attrs: [], // [nameId, valueId, nameId, valueId, ...]
+            };
+
+            const stack = root ? [[root, -1]] : [];
+            while (stack.length > 0) {
+                const [nodeData, parent] = stack.pop();
+                const id = columns.parents.length;
+                columns.parents.push(parent);
+
+                if (nodeData.type === 'TEXT_NODE') {
+                    columns.flags.push(TEXT | (nodeData.isVisible ? VISIBLE : 0));
+                    columns.names.push(intern(nodeData.text));
+                    columns.xpaths.push(-1);
+                    columns.selectors.push(-1);
+                    columns.highlights.push(-1);
+                } else {
+                    columns.flags.push(
+                        (nodeData.isVisible ? VISIBLE : 0) |
+                        (nodeData.isInteractive ? INTERACTIVE : 0) |
+                        (nodeData.isTopElement ? TOP : 0) |
+                        (nodeData.shadowRoot ? SHADOW_ROOT : 0)
                     );
-                    nodeData.children.push(...iframeChildren);
+                    columns.names.push(intern(nodeData.tagName));
+                    columns.xpaths.push(intern(nodeData.xpath));
+                    columns.selectors.push(intern(nodeData.pyneSelector));
+                    columns.highlights.push(nodeData.highlightIndex ?? -1);
+                    for (const [name, value] of Object.entries(nodeData.attributes)) {
+                        columns.attrs.push(intern(name), intern(value));
+                    }
+                }
+                columns.attrOffsets.push(columns.attrs.length);
+
+                const children = nodeData.children || [];
+                for (let i = children.length - 1; i >= 0; i--) {
+                    if (children[i]) stack.push([children[i], id]);
                 }
-            } catch (e) {
-                console.warn('Unable to access iframe:', node);
             }
-        } else {
-            const children = Array.from(node.childNodes).map(child =>
-                buildDomTree(child, parentIframe)
-            );
-            nodeData.children.push(...children);
-        }
 
-        return nodeData;
-    }
+            return { strings, ...columns };
+        }
 
-    function generateSelector(element) {
-        function getUniqueXpath(element) {
-          const idPath = getById(element);
-          if (idPath.length > 0) {
-            return idPath;
-          }
+        function generateSelector(element) {
+            function getUniqueXpath(element) {
+              const idPath = getById(element);
+              if (idPath.length > 0) {
+                return idPath;
+              }
       
-          const attrPath = getByAttribute(element);
-          if (attrPath.length > 0) {
-            return attrPath;
-          }
+              const attrPath = getByAttribute(element);
+              if (attrPath.length > 0) {
+                return attrPath;
+              }
       
-          const textPath = getByText(element);
-          if (textPath.length > 0) {
-            return textPath;
-          }
+              const textPath = getByText(element);
+              if (textPath.length > 0) {
+                return textPath;
+              }
       
-          const clsxPath = getByUniqueClass(element);
-          if (clsxPath.length > 0) {
-            return clsxPath;
-          }
+              const clsxPath = getByUniqueClass(element);
+              if (clsxPath.length > 0) {
+                return clsxPath;
+              }
       
-          const comboPath = getByClassCombo(element);
-          if (comboPath.length > 0) {
-            return comboPath;
-          }
+              const comboPath = getByClassCombo(element);
+              if (comboPath.length > 0) {
+                return comboPath;
+              }
       
-          return '';
-        }
+              return '';
+            }
       
-        function getById(element) {
-          if (!element.id) return '';
+            function getById(element) {
+              if (!element.id) return '';
       
-          const xpath = `//*[@id="${element.id}"]`;
-          if (isValidXPath(xpath) && isUnique(xpath, element)) {
-            return xpath;
-          }
+              const xpath = `//*[@id="${element.id}"]`;
+              if (isValidXPath(xpath) && isUnique(xpath, element)) {
+                return xpath;
+              }
       
-          return '';
-        }
+              return '';
+            }
       
-        function getByAttribute(element) {
-          const attributes = element.attributes || [];
-          for (let i = 0; i < attributes.length; i++) {
-            const { name, value } = attributes[i];
+            function getByAttribute(element) {
+              const attributes = element.attributes || [];
+              for (let i = 0; i < attributes.length; i++) {
+                const { name, value } = attributes[i];
       
-            console.log({ name, value });
+                console.log({ name, value });
       
-            if (
-              value.length === 0 ||
-              (!name.startsWith('data-') &&
-                !name.startsWith('aria-') &&
-                name !== 'alt' &&
-                name !== 'placeholder' &&
-                name !== 'name')
-            )
-              continue;
+                if (
+                  value.length === 0 ||
+                  (!name.startsWith('data-') &&
+                    !name.startsWith('aria-') &&
+                    name !== 'alt' &&
+                    name !== 'placeholder' &&
+                    name !== 'name')
+                )
+                  continue;
+      
+                const xpath = x(`[@${name}="${value}"]`, element);
+                if (xpath.length > 0) {
+                  return xpath;
+                }
+              }
       
-            const xpath = x(`[@${name}="${value}"]`, element);
-            if (xpath.length > 0) {
-              return xpath;
+              return '';
             }
-          }
       
-          return '';
-        }
+            function getByUniqueClass(element) {
+              if (!element.className) return '';
       
-        function getByUniqueClass(element) {
-          if (!element.className) return '';
+              const classList = Array.from(element.classList).filter(isValidClassName);
       
-          const classList = Array.from(element.classList).filter(isValidClassName);
+              for (let i = 0; i < classList.length; i++) {
+                const xpath = x(`[contains(@class, "${classList[i]}")]`, element);
+                if (xpath.length > 0) {
+                  return xpath;
+                }
+              }
       
-          for (let i = 0; i < classList.length; i++) {
-            const xpath = x(`[contains(@class, "${classList[i]}")]`, element);
-            if (xpath.length > 0) {
-              return xpath;
+              return '';
             }
-          }
-      
-          return '';
-        }
       
-        function getByText(element) {
-          if (!element.textContent) return '';
+            function getByText(element) {
+              if (!element.textContent) return '';
       
-          const allowedTags = ['a', 'button', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'span', 'li', 'label'];
-          const tagName = getTagName(element);
-          if(!tagName) {
-            return '';
-          }
+              const allowedTags = ['a', 'button', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'span', 'li', 'label'];
+              const tagName = getTagName(element);
+              if(!tagName) {
+                return '';
+              }
           
-          if (allowedTags.includes(tagName)) {
-            const textContent = element?.textContent
-              ?.split('\n')
-              .sort((a, b) => b.length - a.length)[0]
-              .trim()
-              .replace(/"/g, '\'');
-      
-            if (textContent && textContent.length > 0) {
-              const pathIndex = getElementIndexInParent(element);
-              const xpathOptions = [
-                `//*[contains(text(),"${textContent}")]`,
-                `//*[text()="${textContent}"]`,
-                `//*[contains(.,"${textContent}")]`,
-                `//${tagName}[contains(text(),"${textContent}")]`,
-                `//${tagName}[text()="${textContent}"]`,
-                `//${tagName}[contains(.,"${textContent}")]`,
-                `//${tagName}${pathIndex}[contains(text(),"${textContent}")]`,
-                `//${tagName}${pathIndex}[text()="${textContent}"]`,
-                `//${tagName}${pathIndex}[contains(.,"${textContent}")]`,
-              ];
+              if (allowedTags.includes(tagName)) {
+                const textContent = element?.textContent
+                  ?.split('\n')
+                  .sort((a, b) => b.length - a.length)[0]
+                  .trim()
+                  .replace(/"/g, '\'');
+      
+                if (textContent && textContent.length > 0) {
+                  const pathIndex = getElementIndexInParent(element);
+                  const xpathOptions = [
+                    `//*[contains(text(),"${textContent}")]`,
+                    `//*[text()="${textContent}"]`,
+                    `//*[contains(.,"${textContent}")]`,
+                    `//${tagName}[contains(text(),"${textContent}")]`,
+                    `//${tagName}[text()="${textContent}"]`,
+                    `//${tagName}[contains(.,"${textContent}")]`,
+                    `//${tagName}${pathIndex}[contains(text(),"${textContent}")]`,
+                    `//${tagName}${pathIndex}[text()="${textContent}"]`,
+                    `//${tagName}${pathIndex}[contains(.,"${textContent}")]`,
+                  ];
+      
+                  const xpath = xpathOptions.find(xpath => isValidXPath(xpath) && isUnique(xpath, element));
+                  return xpath || '';
+                }
+              }
       
-              const xpath = xpathOptions.find(xpath => isValidXPath(xpath) && isUnique(xpath, element));
-              return xpath || '';
+              return '';
             }
-          }
       
-          return '';
-        }
+            function getByClassCombo(element) {
+              if (!element.className) return '';
       
-        function getByClassCombo(element) {
-          if (!element.className) return '';
+              const classList = Array.from(element.classList).filter(isValidClassName);
+              const combinations = getClassCombinations(classList);
+              // console.log({ combinations });
+              for (const combo of combinations) {
+                if (combo.length === 1) continue;
+                // const selector = combo.map(c => '.' + c).join('');
+                const attr = combo.map(c => `contains(@class,"${c}")`).join(' and ');
+                const xpath = x(`[${attr}]`, element);
+                if (xpath.length > 0) {
+                  return xpath;
+                }
+              }
       
-          const classList = Array.from(element.classList).filter(isValidClassName);
-          const combinations = getClassCombinations(classList);
-          // console.log({ combinations });
-          for (const combo of combinations) {
-            if (combo.length === 1) continue;
-            // const selector = combo.map(c => '.' + c).join('');
-            const attr = combo.map(c => `contains(@class,"${c}")`).join(' and ');
-            const xpath = x(`[${attr}]`, element);
-            if (xpath.length > 0) {
-              return xpath;
+              return '';
             }
-          }
-      
-          return '';
-        }
       
-        function getClassCombinations(classes) {
-          const combinations = [];
-          const n = classes.length;
-          for (let i = 0; i < n; i++) {
-            combinations.push([classes[i]]);
-            for (let j = i + 1; j < n; j++) {
-              combinations.push([classes[i], classes[j]]);
-              for (let k = j + 1; k < n; k++) {
-                combinations.push([classes[i], classes[j], classes[k]]);
+            function getClassCombinations(classes) {
+              const combinations = [];
+              const n = classes.length;
+              for (let i = 0; i < n; i++) {
+                combinations.push([classes[i]]);
+                for (let j = i + 1; j < n; j++) {
+                  combinations.push([classes[i], classes[j]]);
+                  for (let k = j + 1; k < n; k++) {
+                    combinations.push([classes[i], classes[j], classes[k]]);
+                  }
+                }
               }
+              return combinations;
             }
-          }
-          return combinations;
-        }
       
-        function x(attr, element) {
-          const tagName = getTagName(element);
-          if(!tagName) {
-            return '';
-          }
+            function x(attr, element) {
+              const tagName = getTagName(element);
+              if(!tagName) {
+                return '';
+              }
 
-          const pathIndex = getElementIndexInParent(element);
+              const pathIndex = getElementIndexInParent(element);
       
-          let xpath = '//' + tagName + attr;
-          if (isValidXPath(xpath) && isUnique(xpath, element)) {   
-            return xpath;
-          }
+              let xpath = '//' + tagName + attr;
+              if (isValidXPath(xpath) && isUnique(xpath, element)) {   
+                return xpath;
+              }
       
-          xpath = '//' + tagName + pathIndex + attr;
-          if (isValidXPath(xpath) && isUnique(xpath, element)) {
-            return xpath;
-          }
+              xpath = '//' + tagName + pathIndex + attr;
+              if (isValidXPath(xpath) && isUnique(xpath, element)) {
+                return xpath;
+              }
       
-          return '';
-        }
+              return '';
+            }
       
-        function getTagName(element) {
-          return element.tagName?.toLowerCase();
-        }
+            function getTagName(element) {
+              return element.tagName?.toLowerCase();
+            }
       
-        function getElementIndexInParent(el) {
-          const siblings = Array.from(el.parentNode?.children || []).filter(e => e.tagName === el.tagName);
-          if (siblings.length > 1) {
-            // Return 1-based index if there are siblings with the same tag
-            return `[${siblings.indexOf(el) + 1}]`;
-          }
-          return ''; // No need for index if it's unique within its parent
-        }
-      
-        function isValidClassName(className) {
-          // Reject class names that are too short
-          if (className.length <= 2) return false;
-          // Reject class names that contain digits
-          if (/\d/.test(className)) return false;
-          // Reject class names that start with known prefixes
-          const rejectedPrefixes = ['css', 'jsx', 'tw', 'tailwind', 'Styled', 'style'];
-          for (const prefix of rejectedPrefixes) {
-            if (className.startsWith(prefix)) return false;
-          }
-          // Reject common utility class names
-          const rejectedClassNames = [
-            'my',
-            'mx',
-            'mt',
-            'mb',
-            'ml',
-            'mr',
-            'p',
-            'py',
-            'px',
-            'pt',
-            'pb',
-            'pl',
-            'pr',
-            'flex',
-            'grid',
-            'inline',
-            'block',
-            'hidden',
-            'relative',
-            'absolute',
-            'fixed',
-            'static',
-            'sticky',
-            'top',
-            'bottom',
-            'left',
-            'right',
-            'font',
-            'leading',
-            'tracking',
-            'uppercase',
-            'lowercase',
-            'capitalize',
-            'antialiased',
-            'break',
-            'whitespace',
-            'truncate',
-            'cursor',
-            'pointer',
-            'hover',
-            'focus',
-            'active',
-            'visited',
-            'disabled',
-            'first',
-            'last',
-            'even',
-            'odd',
-            'col',
-            'row',
-            'gap',
-            'space',
-            'divide',
-            'border',
-            'rounded',
-            'shadow',
-            'opacity',
-            'transition',
-            'duration',
-            'ease',
-            'delay',
-            'animate',
-            'fill',
-            'stroke',
-            'transform',
-            'scale',
-            'rotate',
-            'translate',
-            'skew',
-            'origin',
-            'resize',
-            'appearance',
-            'outline',
-            'table',
-            'select',
-            'svg',
-            'filter',
-            'blend',
-            'isolation',
-            'mix',
-            'order',
-            'placeholder',
-            'ring',
-            'float',
-            'clear',
-            'object',
-            'overflow',
-            'position',
-            'z',
-            'display',
-            'text',
-            'bg',
-            'w',
-            'h',
-            'min',
-            'max',
-            'inset',
-            'm',
-            'p',
-            'bg',
-            'text',
-            'border',
-            'grow',
-            'shrink',
-            'justify',
-            'items',
-            'align',
-          ];
-          if (rejectedClassNames.some(cn => cn === className || className.startsWith(cn + '-'))) return false;
-      
-          return true;
-        }
-      
-        function isUnique(xpath, element) {
-          if (
-            document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue === element
-          ) {
-            return true;
+            function getElementIndexInParent(el) {
+              const siblings = Array.from(el.parentNode?.children || []).filter(e => e.tagName === el.tagName);
+              if (siblings.length > 1) {
+                // Return 1-based index if there are siblings with the same tag
+                return `[${siblings.indexOf(el) + 1}]`;
+              }
+              return ''; // No need for index if it's unique within its parent
+            }
+      
+            function isValidClassName(className) {
+              // Reject class names that are too short
+              if (className.length <= 2) return false;
+              // Reject class names that contain digits
+              if (/\d/.test(className)) return false;
+              // Reject class names that start with known prefixes
+              const rejectedPrefixes = ['css', 'jsx', 'tw', 'tailwind', 'Styled', 'style'];
+              for (const prefix of rejectedPrefixes) {
+                if (className.startsWith(prefix)) return false;
+              }
+              // Reject common utility class names
+              const rejectedClassNames = [
+                'my',
+                'mx',
+                'mt',
+                'mb',
+                'ml',
+                'mr',
+                'p',
+                'py',
+                'px',
+                'pt',
+                'pb',
+                'pl',
+                'pr',
+                'flex',
+                'grid',
+                'inline',
+                'block',
+                'hidden',
+                'relative',
+                'absolute',
+                'fixed',
+                'static',
+                'sticky',
+                'top',
+                'bottom',
+                'left',
+                'right',
+                'font',
+                'leading',
+                'tracking',
+                'uppercase',
+                'lowercase',
+                'capitalize',
+                'antialiased',
+                'break',
+                'whitespace',
+                'truncate',
+                'cursor',
+                'pointer',
+                'hover',
+                'focus',
+                'active',
+                'visited',
+                'disabled',
+                'first',
+                'last',
+                'even',
+                'odd',
+                'col',
+                'row',
+                'gap',
+                'space',
+                'divide',
+                'border',
+                'rounded',
+                'shadow',
+                'opacity',
+                'transition',
+                'duration',
+                'ease',
+                'delay',
+                'animate',
+                'fill',
+                'stroke',
+                'transform',
+                'scale',
+                'rotate',
+                'translate',
+                'skew',
+                'origin',
+                'resize',
+                'appearance',
+                'outline',
+                'table',
+                'select',
+                'svg',
+                'filter',
+                'blend',
+                'isolation',
+                'mix',
+                'order',
+                'placeholder',
+                'ring',
+                'float',
+                'clear',
+                'object',
+                'overflow',
+                'position',
+                'z',
+                'display',
+                'text',
+                'bg',
+                'w',
+                'h',
+                'min',
+                'max',
+                'inset',
+                'm',
+                'p',
+                'bg',
+                'text',
+                'border',
+                'grow',
+                'shrink',
+                'justify',
+                'items',
+                'align',
+              ];
+              if (rejectedClassNames.some(cn => cn === className || className.startsWith(cn + '-'))) return false;
+      
+              return true;
+            }
+      
+            function isUnique(xpath, element) {
+              if (
+                document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue === element
+              ) {
+                return true;
+              }
+      
+              return false;
+            }
+
+            function isValidXPath(xpath) {
+              try {
+                document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
+                return true;
+              } catch (e) {
+                return false;
+              }
+            }
+      
+            return getUniqueXpath(element);
           }
       
-          return false;
+
+
+        // Selectors check every candidate XPath for uniqueness over the whole document, so they are
+        // only generated for elements that are acted on (see DomService.get_pyne_selectors).
+        // The element -> selector memo survives extractions, elements are the same objects.
+        browserUse.selectorCache = browserUse.selectorCache || new WeakMap();
+        browserUse.selectorFor = (index) => {
+            const element = browserUse.elementAt(index);
+            if (!element) return null;
+
+            let selector = browserUse.selectorCache.get(element);
+            if (selector === undefined) {
+                selector = generateSelector(element);
+                browserUse.selectorCache.set(element, selector);
+            }
+            return selector;
+        };
+
+        // Frames extracted separately are numbered globally by DomService once all frames are done:
+        // shifts the highlight indices of this frame and draws the highlights with them
+        browserUse.highlight = (offset, draw) => {
+            browserUse.indexOffset = offset;
+            if (draw) {
+                redrawHighlights();
+                renderHighlights();
+            }
+        };
+
+        // Tag names from below the body down to the element, the branch path of the element in the
+        // tree of buildDomTree (shadow content under its host, iframe content under the iframe)
+        function getBranchPath(element) {
+            const path = [];
+            let current = element;
+            while (current) {
+                const doc = current.ownerDocument;
+                if (current === doc.body || current === doc.documentElement) {
+                    current = doc === document ? null : doc.defaultView?.frameElement ?? null;
+                    continue;
+                }
+                path.push(current.tagName.toLowerCase());
+                const parent = current.parentNode;
+                current = parent?.nodeType === Node.DOCUMENT_FRAGMENT_NODE ? parent.host : parent;
+            }
+            return path.reverse();
         }
 
-        function isValidXPath(xpath) {
-          try {
-            document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null);
-            return true;
-          } catch (e) {
-            return false;
-          }
+        function describeElement(element) {
+            if (!element?.isConnected) return null;
+            const rect = getCachedRect(element);
+            return {
+                tagName: element.tagName.toLowerCase(),
+                xpath: getXPathTree(element, true),
+                attributes: getAttributes(element),
+                branchPath: getBranchPath(element),
+                // -1 above, 1 below the viewport, 0 inside
+                viewportPosition: rect.bottom < 0 ? -1 : rect.top > window.innerHeight ? 1 : 0,
+                // same check as for the highlights of buildDomTree
+                isTopElement: isElementVisible(element) && isTopElement(element),
+            };
+        }
+
+        // No extraction, only take over the registry of the snapshot backend and draw its highlights.
+        // Described elements that are off-screen or covered are left out of the registry.
+        if (registerElements !== null) {
+            const descriptions = describeElements ? registerElements.map(describeElement) : [];
+            browserUse.elements = describeElements
+                ? registerElements.map((element, index) => descriptions[index]?.isTopElement ? element : null)
+                : registerElements;
+            browserUse.indexOffset = 0;
+            if (doHighlightElements) {
+                redrawHighlights();
+                renderHighlights();
+            }
+            return descriptions;
         }
-      
-        return getUniqueXpath(element);
-      }
-      
 
+        const observer = ensureObserver(document);
+        flushMutations(observer);
 
-    return buildDomTree(document.body);
-}
\ No newline at end of file
+        // Nothing but attributes or texts of known nodes changed: send a patch for the cached tree
+        if (sinceVersion !== null && !observer.full &&
+            sinceVersion === `${observer.docId}:${observer.baseVersion}`) {
+            const patch = buildPatch(observer);
+            if (patch) {
+                resetObserver(observer);
+                if (doHighlightElements) {
+                    redrawHighlights();
+                    renderHighlights();
+                }
+                flushMutations(observer);
+                return { version: `${observer.docId}:${observer.version}`, patch };
+            }
+        }
+
+        observer.nodeIds = new WeakMap();
+        browserUse.elements = [];
+        browserUse.indexOffset = 0;
+        let phaseStart = performance.now();
+        const tree = buildDomTree(document.body);
+        stats.readMs = performance.now() - phaseStart;
+
+        phaseStart = performance.now();
+        renderHighlights();
+        stats.writeMs = performance.now() - phaseStart;
+        browserUse.stats = stats;
+
+        // Drop the records produced by our own highlighting
+        flushMutations(observer);
+        // The nodes were renumbered: a version must identify exactly one numbering, so patches
+        // for another extraction (e.g. of a second DomService on this page) are never sent
+        observer.version++;
+        resetObserver(observer);
+
+        const version = `${observer.docId}:${observer.version}`;
+        const highlightCount = highlightIndex;
+        if (wireFormat === 'columnar') {
+            return { version, offscreen, highlightCount, columns: encodeColumnar(tree) };
+        }
+        return { version, offscreen, highlightCount, tree };
+    };
+})();
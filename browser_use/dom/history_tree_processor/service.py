@@ -1,4 +1,5 @@
 import hashlib
+import zlib
 from dataclasses import dataclass
 from typing import Optional
 
@@ -6,7 +7,7 @@ from browser_use.dom.history_tree_processor.view import (
     DOMHistoryElement,
     HashedDomElement,
 )
-from browser_use.dom.views import DOMElementNode
+from browser_use.dom.views import DOMElementNode, DOMState
 
 
 class HistoryTreeProcessor:
@@ -20,13 +21,15 @@ class HistoryTreeProcessor:
     def convert_dom_element_to_history_element(
         dom_element: DOMElementNode,
     ) -> DOMHistoryElement:
-        parent_branch_path = HistoryTreeProcessor._get_parent_branch_path(dom_element)
+        parent_branch_path = dom_element._page_branch_path
+        if parent_branch_path is None:
+            parent_branch_path = HistoryTreeProcessor._get_parent_branch_path(dom_element)
         return DOMHistoryElement(
             dom_element.tag_name,
             dom_element.xpath,
             dom_element.highlight_index,
             parent_branch_path,
-            dom_element.attributes,
+            HistoryTreeProcessor._page_attributes(dom_element),
             dom_element.shadow_root,
             dom_element.get_all_text_till_next_clickable_element(),
             dom_element.pyne_selector,
@@ -42,8 +45,7 @@ class HistoryTreeProcessor:
 
         def process_node(node: DOMElementNode):
             if node.highlight_index is not None:
-                hashed_node = HistoryTreeProcessor._hash_dom_element(node)
-                if hashed_node == hashed_dom_history_element:
+                if node.hash == hashed_dom_history_element:
                     return node
             for child in node.children:
                 if isinstance(child, DOMElementNode):
@@ -54,6 +56,15 @@ class HistoryTreeProcessor:
 
         return process_node(tree)
 
+    @staticmethod
+    def find_history_element_in_state(
+        dom_history_element: DOMHistoryElement, state: DOMState
+    ) -> Optional[DOMElementNode]:
+        """Same as find_history_element_in_tree, with the hash index of the state (built once per state)"""
+        return state.get_element_by_hash(
+            HistoryTreeProcessor._hash_dom_history_element(dom_history_element)
+        )
+
     @staticmethod
     def compare_history_element_and_dom_element(
         dom_history_element: DOMHistoryElement, dom_element: DOMElementNode
@@ -61,9 +72,7 @@ class HistoryTreeProcessor:
         hashed_dom_history_element = HistoryTreeProcessor._hash_dom_history_element(
             dom_history_element
         )
-        hashed_dom_element = HistoryTreeProcessor._hash_dom_element(dom_element)
-
-        return hashed_dom_history_element == hashed_dom_element
+        return hashed_dom_history_element == dom_element.hash
 
     @staticmethod
     def _hash_dom_history_element(
@@ -80,15 +89,21 @@ class HistoryTreeProcessor:
 
     @staticmethod
     def _hash_dom_element(dom_element: DOMElementNode) -> HashedDomElement:
-        parent_branch_path = HistoryTreeProcessor._get_parent_branch_path(dom_element)
-        branch_path_hash = HistoryTreeProcessor._parent_branch_path_hash(
-            parent_branch_path
+        branch_path_hash = HistoryTreeProcessor._element_branch_path_hash(dom_element)
+        attributes_hash = HistoryTreeProcessor._attributes_hash(
+            HistoryTreeProcessor._page_attributes(dom_element)
         )
-        attributes_hash = HistoryTreeProcessor._attributes_hash(dom_element.attributes)
         # text_hash = DomTreeProcessor._text_hash(dom_element)
 
         return HashedDomElement(branch_path_hash, attributes_hash)
 
+    @staticmethod
+    def _page_attributes(dom_element: DOMElementNode) -> dict[str, str]:
+        """Attributes of the element in the page, without the ones added for the model"""
+        if dom_element._page_attributes is not None:
+            return dom_element._page_attributes
+        return dom_element.attributes
+
     @staticmethod
     def _get_parent_branch_path(dom_element: DOMElementNode) -> list[str]:
         parents: list[DOMElementNode] = []
@@ -102,16 +117,53 @@ class HistoryTreeProcessor:
         return [parent.tag_name for parent in parents]
 
     @staticmethod
-    def _parent_branch_path_hash(parent_branch_path: list[str]) -> str:
+    def _parent_branch_path_hash(parent_branch_path: list[str]) -> int:
+        """crc32 of the "/" joined tag path (the root element is not part of the path)"""
         parent_branch_path_string = "/".join(parent_branch_path)
-        return hashlib.sha256(parent_branch_path_string.encode()).hexdigest()
+        return zlib.crc32(parent_branch_path_string.encode())
+
+    @staticmethod
+    def _child_branch_path_hash(parent: DOMElementNode, tag_name: str) -> int:
+        """
+        Branch path hash of a child of `parent`, derived from the parent's hash without walking
+        up the tree: crc32 continues over the appended "/tag_name".
+        """
+        if parent.parent is None:
+            return zlib.crc32((tag_name or "").encode())
+        parent_hash = parent._branch_path_hash
+        if parent_hash is None:
+            parent_hash = HistoryTreeProcessor._element_branch_path_hash(parent)
+        return zlib.crc32(f"/{tag_name or ''}".encode(), parent_hash)
+
+    @staticmethod
+    def _element_branch_path_hash(dom_element: DOMElementNode) -> int:
+        """
+        Branch path hash of a parsed element, computed on first use from the nearest ancestor
+        with a known hash and stored on every element on the way down, so hashing all
+        highlighted elements costs one crc32 step per element of their common branches.
+        """
+        branch: list[DOMElementNode] = []
+        current_element = dom_element
+        while current_element._branch_path_hash is None and current_element.parent is not None:
+            branch.append(current_element)
+            current_element = current_element.parent
+        if current_element._branch_path_hash is None:
+            # the root element is not part of the path
+            current_element._branch_path_hash = 0
+
+        for element in reversed(branch):
+            element._branch_path_hash = HistoryTreeProcessor._child_branch_path_hash(
+                element.parent,  # type: ignore
+                element.tag_name,
+            )
+        return dom_element._branch_path_hash  # type: ignore
 
     @staticmethod
-    def _attributes_hash(attributes: dict[str, str]) -> str:
+    def _attributes_hash(attributes: dict[str, str]) -> int:
         attributes_string = "".join(
             f"{key}={value}" for key, value in attributes.items()
         )
-        return hashlib.sha256(attributes_string.encode()).hexdigest()
+        return zlib.crc32(attributes_string.encode())
 
     @staticmethod
     def _text_hash(dom_element: DOMElementNode) -> str:
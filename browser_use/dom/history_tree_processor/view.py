@@ -2,14 +2,14 @@ from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+@dataclass(frozen=True)
 class HashedDomElement:
     """
     Hash of the dom element to be used as a unique identifier
     """
 
-    branch_path_hash: str
-    attributes_hash: str
+    branch_path_hash: int
+    attributes_hash: int
     # text_hash: str
 
 
@@ -1,8 +1,19 @@
+import asyncio
+import gc
 import logging
+import sys
+import zlib
+from functools import cache, wraps
 from importlib import resources
-from typing import Optional
+from typing import Literal, Optional
 
-from playwright.async_api import Page
+from playwright.async_api import CDPSession, Frame, Page
+from playwright.async_api import Error as PlaywrightError
+
+from browser_use.dom.accessibility import build_ax_tree, collect_ax_elements
+from browser_use.dom.history_tree_processor.service import HistoryTreeProcessor
+from browser_use.dom.history_tree_processor.view import HashedDomElement
+from browser_use.dom.snapshot import SNAPSHOT_COMPUTED_STYLES, Viewport, parse_dom_snapshot
 
 from browser_use.dom.views import (
 	DOMBaseNode,
@@ -14,88 +25,791 @@ from browser_use.dom.views import (
 
 logger = logging.getLogger(__name__)
 
+# Entry point of the extractor installed by buildDomTree.js; null if the script is not installed yet
+EXTRACT_DOM_TREE_JS = '(args) => window.__browserUse?.extract ? window.__browserUse.extract(args) : null'
+
+# Lazily generated pyne selectors of highlighted elements, null for elements that are gone
+GET_PYNE_SELECTORS_JS = '(indices) => indices.map((index) => window.__browserUse?.selectorFor?.(index) ?? null)'
+
+# Shifts the highlight indices of a separately extracted frame and draws its highlights
+HIGHLIGHT_FRAME_JS = '([offset, draw]) => window.__browserUse?.highlight?.(offset, draw)'
+
+# Highlighted element by highlight index and tag name from the in-page registry, null if it is gone
+ELEMENT_BY_INDEX_JS = '([index, tagName]) => window.__browserUse?.elementAt?.(index, tagName) ?? null'
+
+# Changes whenever new elements may have appeared in the document, null if the extractor is not installed
+CHANGE_TOKEN_JS = '() => window.__browserUse?.changeToken?.() ?? null'
+
+# Node id of an iframe element in the last extraction of its (parent) document
+FRAME_NODE_ID_JS = '(element) => window.__browserUse?.observer?.nodeIds.get(element) ?? null'
+
+# Takes over the elements resolved by the CDP backends as highlight registry (this = any of them).
+# null if the extractor is not installed, otherwise the element descriptions (empty unless `describe`)
+REGISTER_ELEMENTS_JS = """function (draw, describe, ...elements) {
+	if (!window.__browserUse?.extract) return null;
+	return window.__browserUse.extract({
+		doHighlightElements: draw,
+		registerElements: elements,
+		describeElements: describe,
+	});
+}"""
+
+CLEAR_REGISTRY_JS = '() => window.__browserUse?.extract?.({ registerElements: [] })'
+
+# Runtime object group of the elements resolved by the CDP backends
+CDP_OBJECT_GROUP = 'browser-use-dom'
+
+# Node flags of the columnar wire format, see encodeColumnar in buildDomTree.js
+COLUMNAR_TEXT = 1
+COLUMNAR_VISIBLE = 2
+COLUMNAR_INTERACTIVE = 4
+COLUMNAR_TOP = 8
+COLUMNAR_SHADOW_ROOT = 16
+
+DomWireFormat = Literal['nested', 'columnar']
+
+# 'js' walks the DOM with buildDomTree.js, 'cdp' converts one DOMSnapshot.captureSnapshot and 'ax' only
+# lists the interactive elements of the accessibility tree (both Chromium only)
+DomBackend = Literal['js', 'cdp', 'ax']
+
+# Deeper subtrees are dropped, the tree is processed recursively in several places
+MAX_DOM_DEPTH = 500
+
+
+@cache
+def get_build_dom_tree_script() -> str:
+	"""buildDomTree.js, read once per process. Registered as init script by the BrowserContext."""
+	return resources.read_text('browser_use.dom', 'buildDomTree.js')
+
+
+def _gc_paused(func):
+	"""
+	Run `func` with the cyclic garbage collector paused. The parsers allocate one object per node
+	with parent <-> child cycles, collections triggered while the tree grows rescan it over and over
+	without freeing anything (about half of the parse time on large pages).
+	"""
+
+	@wraps(func)
+	def wrapper(*args, **kwargs):
+		enabled = gc.isenabled()
+		gc.disable()
+		try:
+			return func(*args, **kwargs)
+		finally:
+			if enabled:
+				gc.enable()
+
+	return wrapper
+
 
 class DomService:
-	def __init__(self, page: Page):
+	def __init__(
+		self,
+		page: Page,
+		wire_format: DomWireFormat = 'nested',
+		viewport_expansion: Optional[int] = None,
+		concurrent_frames: bool = True,
+		backend: DomBackend = 'js',
+	):
+		"""
+		wire_format: 'nested' returns one JSON object per node, 'columnar' returns parallel
+		arrays plus a string table, which is much smaller to serialize for large pages.
+		viewport_expansion: if set, only elements within this many pixels above / below the
+		viewport are extracted, the ones further away are only counted. None extracts the whole page.
+		concurrent_frames: extract every frame of the page on its own and concurrently, which also
+		covers cross-origin iframes. Otherwise only same-origin iframes are walked from the main frame.
+		backend: 'cdp' builds the tree from a single DOMSnapshot.captureSnapshot call instead of
+		running the JS extractor. It always extracts the full page (no incremental patches) and does
+		not include out-of-process iframes. 'ax' builds a flat list of the interactive elements of
+		the main frame accessibility tree, much smaller than the DOM tree on form-heavy pages.
+		"""
 		self.page = page
+		self.wire_format = wire_format
+		self.viewport_expansion = viewport_expansion
+		self.concurrent_frames = concurrent_frames
+		self.backend = backend
+		self._cdp_session: Optional[CDPSession] = None
+		# objectId of each resolved element by backendNodeId, reused by _register_elements
+		self._element_objects: dict[int, str] = {}
 		self.xpath_cache = {}
 
+		# State of the last extraction, patched in place while the in-page observer reports
+		# only attribute / text changes of already known nodes
+		self._cached_state: Optional[DOMState] = None
+		self._cached_version: Optional[str] = None
+		self._nodes: list[Optional[DOMBaseNode]] = []
+
+		# Identical attribute dicts are shared between nodes, keyed by their items
+		self._attributes_cache: dict[tuple, dict[str, str]] = {}
+
+		# Element hashes are computed top-down while parsing: encoded tag path segments by tag name
+		# and attribute hashes by id of the (shared) attribute dict, both reset per parse
+		self._tag_segments: dict[str, tuple[bytes, bytes]] = {}
+		self._attribute_hashes: dict[int, int] = {}
+
+		# Same per frame, when frames are extracted separately. _frame_offsets holds the frames that
+		# are part of the cached tree, with the offset of their highlight indices
+		self._frame_versions: dict[Frame, str] = {}
+		self._frame_nodes: dict[Frame, list[Optional[DOMBaseNode]]] = {}
+		self._frame_offsets: dict[Frame, int] = {}
+
 	# region - Clickable elements
-	async def get_clickable_elements(self, highlight_elements: bool = True) -> DOMState:
-		element_tree = await self._build_dom_tree(highlight_elements)
-		selector_map = self._create_selector_map(element_tree)
+	async def get_clickable_elements(
+		self, highlight_elements: bool = True, incremental: bool = True
+	) -> DOMState:
+		"""
+		Extract the interactive elements of the page.
+
+		With `incremental` the in-page MutationObserver is asked what changed since the
+		previous call: unchanged pages return the cached state, attribute and text changes
+		are patched into it and everything else triggers a full extraction.
+		"""
+		if self.backend == 'cdp':
+			return await self._get_clickable_elements_cdp(highlight_elements)
+		if self.backend == 'ax':
+			return await self._get_clickable_elements_ax(highlight_elements)
+
+		frames = self._get_frames()
+		if len(frames) > 1:
+			return await self._get_clickable_elements_per_frame(frames, highlight_elements, incremental)
+
+		if self._frame_versions:
+			# the page had child frames before, the cached state cannot be patched
+			self._cached_version = None
+			self._frame_versions, self._frame_nodes, self._frame_offsets = {}, {}, {}
+
+		since_version = self._cached_version if incremental and self._cached_state else None
+		eval_page = await self._evaluate_dom_tree(highlight_elements, since_version)
+
+		if 'patch' in eval_page:
+			if self._apply_patch(eval_page['patch']):
+				self._cached_version = eval_page['version']
+				# patched attributes change element hashes
+				self._cached_state._hash_index = None  # type: ignore
+				return self._cached_state  # type: ignore
+			eval_page = await self._evaluate_dom_tree(highlight_elements, None)
+
+		element_tree, selector_map = self._parse_eval_page(eval_page)
+
+		offscreen = eval_page.get('offscreen') or {}
+		self._cached_state = DOMState(
+			element_tree=element_tree,
+			selector_map=selector_map,
+			elements_above=offscreen.get('above', 0),
+			elements_below=offscreen.get('below', 0),
+		)
+		self._cached_version = eval_page['version']
+		return self._cached_state
+
+	async def get_cdp_session(self) -> CDPSession:
+		"""CDP session of the page, shared with the BrowserContext (Chromium only)"""
+		if self._cdp_session is None:
+			self._cdp_session = await self.page.context.new_cdp_session(self.page)
+		return self._cdp_session
+
+	async def _get_clickable_elements_ax(self, highlight_elements: bool) -> DOMState:
+		"""Build the state from the accessibility tree, the page only describes the interactive elements"""
+		cdp = await self.get_cdp_session()
+		ax_tree = await cdp.send('Accessibility.getFullAXTree')
+		elements = collect_ax_elements(ax_tree['nodes'])
+
+		descriptions = await self._register_elements(
+			cdp,
+			[element.backend_node_id for element in elements if element.interactive],
+			highlight_elements,
+			describe=True,
+		)
+		element_tree, selector_map = build_ax_tree(elements, descriptions)
+
+		self._cached_version = None
+		self._nodes = []
+		self._cached_state = DOMState(
+			element_tree=element_tree,
+			selector_map=selector_map,
+			elements_above=sum(1 for d in descriptions if d and d['viewportPosition'] < 0),
+			elements_below=sum(1 for d in descriptions if d and d['viewportPosition'] > 0),
+		)
+		return self._cached_state
+
+	async def _get_clickable_elements_cdp(self, highlight_elements: bool) -> DOMState:
+		"""Build the state from a DOMSnapshot, the page is only called to register the highlighted elements"""
+		cdp = await self.get_cdp_session()
+
+		snapshot, metrics = await asyncio.gather(
+			cdp.send(
+				'DOMSnapshot.captureSnapshot',
+				{'computedStyles': SNAPSHOT_COMPUTED_STYLES, 'includePaintOrder': True, 'includeDOMRects': True},
+			),
+			cdp.send('Page.getLayoutMetrics'),
+		)
+		layout_viewport = metrics['cssLayoutViewport']
+		viewport = Viewport(
+			scroll_x=layout_viewport['pageX'],
+			scroll_y=layout_viewport['pageY'],
+			width=layout_viewport['clientWidth'],
+			height=layout_viewport['clientHeight'],
+		)
+
+		result = parse_dom_snapshot(snapshot, viewport, self.viewport_expansion, MAX_DOM_DEPTH)
+		if result is None:
+			raise ValueError('Failed to parse DOM snapshot')
+
+		await self._register_elements(cdp, result.backend_node_ids, highlight_elements)
+
+		self._cached_version = None
+		self._nodes = []
+		self._cached_state = DOMState(
+			element_tree=result.element_tree,
+			selector_map=result.selector_map,
+			elements_above=result.elements_above,
+			elements_below=result.elements_below,
+		)
+		return self._cached_state
+
+	async def _register_elements(
+		self,
+		cdp: CDPSession,
+		backend_node_ids: list[Optional[int]],
+		highlight_elements: bool,
+		describe: bool = False,
+	) -> list[Optional[dict]]:
+		"""
+		Hand the highlighted elements to the in-page registry, used to draw the highlights and to
+		generate pyne selectors on demand. None entries (e.g. elements of child documents) are not
+		registered. With `describe` returns tagName, xpath, attributes, branchPath, viewportPosition and
+		isTopElement of each element, the ones that are not top elements are left out of the registry.
+		"""
+		descriptions: Optional[list] = None
+		for attempt in range(3):
+			arguments = await self._element_arguments(cdp, backend_node_ids)
+			target = next((argument['objectId'] for argument in arguments if 'objectId' in argument), None)
+			if target is None:
+				# nothing to register, only reset the registry
+				await self.page.evaluate(CLEAR_REGISTRY_JS)
+				break
+			try:
+				registered = await cdp.send(
+					'Runtime.callFunctionOn',
+					{
+						'functionDeclaration': REGISTER_ELEMENTS_JS,
+						'objectId': target,
+						'arguments': [{'value': highlight_elements}, {'value': describe}, *arguments],
+						'returnByValue': True,
+					},
+				)
+			except PlaywrightError:
+				if attempt == 2:
+					raise
+				# objects of a document the page navigated away from, resolve the elements again
+				await self._release_elements(cdp)
+				continue
+			descriptions = registered['result'].get('value')
+			if descriptions is not None:
+				break
+			# Documents loaded before the init script was registered
+			await self.page.evaluate(get_build_dom_tree_script())
+
+		return descriptions if describe and descriptions else [None] * len(backend_node_ids)
+
+	async def _element_arguments(self, cdp: CDPSession, backend_node_ids: list[Optional[int]]) -> list[dict]:
+		"""
+		Call arguments of the elements. CDP resolves one node per DOM.resolveNode call, so the objects
+		are kept between extractions and only elements that were not resolved before cost a round trip.
+		"""
+		new_ids = list({i for i in backend_node_ids if i is not None and i not in self._element_objects})
+		resolved = await asyncio.gather(
+			*(
+				cdp.send('DOM.resolveNode', {'backendNodeId': backend_node_id, 'objectGroup': CDP_OBJECT_GROUP})
+				for backend_node_id in new_ids
+			),
+			return_exceptions=True,
+		)
+		for backend_node_id, result in zip(new_ids, resolved):
+			if isinstance(result, dict) and result['object'].get('objectId'):
+				self._element_objects[backend_node_id] = result['object']['objectId']
+
+		# objects of elements that are gone would keep them alive in the page
+		current = set(backend_node_ids)
+		stale = [i for i in self._element_objects if i not in current]
+		await asyncio.gather(
+			*(cdp.send('Runtime.releaseObject', {'objectId': self._element_objects.pop(i)}) for i in stale),
+			return_exceptions=True,
+		)
 
-		return DOMState(element_tree=element_tree, selector_map=selector_map)
+		arguments: list[dict] = []
+		for backend_node_id in backend_node_ids:
+			object_id = self._element_objects.get(backend_node_id) if backend_node_id is not None else None
+			arguments.append({'objectId': object_id} if object_id else {'value': None})
+		return arguments
 
-	async def _build_dom_tree(self, highlight_elements: bool) -> DOMElementNode:
-		js_code = resources.read_text('browser_use.dom', 'buildDomTree.js')
+	async def _release_elements(self, cdp: CDPSession):
+		self._element_objects.clear()
+		await cdp.send('Runtime.releaseObjectGroup', {'objectGroup': CDP_OBJECT_GROUP})
 
-		eval_page = await self.page.evaluate(
-			js_code, [highlight_elements]
-		)  # This is quite big, so be careful
-		html_to_dict = self._parse_node(eval_page)
+	def _get_frames(self) -> list[Frame]:
+		"""Frames to extract, parents before their children"""
+		if not self.concurrent_frames:
+			return [self.page.main_frame]
 
-		if html_to_dict is None or not isinstance(html_to_dict, DOMElementNode):
+		frames: list[Frame] = []
+		stack = [self.page.main_frame]
+		while stack:
+			frame = stack.pop()
+			if frame.is_detached():
+				continue
+			frames.append(frame)
+			stack.extend(reversed(frame.child_frames))
+		return frames
+
+	async def _get_clickable_elements_per_frame(
+		self, frames: list[Frame], highlight_elements: bool, incremental: bool
+	) -> DOMState:
+		"""
+		Run the extractor in every frame concurrently and stitch the frame trees under their iframe
+		elements. Highlight indices are shifted per frame (in frame order) to be unique on the page.
+		"""
+		main_frame = frames[0]
+		can_patch = incremental and self._cached_state is not None and list(self._frame_versions) == frames
+		results: list = await asyncio.gather(
+			*(
+				self._evaluate_dom_tree(False, self._frame_versions[frame] if can_patch else None, frame)
+				for frame in frames
+			),
+			return_exceptions=True,
+		)
+
+		if can_patch and all(isinstance(result, dict) and 'patch' in result for result in results):
+			if all(
+				self._apply_patch(result['patch'], self._frame_nodes[frame])
+				for frame, result in zip(frames, results)
+			):
+				for frame, result in zip(frames, results):
+					self._frame_versions[frame] = result['version']
+				self._cached_state._hash_index = None  # type: ignore
+				await self._highlight_frames(highlight_elements)
+				return self._cached_state  # type: ignore
+
+		# frames that only sent a patch need a full extraction as well
+		redo = [i for i, result in enumerate(results) if isinstance(result, dict) and 'patch' in result]
+		if redo:
+			fresh = await asyncio.gather(
+				*(self._evaluate_dom_tree(False, None, frames[i]) for i in redo), return_exceptions=True
+			)
+			for i, result in zip(redo, fresh):
+				results[i] = result
+
+		# frame -> (root, selector map, nodes, eval result)
+		trees: dict[Frame, tuple[DOMElementNode, SelectorMap, list[Optional[DOMBaseNode]], dict]] = {}
+		for frame, result in zip(frames, results):
+			if isinstance(result, BaseException):
+				if frame is main_frame:
+					raise result
+				logger.debug(f'Failed to extract frame {frame.url}: {str(result)}')
+				continue
+			root, frame_selector_map = self._parse_eval_page(result)
+			trees[frame] = (root, frame_selector_map, self._nodes, result)
+
+		child_frames = [frame for frame in frames[1:] if frame in trees]
+		node_ids = dict(
+			zip(
+				child_frames,
+				await asyncio.gather(
+					*(self._get_frame_node_id(frame) for frame in child_frames), return_exceptions=True
+				),
+			)
+		)
+
+		selector_map: SelectorMap = {}
+		offsets: dict[Frame, int] = {}
+		offset = 0
+		elements_above = elements_below = 0
+		for frame in frames:
+			if frame not in trees:
+				continue
+			root, frame_selector_map, nodes, result = trees[frame]
+
+			if frame is not main_frame:
+				# frames inside skipped or truncated subtrees are not part of the tree
+				parent_frame = frame.parent_frame
+				node_id = node_ids[frame]
+				if parent_frame not in offsets or not isinstance(node_id, int):
+					continue
+				parent_nodes = trees[parent_frame][2]
+				iframe_node = parent_nodes[node_id] if node_id < len(parent_nodes) else None
+				if not isinstance(iframe_node, DOMElementNode):
+					continue
+
+				for child in root.children:
+					child.parent = iframe_node
+					iframe_node.children.append(child)
+				# branch paths now run through the iframe element, parents come before their children
+				for node in nodes:
+					if isinstance(node, DOMElementNode) and node is not root:
+						node.frame = frame
+						node._branch_path_hash = HistoryTreeProcessor._child_branch_path_hash(
+							node.parent,  # type: ignore
+							node.tag_name,
+						)
+						node._hash = None
+
+			offsets[frame] = offset
+			for index, node in frame_selector_map.items():
+				node.highlight_index = index + offset
+				selector_map[node.highlight_index] = node
+			offset += result.get('highlightCount', len(frame_selector_map))
+
+			offscreen = result.get('offscreen') or {}
+			elements_above += offscreen.get('above', 0)
+			elements_below += offscreen.get('below', 0)
+
+		self._frame_versions = {frame: trees[frame][3]['version'] for frame in frames if frame in trees}
+		self._frame_nodes = {frame: trees[frame][2] for frame in trees}
+		self._frame_offsets = offsets
+		self._cached_version = None
+		self._nodes = self._frame_nodes[main_frame]
+		await self._highlight_frames(highlight_elements)
+
+		self._cached_state = DOMState(
+			element_tree=trees[main_frame][0],
+			selector_map=selector_map,
+			elements_above=elements_above,
+			elements_below=elements_below,
+		)
+		return self._cached_state
+
+	async def _get_frame_node_id(self, frame: Frame) -> Optional[int]:
+		"""Node id of the iframe element of a frame, in the extraction of its parent frame"""
+		element = await frame.frame_element()
+		try:
+			return await element.evaluate(FRAME_NODE_ID_JS)
+		finally:
+			await element.dispose()
+
+	async def _highlight_frames(self, highlight_elements: bool) -> None:
+		"""Apply the highlight index offsets in the frames (also used by selectors) and draw highlights"""
+		results = await asyncio.gather(
+			*(
+				frame.evaluate(HIGHLIGHT_FRAME_JS, [offset, highlight_elements])
+				for frame, offset in self._frame_offsets.items()
+			),
+			return_exceptions=True,
+		)
+		for frame, result in zip(self._frame_offsets, results):
+			if isinstance(result, BaseException):
+				logger.debug(f'Failed to highlight frame {frame.url}: {str(result)}')
+
+	async def _evaluate_dom_tree(
+		self, highlight_elements: bool, since_version: Optional[str], frame: Optional[Frame] = None
+	) -> dict:
+		"""Run the extractor in the page, or only in `frame` leaving its iframes empty"""
+		args = {
+			'doHighlightElements': highlight_elements,
+			'sinceVersion': since_version,
+			'wireFormat': self.wire_format,
+			'viewportExpansion': self.viewport_expansion,
+			'includeIframes': frame is None,
+		}
+		target = frame or self.page
+
+		eval_page = await target.evaluate(EXTRACT_DOM_TREE_JS, args)  # This is quite big, so be careful
+		if eval_page is None:
+			# Documents loaded before the init script was registered (e.g. attached Chrome instances)
+			await target.evaluate(get_build_dom_tree_script())
+			eval_page = await target.evaluate(EXTRACT_DOM_TREE_JS, args)
+
+		return eval_page
+
+	def _parse_eval_page(self, eval_page: dict) -> tuple[DOMElementNode, SelectorMap]:
+		if 'columns' in eval_page:
+			return self._decode_columnar(eval_page['columns'])
+		return self._build_dom_tree(eval_page['tree'])
+
+	@_gc_paused
+	def _build_dom_tree(self, eval_page: dict) -> tuple[DOMElementNode, SelectorMap]:
+		"""
+		Parse the nested tree and fill the selector map in a single pass.
+
+		Uses an explicit stack instead of recursion, nodes in pre-order to match the
+		in-page node ids. Subtrees deeper than MAX_DOM_DEPTH are dropped. Attribute sharing and
+		hashing (see _shared_attributes and _hash_element) are inlined, this loop runs per node.
+		"""
+		nodes: list[Optional[DOMBaseNode]] = []
+		selector_map: SelectorMap = {}
+		truncated = 0
+		attributes_cache = self._attributes_cache = {}
+		attribute_hashes = self._attribute_hashes = {}
+		tag_segments = self._tag_segments
+		# elements without attributes share one dict, no key to build
+		no_attributes: dict[str, str] = {}
+		crc32, intern = zlib.crc32, sys.intern
+
+		stack: list[tuple[dict, Optional[DOMElementNode], int]] = [(eval_page, None, 0)]
+		pop, push, add_node = stack.pop, stack.append, nodes.append
+		while stack:
+			node_data, parent, depth = pop()
+
+			if depth > MAX_DOM_DEPTH:
+				# keep node ids aligned with the page, but do not build the node
+				nodes.append(None)
+				truncated += 1
+				if node_data.get('type') != 'TEXT_NODE':
+					for child in reversed(node_data.get('children', [])):
+						if child:
+							stack.append((child, None, depth + 1))
+				continue
+
+			if node_data.get('type') == 'TEXT_NODE':
+				node: DOMBaseNode = DOMTextNode(
+					text=node_data['text'],
+					is_visible=node_data['isVisible'],
+					parent=parent,
+				)
+			else:
+				tag_name = node_data['tagName']
+				attributes = node_data.get('attributes')
+				if attributes:
+					key = tuple(attributes.items())
+					shared = attributes_cache.get(key)
+					if shared is None:
+						shared = attributes_cache[key] = {intern(name): value for name, value in attributes.items()}
+					attributes = shared
+				else:
+					attributes = no_attributes
+
+				node = DOMElementNode(
+					# comment nodes come without a tag name
+					tag_name=intern(tag_name) if tag_name else tag_name,
+					xpath=node_data['xpath'],
+					pyne_selector=node_data['pyneSelector'],
+					attributes=attributes,
+					children=[],
+					is_visible=node_data.get('isVisible', False),
+					is_interactive=node_data.get('isInteractive', False),
+					is_top_element=node_data.get('isTopElement', False),
+					highlight_index=node_data.get('highlightIndex'),
+					shadow_root=node_data.get('shadowRoot', False),
+					parent=parent,
+				)
+				if parent is None:
+					node._branch_path_hash = 0
+				else:
+					segments = tag_segments.get(tag_name)
+					if segments is None:
+						name = tag_name or ''
+						segments = tag_segments[tag_name] = (name.encode(), f'/{name}'.encode())
+					if depth == 1:
+						node._branch_path_hash = crc32(segments[0])
+					else:
+						node._branch_path_hash = crc32(segments[1], parent._branch_path_hash)  # type: ignore
+
+				if node.highlight_index is not None:
+					selector_map[node.highlight_index] = node
+					attributes_hash = attribute_hashes.get(id(attributes))
+					if attributes_hash is None:
+						attributes_hash = attribute_hashes[id(attributes)] = HistoryTreeProcessor._attributes_hash(
+							attributes
+						)
+					node._hash = HashedDomElement(node._branch_path_hash, attributes_hash)  # type: ignore
+
+				# reversed, so children are popped (and appended to their parent) in document order
+				for child in reversed(node_data.get('children', [])):
+					if child:
+						push((child, node, depth + 1))
+
+			if parent is not None:
+				parent.children.append(node)
+			add_node(node)
+
+		if not nodes or not isinstance(nodes[0], DOMElementNode):
 			raise ValueError('Failed to parse HTML to dictionary')
 
-		return html_to_dict
+		if truncated:
+			logger.warning(f'DOM deeper than {MAX_DOM_DEPTH} levels, dropped {truncated} nodes')
+
+		self._nodes = nodes
+		return nodes[0], selector_map
+
+	@_gc_paused
+	def _decode_columnar(self, columns: dict) -> tuple[DOMElementNode, SelectorMap]:
+		"""
+		Decode the columnar wire format and fill the selector map in one linear pass.
+		Parents always precede their children. Subtrees deeper than MAX_DOM_DEPTH are dropped.
+		"""
+		strings = columns['strings']
+		parents = columns['parents']
+		flags = columns['flags']
+		names = columns['names']
+		xpaths = columns['xpaths']
+		selectors = columns['selectors']
+		highlights = columns['highlights']
+		attr_offsets = columns['attrOffsets']
+		attrs = columns['attrs']
+
+		nodes: list[Optional[DOMBaseNode]] = []
+		depths: list[int] = []
+		selector_map: SelectorMap = {}
+		truncated = 0
+
+		# The string table already shares equal strings; intern the ones used as tag and attribute names
+		interned: dict[int, str] = {}
+
+		def intern(string_id: int) -> str:
+			if string_id not in interned:
+				string = strings[string_id]
+				# comment nodes come without a tag name
+				interned[string_id] = sys.intern(string) if string else string
+			return interned[string_id]
 
-	def _create_selector_map(self, element_tree: DOMElementNode) -> SelectorMap:
-		selector_map = {}
+		# Identical attribute dicts are shared, keyed by their (name id, value id) slice
+		attributes_by_ids: dict[tuple[int, ...], dict[str, str]] = {}
+		self._attributes_cache = {}
+		self._attribute_hashes = {}
 
-		def process_node(node: DOMBaseNode):
-			if isinstance(node, DOMElementNode):
+		for i in range(len(parents)):
+			parent: Optional[DOMElementNode] = nodes[parents[i]] if parents[i] >= 0 else None  # type: ignore
+			depth = depths[parents[i]] + 1 if parents[i] >= 0 else 0
+			depths.append(depth)
+			node_flags = flags[i]
+
+			if depth > MAX_DOM_DEPTH:
+				nodes.append(None)
+				truncated += 1
+				continue
+
+			if node_flags & COLUMNAR_TEXT:
+				node: DOMBaseNode = DOMTextNode(
+					text=strings[names[i]],
+					is_visible=bool(node_flags & COLUMNAR_VISIBLE),
+					parent=parent,
+				)
+			else:
+				attribute_ids = tuple(attrs[attr_offsets[i] : attr_offsets[i + 1]])
+				attributes = attributes_by_ids.get(attribute_ids)
+				if attributes is None:
+					attributes = {
+						intern(attribute_ids[j]): strings[attribute_ids[j + 1]]
+						for j in range(0, len(attribute_ids), 2)
+					}
+					attributes_by_ids[attribute_ids] = attributes
+
+				node = DOMElementNode(
+					tag_name=intern(names[i]),
+					xpath=strings[xpaths[i]],
+					pyne_selector=strings[selectors[i]],
+					attributes=attributes,
+					children=[],
+					is_visible=bool(node_flags & COLUMNAR_VISIBLE),
+					is_interactive=bool(node_flags & COLUMNAR_INTERACTIVE),
+					is_top_element=bool(node_flags & COLUMNAR_TOP),
+					highlight_index=highlights[i] if highlights[i] >= 0 else None,
+					shadow_root=bool(node_flags & COLUMNAR_SHADOW_ROOT),
+					parent=parent,
+				)
+				self._hash_element(node, parent, depth)
 				if node.highlight_index is not None:
 					selector_map[node.highlight_index] = node
 
-				for child in node.children:
-					process_node(child)
+			if parent is not None:
+				parent.children.append(node)
+			nodes.append(node)
 
-		process_node(element_tree)
-		return selector_map
+		if not nodes or not isinstance(nodes[0], DOMElementNode):
+			raise ValueError('Failed to decode columnar DOM tree')
 
-	def _parse_node(
-		self,
-		node_data: dict,
-		parent: Optional[DOMElementNode] = None,
-	) -> Optional[DOMBaseNode]:
-		if not node_data:
-			return None
-
-		if node_data.get('type') == 'TEXT_NODE':
-			text_node = DOMTextNode(
-				text=node_data['text'],
-				is_visible=node_data['isVisible'],
-				parent=parent,
+		if truncated:
+			logger.warning(f'DOM deeper than {MAX_DOM_DEPTH} levels, dropped {truncated} nodes')
+
+		self._nodes = nodes
+		return nodes[0], selector_map
+
+	def _hash_element(self, node: DOMElementNode, parent: Optional[DOMElementNode], depth: int) -> None:
+		"""
+		Set the branch path hash of a freshly parsed element from its parent's (same value as
+		HistoryTreeProcessor._parent_branch_path_hash, without walking up the tree) and the full
+		hash of highlighted elements. Attribute dicts are shared, so their hash is computed once.
+		"""
+		if parent is None:
+			node._branch_path_hash = 0
+		else:
+			tag_name = node.tag_name or ''
+			segments = self._tag_segments.get(tag_name)
+			if segments is None:
+				segments = self._tag_segments[tag_name] = (tag_name.encode(), f'/{tag_name}'.encode())
+			if depth == 1:
+				node._branch_path_hash = zlib.crc32(segments[0])
+			else:
+				node._branch_path_hash = zlib.crc32(segments[1], parent._branch_path_hash)  # type: ignore
+
+		if node.highlight_index is not None:
+			attributes_hash = self._attribute_hashes.get(id(node.attributes))
+			if attributes_hash is None:
+				attributes_hash = HistoryTreeProcessor._attributes_hash(node.attributes)
+				self._attribute_hashes[id(node.attributes)] = attributes_hash
+			node._hash = HashedDomElement(node._branch_path_hash, attributes_hash)  # type: ignore
+
+	def _shared_attributes(self, attributes: dict[str, str]) -> dict[str, str]:
+		"""Return a shared dict for identical attributes, with interned attribute names."""
+		key = tuple(attributes.items())
+		shared = self._attributes_cache.get(key)
+		if shared is None:
+			shared = {sys.intern(name): value for name, value in attributes.items()}
+			self._attributes_cache[key] = shared
+		return shared
+
+	def _apply_patch(self, patch: dict, nodes: Optional[list[Optional[DOMBaseNode]]] = None) -> bool:
+		"""Apply attribute and text changes to the cached tree. Returns False if the patch does not fit."""
+		if nodes is None:
+			nodes = self._nodes
+		for node_id, attributes in patch['attributes']:
+			if node_id >= len(nodes) or not isinstance(nodes[node_id], DOMElementNode):
+				return False
+		for node_id, _ in patch['texts']:
+			if node_id >= len(nodes) or not isinstance(nodes[node_id], DOMTextNode):
+				return False
+
+		for node_id, attributes in patch['attributes']:
+			element_node: DOMElementNode = nodes[node_id]  # type: ignore
+			element_node.attributes = self._shared_attributes(attributes)
+			# attributes are part of the element hash
+			element_node._hash = None
+		for node_id, text in patch['texts']:
+			text_node: DOMTextNode = nodes[node_id]  # type: ignore
+			text_node.text = text
+
+		if patch['attributes'] or patch['texts']:
+			logger.debug(
+				f'Patched cached DOM tree: {len(patch["attributes"])} elements, {len(patch["texts"])} texts'
 			)
+		return True
 
-			return text_node
-
-		tag_name = node_data['tagName']
-
-		element_node = DOMElementNode(
-			tag_name=tag_name,
-			xpath=node_data['xpath'],
-			pyne_selector=node_data['pyneSelector'],
-			attributes=node_data.get('attributes', {}),
-			children=[],  # Initialize empty, will fill later
-			is_visible=node_data.get('isVisible', False),
-			is_interactive=node_data.get('isInteractive', False),
-			is_top_element=node_data.get('isTopElement', False),
-			highlight_index=node_data.get('highlightIndex'),
-			shadow_root=node_data.get('shadowRoot', False),
-			parent=parent,
-		)
+	async def get_pyne_selectors(self, indices: list[int]) -> dict[int, str]:
+		"""
+		Generate the pyne selectors of the given highlight indices of the last extraction and store
+		them on the cached nodes. Selectors are not part of the extraction because they are expensive,
+		only elements that are acted on need one.
+		"""
+		if self._cached_state is None:
+			return {}
 
-		children: list[DOMBaseNode] = []
-		for child in node_data.get('children', []):
-			if child is not None:
-				child_node = self._parse_node(child, parent=element_node)
-				if child_node is not None:
-					children.append(child_node)
+		selector_map = self._cached_state.selector_map
+		missing: dict[Frame, list[int]] = {}
+		for index in indices:
+			if index in selector_map and not selector_map[index].pyne_selector:
+				frame = selector_map[index].frame or self.page.main_frame
+				missing.setdefault(frame, []).append(index)
 
-		element_node.children = children
+		results = await asyncio.gather(
+			*(frame.evaluate(GET_PYNE_SELECTORS_JS, frame_indices) for frame, frame_indices in missing.items())
+		)
+		for frame_indices, selectors in zip(missing.values(), results):
+			for index, selector in zip(frame_indices, selectors):
+				if selector:
+					selector_map[index].pyne_selector = selector
 
-		return element_node
+		return {
+			index: selector_map[index].pyne_selector
+			for index in indices
+			if index in selector_map and selector_map[index].pyne_selector
+		}
 
 	# endregion
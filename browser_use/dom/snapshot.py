@@ -0,0 +1,416 @@
+"""
+Converts a CDP `DOMSnapshot.captureSnapshot` result into the same tree the JS extractor
+(buildDomTree.js) produces. The rules for visible / interactive / top elements mirror the
+ones in buildDomTree.js, but are evaluated on the flattened snapshot instead of calling
+into the page for every element.
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+from browser_use.dom.history_tree_processor.service import HistoryTreeProcessor
+from browser_use.dom.views import DOMElementNode, DOMTextNode, SelectorMap
+
+# Computed styles requested with the snapshot, in this order
+SNAPSHOT_COMPUTED_STYLES = ['display', 'visibility', 'opacity', 'pointer-events']
+_DISPLAY, _VISIBILITY, _OPACITY, _POINTER_EVENTS = range(len(SNAPSHOT_COMPUTED_STYLES))
+
+_ELEMENT_NODE = 1
+_TEXT_NODE = 3
+_DOCUMENT_FRAGMENT_NODE = 11
+
+# Same lists as in buildDomTree.js
+_DENIED_TAGS = frozenset(['svg', 'script', 'style', 'link', 'meta'])
+
+_INTERACTIVE_TAGS = frozenset(
+	['a', 'button', 'details', 'embed', 'input', 'label', 'menu', 'menuitem', 'object', 'select', 'textarea', 'summary']
+)
+
+_INTERACTIVE_ROLES = frozenset(
+	[
+		'button', 'menu', 'menuitem', 'link', 'checkbox', 'radio', 'slider', 'tab', 'tabpanel', 'textbox',
+		'combobox', 'grid', 'listbox', 'option', 'progressbar', 'scrollbar', 'searchbox', 'switch', 'tree',
+		'treeitem', 'spinbutton', 'tooltip', 'a-button-inner', 'a-dropdown-button', 'click', 'menuitemcheckbox',
+		'menuitemradio', 'a-button-text', 'button-text', 'button-icon', 'button-icon-only',
+		'button-text-icon-only', 'dropdown',
+	]
+)  # fmt: skip
+
+_CLICK_HANDLER_ATTRIBUTES = ('onclick', 'ng-click', '@click', 'v-on:click')
+_ARIA_STATE_ATTRIBUTES = ('aria-expanded', 'aria-pressed', 'aria-selected', 'aria-checked')
+
+# Edge length of the hit testing grid cells in CSS pixels
+_GRID_CELL_SIZE = 100
+
+
+@dataclass
+class Viewport:
+	"""CSS layout viewport of the main frame (Page.getLayoutMetrics cssLayoutViewport)"""
+
+	scroll_x: float
+	scroll_y: float
+	width: float
+	height: float
+
+
+@dataclass
+class SnapshotResult:
+	element_tree: DOMElementNode
+	selector_map: SelectorMap
+	# backendNodeId of each highlighted element by highlight index, None for elements of child documents
+	backend_node_ids: list[Optional[int]]
+	elements_above: int = 0
+	elements_below: int = 0
+
+
+class _Document:
+	"""Column accessors for one document of the snapshot"""
+
+	def __init__(self, document: dict, strings: list[str]):
+		nodes = document['nodes']
+		layout = document['layout']
+		self.strings = strings
+		self.parents: list[int] = nodes['parentIndex']
+		self.types: list[int] = nodes['nodeType']
+		self.names: list[int] = nodes['nodeName']
+		self.values: list[int] = nodes['nodeValue']
+		self.backend_node_ids: list[int] = nodes['backendNodeId']
+		self.attributes: list[list[int]] = nodes['attributes']
+		self.clickable = set(nodes.get('isClickable', {}).get('index', []))
+		self.pseudo = set(nodes.get('pseudoType', {}).get('index', []))
+		content_documents = nodes.get('contentDocumentIndex', {'index': [], 'value': []})
+		self.content_documents = dict(zip(content_documents['index'], content_documents['value']))
+
+		self.children: list[list[int]] = [[] for _ in self.parents]
+		# position among the element siblings with the same name, for xpaths
+		self.sibling_index: list[int] = [0] * len(self.parents)
+		sibling_counts: dict[tuple[int, int], int] = {}
+		for i, parent in enumerate(self.parents):
+			if parent >= 0:
+				self.children[parent].append(i)
+				if self.types[i] == _ELEMENT_NODE:
+					key = (parent, self.names[i])
+					self.sibling_index[i] = sibling_counts.get(key, 0)
+					sibling_counts[key] = self.sibling_index[i] + 1
+		self.xpaths: dict[int, str] = {}
+
+		# node index -> layout index
+		self.layout_index = {node: i for i, node in enumerate(layout['nodeIndex'])}
+		self.bounds: list[list[float]] = layout['bounds']
+		self.styles: list[list[int]] = layout['styles']
+		self.paint_orders: list[int] = layout.get('paintOrders') or [0] * len(self.bounds)
+
+	def string(self, string_id: int) -> Optional[str]:
+		return self.strings[string_id] if string_id >= 0 else None
+
+	def tag_name(self, i: int) -> str:
+		return self.strings[self.names[i]].lower()
+
+	def get_attributes(self, i: int) -> dict[str, str]:
+		ids = self.attributes[i]
+		return {self.strings[ids[j]]: self.strings[ids[j + 1]] for j in range(0, len(ids), 2)}
+
+	def style(self, layout_index: int, style: int) -> str:
+		styles = self.styles[layout_index]
+		return self.strings[styles[style]] if style < len(styles) and styles[style] >= 0 else ''
+
+	def find_body(self) -> Optional[int]:
+		for i, type_ in enumerate(self.types):
+			if type_ == _ELEMENT_NODE and self.tag_name(i) == 'body':
+				return i
+		return None
+
+
+class _HitTester:
+	"""
+	Top element detection like document.elementFromPoint: the painted box with the highest paint order
+	at a point wins. Boxes are bucketed in a grid over the viewport, so a lookup only checks the boxes
+	of one cell instead of the whole document.
+	"""
+
+	def __init__(self, document: _Document, viewport: Viewport):
+		self.document = document
+		self.viewport = viewport
+		self.columns = max(1, int(viewport.width // _GRID_CELL_SIZE) + 1)
+		self.rows = max(1, int(viewport.height // _GRID_CELL_SIZE) + 1)
+		self.cells: list[list[int]] = [[] for _ in range(self.columns * self.rows)]
+
+		for node, layout_index in document.layout_index.items():
+			if document.style(layout_index, _POINTER_EVENTS) == 'none':
+				continue
+			if document.style(layout_index, _VISIBILITY) == 'hidden':
+				continue
+			x, y, width, height = self._viewport_rect(layout_index)
+			if width <= 0 or height <= 0:
+				continue
+			first_column, last_column = self._cell_range(x, x + width, self.columns)
+			first_row, last_row = self._cell_range(y, y + height, self.rows)
+			for row in range(first_row, last_row + 1):
+				for column in range(first_column, last_column + 1):
+					self.cells[row * self.columns + column].append(node)
+
+	def _viewport_rect(self, layout_index: int) -> tuple[float, float, float, float]:
+		x, y, width, height = self.document.bounds[layout_index][:4]
+		return x - self.viewport.scroll_x, y - self.viewport.scroll_y, width, height
+
+	@staticmethod
+	def _cell_range(start: float, end: float, count: int) -> tuple[int, int]:
+		first = min(count - 1, max(0, int(start // _GRID_CELL_SIZE)))
+		last = min(count - 1, max(0, int(end // _GRID_CELL_SIZE)))
+		return first, last
+
+	def element_at(self, x: float, y: float) -> Optional[int]:
+		if not (0 <= x < self.viewport.width and 0 <= y < self.viewport.height):
+			return None
+		column = min(self.columns - 1, int(x // _GRID_CELL_SIZE))
+		row = min(self.rows - 1, int(y // _GRID_CELL_SIZE))
+
+		top, top_order = None, -1
+		for node in self.cells[row * self.columns + column]:
+			layout_index = self.document.layout_index[node]
+			box_x, box_y, width, height = self._viewport_rect(layout_index)
+			if box_x <= x <= box_x + width and box_y <= y <= box_y + height:
+				order = self.document.paint_orders[layout_index]
+				if order > top_order:
+					top, top_order = node, order
+
+		# text boxes hit their element
+		if top is not None and self.document.types[top] != _ELEMENT_NODE:
+			top = self.document.parents[top]
+		return top
+
+	def is_top_element(self, node: int) -> bool:
+		x, y, width, height = self._viewport_rect(self.document.layout_index[node])
+		top = self.element_at(x + width / 2, y + height / 2)
+		while top is not None and top >= 0:
+			if top == node:
+				return True
+			top = self.document.parents[top]
+		return False
+
+
+def _is_interactive(document: _Document, i: int, tag_name: str, attributes: dict[str, str]) -> bool:
+	tab_index = attributes.get('tabindex')
+	if (
+		tag_name in _INTERACTIVE_TAGS
+		or attributes.get('role') in _INTERACTIVE_ROLES
+		or attributes.get('aria-role') in _INTERACTIVE_ROLES
+		or (tab_index is not None and tab_index != '-1')
+		or attributes.get('data-action') in ('a-dropdown-select', 'a-dropdown-button')
+	):
+		return True
+
+	# isClickable covers click listeners as well, which the page itself cannot list
+	if i in document.clickable or any(name in attributes for name in _CLICK_HANDLER_ATTRIBUTES):
+		return True
+	if any(name in attributes for name in _ARIA_STATE_ATTRIBUTES):
+		return True
+
+	# element.draggable, images and links are draggable by default
+	draggable = attributes.get('draggable')
+	if draggable == 'true':
+		return True
+	return draggable != 'false' and (tag_name == 'img' or (tag_name == 'a' and 'href' in attributes))
+
+
+def _is_interactive_candidate(tag_name: str, attributes: dict[str, str]) -> bool:
+	"""Cheap check used to count skipped off-screen elements, like countInteractiveCandidates"""
+	return (
+		tag_name in _INTERACTIVE_TAGS
+		or attributes.get('role') in _INTERACTIVE_ROLES
+		or ('tabindex' in attributes and attributes['tabindex'] != '-1')
+		or 'onclick' in attributes
+	)
+
+
+def _xpath(document: _Document, i: int) -> str:
+	"""Same as getXPathTree: tag names with 1-based index among equally named siblings, up to the
+	document, shadow root or iframe. Memoized per document, parents are visited first."""
+	xpath = document.xpaths.get(i)
+	if xpath is not None:
+		return xpath
+
+	name = document.strings[document.names[i]].lower()
+	index = document.sibling_index[i]
+	segment = f'{name}[{index + 1}]' if index else name
+
+	parent = document.parents[i]
+	if parent >= 0 and document.types[parent] == _ELEMENT_NODE:
+		xpath = f'{_xpath(document, parent)}/{segment}'
+	else:
+		xpath = segment
+	document.xpaths[i] = xpath
+	return xpath
+
+
+def parse_dom_snapshot(
+	snapshot: dict, viewport: Viewport, viewport_expansion: Optional[int] = None, max_depth: int = 500
+) -> Optional[SnapshotResult]:
+	"""
+	Build the element tree of a DOMSnapshot.captureSnapshot result (computedStyles must be
+	SNAPSHOT_COMPUTED_STYLES, with paint orders). Returns None if the snapshot has no body.
+	"""
+	strings: list[str] = snapshot['strings']
+	documents = [_Document(document, strings) for document in snapshot['documents']]
+	if not documents:
+		return None
+	main = documents[0]
+	body = main.find_body()
+	if body is None:
+		return None
+
+	hit_tester = _HitTester(main, viewport)
+	selector_map: SelectorMap = {}
+	backend_node_ids: list[Optional[int]] = []
+	interned: dict[int, str] = {}
+	offscreen = [0, 0]
+
+	def is_visible(document: _Document, i: int) -> bool:
+		layout_index = document.layout_index.get(i)
+		if layout_index is None:
+			return False
+		_, _, width, height = document.bounds[layout_index][:4]
+		return (
+			width > 0
+			and height > 0
+			and document.style(layout_index, _VISIBILITY) != 'hidden'
+			and document.style(layout_index, _DISPLAY) != 'none'
+		)
+
+	def is_text_visible(document: _Document, i: int) -> bool:
+		layout_index = document.layout_index.get(i)
+		if layout_index is None:
+			return False
+		_, y, width, height = document.bounds[layout_index][:4]
+		if width == 0 or height == 0:
+			return False
+		if document is main and not (0 <= y - viewport.scroll_y <= viewport.height):
+			return False
+
+		parent = document.parents[i]
+		parent_layout = document.layout_index.get(parent)
+		return (
+			parent_layout is not None
+			and document.style(parent_layout, _VISIBILITY) != 'hidden'
+			and document.style(parent_layout, _OPACITY) != '0'
+		)
+
+	def viewport_position(i: int) -> int:
+		layout_index = main.layout_index.get(i)
+		if layout_index is None:
+			return 0
+		_, y, width, height = main.bounds[layout_index][:4]
+		if width == 0 and height == 0:
+			return 0
+		top = y - viewport.scroll_y
+		if top + height < -viewport_expansion:  # type: ignore
+			return -1
+		if top > viewport.height + viewport_expansion:  # type: ignore
+			return 1
+		return 0
+
+	def count_candidates(document: _Document, i: int) -> int:
+		count = 0
+		stack = [i]
+		while stack:
+			node = stack.pop()
+			if document.types[node] == _ELEMENT_NODE and _is_interactive_candidate(
+				document.tag_name(node), document.get_attributes(node)
+			):
+				count += 1
+			stack.extend(document.children[node])
+		return count
+
+	def intern(document: _Document, string_id: int) -> str:
+		if document is not main:
+			return sys.intern(document.strings[string_id].lower())
+		if string_id not in interned:
+			interned[string_id] = sys.intern(document.strings[string_id].lower())
+		return interned[string_id]
+
+	# children are visited in document order, shadow roots are flattened into their host
+	root: Optional[DOMElementNode] = None
+	stack: list[tuple[_Document, int, Optional[DOMElementNode], int]] = [(main, body, None, 0)]
+	while stack:
+		document, i, parent, depth = stack.pop()
+		if depth > max_depth or i in document.pseudo:
+			continue
+		node_type = document.types[i]
+
+		if node_type == _TEXT_NODE:
+			text = (document.string(document.values[i]) or '').strip()
+			if text and is_text_visible(document, i):
+				parent.children.append(DOMTextNode(text=text, is_visible=True, parent=parent))  # type: ignore
+			continue
+
+		if node_type == _DOCUMENT_FRAGMENT_NODE and parent is not None:
+			parent.shadow_root = True
+			for child in reversed(document.children[i]):
+				stack.append((document, child, parent, depth))
+			continue
+
+		if node_type != _ELEMENT_NODE:
+			continue
+
+		tag_name = intern(document, document.names[i])
+		if tag_name in _DENIED_TAGS:
+			continue
+		attributes = document.get_attributes(i)
+
+		if viewport_expansion is not None and document is main:
+			position = viewport_position(i)
+			if position != 0:
+				offscreen[0 if position < 0 else 1] += count_candidates(document, i)
+				continue
+
+		is_interactive = _is_interactive(document, i, tag_name, attributes)
+		is_visible_element = is_visible(document, i)
+		# elements of child documents are top elements by default, like in buildDomTree.js
+		is_top = document is not main or (i in document.layout_index and hit_tester.is_top_element(i))
+
+		node = DOMElementNode(
+			tag_name=tag_name,
+			xpath=_xpath(document, i),
+			pyne_selector='',
+			attributes=attributes,
+			children=[],
+			is_visible=is_visible_element,
+			is_interactive=is_interactive,
+			is_top_element=is_top,
+			parent=parent,
+		)
+		if parent is not None:
+			node._branch_path_hash = HistoryTreeProcessor._child_branch_path_hash(parent, tag_name)
+		else:
+			node._branch_path_hash = 0
+		if is_interactive and is_visible_element and is_top:
+			node.highlight_index = len(backend_node_ids)
+			selector_map[node.highlight_index] = node
+			backend_node_ids.append(document.backend_node_ids[i] if document is main else None)
+
+		if parent is None:
+			root = node
+		else:
+			parent.children.append(node)
+
+		content_document = document.content_documents.get(i)
+		if content_document is not None:
+			child_document = documents[content_document]
+			child_body = child_document.find_body()
+			if child_body is not None:
+				for child in reversed(child_document.children[child_body]):
+					stack.append((child_document, child, node, depth + 1))
+		elif tag_name != 'iframe':
+			for child in reversed(document.children[i]):
+				stack.append((document, child, node, depth + 1))
+
+	if root is None:
+		return None
+	return SnapshotResult(
+		element_tree=root,
+		selector_map=selector_map,
+		backend_node_ids=backend_node_ids,
+		elements_above=offscreen[0],
+		elements_below=offscreen[1],
+	)
@@ -0,0 +1,156 @@
+import time
+from typing import Optional
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.accessibility import build_ax_tree, collect_ax_elements
+from browser_use.dom.history_tree_processor.service import HistoryTreeProcessor
+from browser_use.dom.service import DomService
+from browser_use.dom.views import DOMElementNode, DOMState, DOMTextNode
+
+
+def ax_node(
+	node_id: str, role: str, name: str = '', children: Optional[list[str]] = None, parent: str = '', **extra
+):
+	node = {
+		'nodeId': node_id,
+		'role': {'type': 'role', 'value': role},
+		'name': {'type': 'computedString', 'value': name},
+		'childIds': children or [],
+		'backendDOMNodeId': int(node_id),
+		**extra,
+	}
+	if parent:
+		node['parentId'] = parent
+	return node
+
+
+AX_NODES = [
+	ax_node('1', 'RootWebArea', 'Form', ['2', '3', '4', '5', '6', '7']),
+	ax_node('2', 'heading', 'Sign in', parent='1'),
+	ax_node('3', 'textbox', 'Email', parent='1', value={'type': 'string', 'value': 'a@b.c'}),
+	ax_node('4', 'generic', '', parent='1'),
+	ax_node('5', 'button', 'Hidden', parent='1', properties=[{'name': 'hidden', 'value': {'value': True}}]),
+	ax_node('6', 'button', 'Submit', parent='1'),
+	ax_node('7', 'link', 'Terms', parent='1'),
+]
+
+
+def test_collect_ax_elements():
+	elements = collect_ax_elements(AX_NODES)
+	assert [(element.role, element.name, element.interactive) for element in elements] == [
+		('heading', 'Sign in', False),
+		('textbox', 'Email', True),
+		('button', 'Submit', True),
+		('link', 'Terms', True),
+	]
+
+
+def test_build_ax_tree():
+	elements = collect_ax_elements(AX_NODES)
+	descriptions = [
+		{
+			'tagName': 'input',
+			'xpath': 'html/body/form/input',
+			'attributes': {'type': 'email'},
+			'branchPath': ['form', 'input'],
+			'isTopElement': True,
+		},
+		None,
+		# below the viewport
+		{'tagName': 'a', 'xpath': 'html/body/a', 'attributes': {}, 'branchPath': ['a'], 'isTopElement': False},
+	]
+	root, selector_map = build_ax_tree(elements, descriptions)
+
+	assert list(selector_map) == [0]
+	email = selector_map[0]
+	assert email.attributes == {'type': 'email', 'role': 'textbox'}
+	# same hash as the element in the tree of the js backend: DOM tag path, attributes of the page
+	assert email.hash.branch_path_hash == HistoryTreeProcessor._parent_branch_path_hash(['form', 'input'])
+	assert email.hash.attributes_hash == HistoryTreeProcessor._attributes_hash({'type': 'email'})
+	assert isinstance(email.children[0], DOMTextNode) and email.children[0].text == 'Email: a@b.c'
+	assert isinstance(root.children[0], DOMTextNode) and root.children[0].text == 'Sign in'
+	assert '0[:]<input type="email" role="textbox">Email: a@b.c</input>' in root.clickable_elements_to_string(
+		include_attributes=['type', 'role']
+	)
+
+
+def test_ax_history_replays():
+	elements = collect_ax_elements(AX_NODES)
+	description = {
+		'tagName': 'input',
+		'xpath': 'html/body/form/input',
+		'attributes': {'type': 'email'},
+		'branchPath': ['form', 'input'],
+		'isTopElement': True,
+	}
+	root, selector_map = build_ax_tree(elements, [description, None, None])
+	history_element = HistoryTreeProcessor.convert_dom_element_to_history_element(selector_map[0])
+	assert history_element.entire_parent_branch_path == ['form', 'input']
+	assert history_element.attributes == {'type': 'email'}
+
+	# found again in the next ax state
+	root, selector_map = build_ax_tree(elements, [description, None, None])
+	state = DOMState(element_tree=root, selector_map=selector_map)
+	assert HistoryTreeProcessor.find_history_element_in_state(history_element, state) is selector_map[0]
+
+	# and in the tree of the js backend
+	body = DOMElementNode(
+		tag_name='body', xpath='html/body', pyne_selector='', attributes={}, children=[], is_visible=True, parent=None
+	)
+	form = DOMElementNode(
+		tag_name='form', xpath='html/body/form', pyne_selector='', attributes={}, children=[], is_visible=True, parent=body
+	)
+	email = DOMElementNode(
+		tag_name='input',
+		xpath='html/body/form/input',
+		pyne_selector='',
+		attributes={'type': 'email'},
+		children=[],
+		is_visible=True,
+		highlight_index=0,
+		parent=form,
+	)
+	body.children.append(form)
+	form.children.append(email)
+	state = DOMState(element_tree=body, selector_map={0: email})
+	assert HistoryTreeProcessor.find_history_element_in_state(history_element, state) is email
+
+
+FORM_HTML = '<html><body><h1>Checkout</h1><form>{}</form></body></html>'.format(
+	''.join(
+		f'<div class="field"><div class="wrapper"><label for="f{i}">Field {i}</label>'
+		f'<input id="f{i}" name="f{i}"></div><p class="help">Help text for field {i}</p></div>'
+		for i in range(200)
+	)
+)
+
+
+# run with: pytest browser_use/dom/tests/accessibility_test.py -s
+async def test_ax_backend_against_dom_walk():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(FORM_HTML)
+
+		results = {}
+		for backend in ('js', 'ax'):
+			start = time.perf_counter()
+			state = await DomService(page, backend=backend).get_clickable_elements(
+				highlight_elements=False, incremental=False
+			)
+			elapsed = time.perf_counter() - start
+			results[backend] = (elapsed, state, state.element_tree.clickable_elements_to_string())
+
+		for backend, (elapsed, state, text) in results.items():
+			print(
+				f'\n{backend}: {elapsed * 1000:.1f}ms, {len(state.selector_map)} elements, {len(text)} prompt characters'
+			)
+
+		ax_inputs = {node.hash: node.xpath for node in results['ax'][1].selector_map.values() if node.tag_name == 'input'}
+		js_inputs = {node.hash: node.xpath for node in results['js'][1].selector_map.values() if node.tag_name == 'input'}
+		# the same inputs in the viewport, with the same hashes
+		assert js_inputs and js_inputs == ax_inputs
+		assert results['ax'][1].elements_below > 0
+
+	await browser.close()
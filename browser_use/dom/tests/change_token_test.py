@@ -0,0 +1,77 @@
+from browser_use.browser.browser import Browser, BrowserConfig
+
+HTML = """<html><head><style>
+.more {{ display: none; }}
+#toggle:checked + .more {{ display: block; }}
+.d-none {{ display: none; }}
+input {{ transition: border-color 10ms; }}
+input:focus {{ border-color: blue; }}
+</style></head><body>
+<form>{}</form>
+<button id="later" hidden>Later</button><a id="promo" class="d-none" href="#promo">Promo</a>
+<div id="menu"><a href="#a">A</a></div>
+<input type="checkbox" id="toggle"><div class="more"><a href="#b">B</a></div>
+</body></html>""".format(''.join(f'<input id="f{i}">' for i in range(5)))
+
+
+async def test_page_change_token():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+		await context.get_state()
+
+		token = await context.get_page_change_token()
+		assert token is not None
+
+		# class changes of leaf elements reveal nothing
+		await page.evaluate("document.getElementById('f0').className = 'invalid'")
+		assert await context.get_page_change_token() == token
+
+		# :checked, :focus-within and friends reveal elements without any DOM mutation
+		await page.click('#toggle')
+		checked = await context.get_page_change_token()
+		assert checked != token
+
+		# containers that change their classes may show new elements
+		await page.evaluate("document.getElementById('menu').className = 'open'")
+		changed = await context.get_page_change_token()
+		assert changed != checked
+
+		await page.evaluate("document.body.appendChild(document.createElement('button'))")
+		added = await context.get_page_change_token()
+		assert added != changed
+
+		await page.evaluate("history.pushState({}, '', '#next')")
+		navigated = await context.get_page_change_token()
+		assert navigated != added
+
+		# interactive leaves that show up, without a container around them that changes
+		await page.evaluate("document.getElementById('later').hidden = false")
+		shown = await context.get_page_change_token()
+		assert shown != navigated
+
+		await page.evaluate("document.getElementById('promo').classList.remove('d-none')")
+		assert await context.get_page_change_token() != shown
+
+	await browser.close()
+
+
+async def test_fills_keep_page_change_token():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+		await context.get_state()
+		token = await context.get_page_change_token()
+
+		# typing, focus changes and focus ring transitions reveal nothing, chained fills go on
+		for i in range(5):
+			await page.fill(f'#f{i}', f'value {i}')
+		await page.evaluate("document.getElementById('f0').className = 'valid'")
+		await page.wait_for_timeout(50)
+		assert await context.get_page_change_token() == token
+
+	await browser.close()
@@ -0,0 +1,188 @@
+from typing import Optional
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.service import (
+	COLUMNAR_INTERACTIVE,
+	COLUMNAR_SHADOW_ROOT,
+	COLUMNAR_TEXT,
+	COLUMNAR_TOP,
+	COLUMNAR_VISIBLE,
+	MAX_DOM_DEPTH,
+	DomService,
+)
+from browser_use.dom.tests.parse_benchmark_test import make_deep_tree, make_tree
+from browser_use.dom.views import DOMBaseNode, DOMElementNode, DOMTextNode
+
+
+def encode_columnar(root: dict) -> dict:
+	"""Same encoding as encodeColumnar of buildDomTree.js"""
+	strings: list[str] = []
+	string_ids: dict[str, int] = {}
+
+	def intern(value):
+		if value not in string_ids:
+			string_ids[value] = len(strings)
+			strings.append(value)
+		return string_ids[value]
+
+	columns: dict[str, list] = {
+		'parents': [],
+		'flags': [],
+		'names': [],
+		'xpaths': [],
+		'selectors': [],
+		'highlights': [],
+		'attrOffsets': [0],
+		'attrs': [],
+	}
+	stack: list[tuple[dict, int]] = [(root, -1)]
+	while stack:
+		node_data, parent = stack.pop()
+		node_id = len(columns['parents'])
+		columns['parents'].append(parent)
+		if node_data.get('type') == 'TEXT_NODE':
+			columns['flags'].append(COLUMNAR_TEXT | (COLUMNAR_VISIBLE if node_data['isVisible'] else 0))
+			columns['names'].append(intern(node_data['text']))
+			columns['xpaths'].append(-1)
+			columns['selectors'].append(-1)
+			columns['highlights'].append(-1)
+		else:
+			columns['flags'].append(
+				(COLUMNAR_VISIBLE if node_data.get('isVisible') else 0)
+				| (COLUMNAR_INTERACTIVE if node_data.get('isInteractive') else 0)
+				| (COLUMNAR_TOP if node_data.get('isTopElement') else 0)
+				| (COLUMNAR_SHADOW_ROOT if node_data.get('shadowRoot') else 0)
+			)
+			columns['names'].append(intern(node_data['tagName']))
+			columns['xpaths'].append(intern(node_data['xpath']))
+			columns['selectors'].append(intern(node_data['pyneSelector']))
+			columns['highlights'].append(node_data.get('highlightIndex', -1))
+			for name, value in node_data['attributes'].items():
+				columns['attrs'].extend([intern(name), intern(value)])
+		columns['attrOffsets'].append(len(columns['attrs']))
+		for child in reversed(node_data.get('children', [])):
+			if child:
+				stack.append((child, node_id))
+	return {'strings': strings, **columns}
+
+
+def flatten(root: DOMElementNode) -> list[tuple]:
+	"""Pre-order list of everything the formats transport, parents as positions in the list"""
+	positions: dict[int, int] = {}
+	rows: list[tuple] = []
+	stack: list[DOMBaseNode] = [root]
+	while stack:
+		node = stack.pop()
+		positions[id(node)] = len(rows)
+		parent = positions[id(node.parent)] if node.parent is not None else None
+		if isinstance(node, DOMTextNode):
+			rows.append(('text', parent, node.text, node.is_visible))
+			continue
+		assert isinstance(node, DOMElementNode)
+		rows.append(
+			(
+				node.tag_name,
+				parent,
+				node.xpath,
+				node.pyne_selector,
+				node.attributes,
+				node.is_visible,
+				node.is_interactive,
+				node.is_top_element,
+				node.shadow_root,
+				node.highlight_index,
+			)
+		)
+		stack.extend(reversed(node.children))
+	return rows
+
+
+def parse_both(tree: dict) -> tuple[DomService, DomService]:
+	"""Services that parsed the tree in both formats, the results are in their `_nodes`"""
+	nested, columnar = DomService(None), DomService(None)  # type: ignore
+	nested._parse_eval_page({'tree': tree})
+	columnar._parse_eval_page({'columns': encode_columnar(tree)})
+	return nested, columnar
+
+
+def test_columnar_decodes_the_nested_tree():
+	tree = make_tree(2_000)
+	# comment nodes come without a tag name, shadow hosts are flagged
+	tree['children'].append({'tagName': None, 'xpath': '', 'pyneSelector': '', 'attributes': {}, 'children': []})
+	tree['children'][0]['shadowRoot'] = True
+
+	nested_root, nested_map = DomService(None)._parse_eval_page({'tree': tree})  # type: ignore
+	columnar_root, columnar_map = DomService(None)._parse_eval_page({'columns': encode_columnar(tree)})  # type: ignore
+
+	assert flatten(columnar_root) == flatten(nested_root)
+	assert list(columnar_map) == list(nested_map)
+	assert all(columnar_map[i].xpath == nested_map[i].xpath for i in nested_map)
+
+
+def test_columnar_truncates_deep_trees_like_nested():
+	depth = MAX_DOM_DEPTH + 50
+	tree = make_deep_tree(depth)
+	nested, columnar = parse_both(tree)
+
+	assert flatten(columnar._nodes[0]) == flatten(nested._nodes[0])  # type: ignore
+	# one entry per node of the page, dropped ones included, so node ids stay aligned
+	assert len(columnar._nodes) == len(nested._nodes) == depth + 1
+	assert columnar._nodes[MAX_DOM_DEPTH + 1] is None and nested._nodes[MAX_DOM_DEPTH + 1] is None
+
+
+def test_columnar_node_ids_align_with_patches():
+	tree = make_tree(500)
+	nested, columnar = parse_both(tree)
+
+	# pre-order node ids, as assigned by buildDomTree.js
+	element_id = next(i for i, node in enumerate(nested._nodes) if isinstance(node, DOMElementNode) and i > 0)
+	text_id = next(i for i, node in enumerate(nested._nodes) if isinstance(node, DOMTextNode))
+	patch = {'attributes': [[element_id, {'class': 'patched'}]], 'texts': [[text_id, 'patched text']]}
+
+	for service in (nested, columnar):
+		assert service._apply_patch(patch)
+		element: Optional[DOMBaseNode] = service._nodes[element_id]
+		text: Optional[DOMBaseNode] = service._nodes[text_id]
+		assert isinstance(element, DOMElementNode) and element.attributes == {'class': 'patched'}
+		assert isinstance(text, DOMTextNode) and text.text == 'patched text'
+	assert flatten(columnar._nodes[0]) == flatten(nested._nodes[0])  # type: ignore
+
+
+HTML = """
+<html><body>
+	<h1 class="title">Columns</h1>
+	<!-- comment -->
+	<form id="form">
+		<label for="q">Search</label><input id="q" name="q" placeholder="Query">
+		<button type="submit" data-test="go">Go</button>
+	</form>
+	<div id="host"></div>
+	<ul>{}</ul>
+	<script>
+		document.getElementById('host').attachShadow({{ mode: 'open' }}).innerHTML = '<a href="#s">Shadow link</a>';
+	</script>
+</body></html>
+""".format(''.join(f'<li><a href="#{i}" class="item">Item {i}</a> text {i}</li>' for i in range(50)))
+
+
+async def test_columnar_extraction_matches_nested():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+
+		states = []
+		for wire_format in ('nested', 'columnar'):
+			state = await DomService(page, wire_format=wire_format).get_clickable_elements(
+				highlight_elements=False, incremental=False
+			)
+			states.append(state)
+		nested, columnar = states
+
+		assert flatten(columnar.element_tree) == flatten(nested.element_tree)
+		assert list(columnar.selector_map) == list(nested.selector_map)
+		# the shadow host is part of the comparison
+		assert any(row[0] == 'div' and row[8] for row in flatten(nested.element_tree))
+
+	await browser.close()
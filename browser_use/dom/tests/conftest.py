@@ -0,0 +1,18 @@
+import pytest
+
+
+def make_rows_page(n_rows: int = 500) -> str:
+	"""Listing page with 3 interactive elements and some text per row"""
+	return '<html><body>{}</body></html>'.format(
+		''.join(
+			f'<div class="row"><a href="#{i}">Item {i}</a><span>Description {i}</span>'
+			f'<button>Buy {i}</button><input placeholder="Qty {i}"></div>'
+			for i in range(n_rows)
+		)
+	)
+
+
+@pytest.fixture
+def rows_page():
+	"""Builds the shared listing page of the benchmarks, pass the number of rows"""
+	return make_rows_page
@@ -0,0 +1,39 @@
+import time
+from importlib import resources
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.service import EXTRACT_DOM_TREE_JS
+
+N_CALLS = 50
+ARGS = {'doHighlightElements': False, 'sinceVersion': None}
+
+
+# run with: pytest browser_use/dom/tests/extract_benchmark_test.py -s
+async def test_extract_entry_point_latency(rows_page):
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		# a page with a few thousand nodes, similar to a medium sized listing page
+		await page.set_content(rows_page(500))
+
+		# before: read the script and ship it with every evaluate
+		start = time.perf_counter()
+		for _ in range(N_CALLS):
+			js_code = resources.read_text('browser_use.dom', 'buildDomTree.js')
+			await page.evaluate(
+				'([js, args]) => { delete window.__browserUse.extract; (0, eval)(js); return window.__browserUse.extract(args); }',
+				[js_code, ARGS],
+			)
+		before = (time.perf_counter() - start) / N_CALLS
+
+		# after: the script is installed once, only the entry point is called
+		start = time.perf_counter()
+		for _ in range(N_CALLS):
+			await page.evaluate(EXTRACT_DOM_TREE_JS, ARGS)
+		after = (time.perf_counter() - start) / N_CALLS
+
+		print(f'\nper call - shipped script: {before * 1000:.1f}ms, installed entry point: {after * 1000:.1f}ms')
+		assert after <= before
+
+	await browser.close()
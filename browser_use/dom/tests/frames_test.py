@@ -0,0 +1,47 @@
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.service import DomService
+from browser_use.dom.views import DOMElementNode
+
+HTML = """
+<html><body>
+	<button>Main</button>
+	<iframe id="child" srcdoc="<button>Framed</button><a href='#x'>Framed link</a>"></iframe>
+	<a href="#y">After</a>
+</body></html>
+"""
+
+
+async def test_frames_are_extracted_separately():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+		await page.frames[1].wait_for_load_state()
+
+		dom_service = DomService(page)
+		state = await dom_service.get_clickable_elements()
+
+		# highlight indices are unique over all frames
+		assert sorted(state.selector_map) == list(range(len(state.selector_map)))
+		framed = [node for node in state.selector_map.values() if node.frame is not None]
+		assert {node.tag_name for node in framed} == {'button', 'a'}
+		assert all(node.frame == page.frames[1] for node in framed)
+
+		# frame elements are stitched under their iframe element
+		for node in framed:
+			parent = node.parent
+			while parent is not None and parent.tag_name != 'iframe':
+				parent = parent.parent
+			assert isinstance(parent, DOMElementNode)
+
+		# selectors are generated in the frame of the element
+		index = framed[0].highlight_index
+		selectors = await dom_service.get_pyne_selectors([index])
+		assert selectors[index]
+
+		# unchanged frames are patched
+		again = await dom_service.get_clickable_elements()
+		assert again.element_tree is state.element_tree
+
+	await browser.close()
@@ -0,0 +1,136 @@
+import hashlib
+import time
+from typing import Optional
+
+import pytest
+
+from browser_use.dom.history_tree_processor.service import HistoryTreeProcessor
+from browser_use.dom.history_tree_processor.view import DOMHistoryElement, HashedDomElement
+from browser_use.dom.service import DomService
+from browser_use.dom.tests.parse_benchmark_test import make_tree
+from browser_use.dom.views import DOMElementNode, DOMState
+
+
+def make_state(n_nodes: int) -> DOMState:
+	element_tree, selector_map = DomService(None)._build_dom_tree(make_tree(n_nodes))  # type: ignore
+	return DOMState(element_tree=element_tree, selector_map=selector_map)
+
+
+def history_elements(state: DOMState, n: int) -> list[DOMHistoryElement]:
+	nodes = list(state.selector_map.values())
+	step = max(len(nodes) // n, 1)
+	return [HistoryTreeProcessor.convert_dom_element_to_history_element(node) for node in nodes[::step][:n]]
+
+
+# Previous implementation: hash every highlighted element of the tree for each lookup
+def tree_walk_lookup(element: DOMHistoryElement, tree: DOMElementNode) -> Optional[DOMElementNode]:
+	hashed = HistoryTreeProcessor._hash_dom_history_element(element)
+	stack = [tree]
+	while stack:
+		node = stack.pop()
+		if node.highlight_index is not None and HistoryTreeProcessor._hash_dom_element(node) == hashed:
+			return node
+		stack.extend(child for child in reversed(node.children) if isinstance(child, DOMElementNode))
+	return None
+
+
+def walked_hash(node: DOMElementNode) -> HashedDomElement:
+	return HashedDomElement(
+		HistoryTreeProcessor._parent_branch_path_hash(HistoryTreeProcessor._get_parent_branch_path(node)),
+		HistoryTreeProcessor._attributes_hash(node.attributes),
+	)
+
+
+def test_rolling_branch_path_hashes():
+	state = make_state(2_000)
+	stack = [state.element_tree]
+	while stack:
+		node = stack.pop()
+		assert node._branch_path_hash == walked_hash(node).branch_path_hash
+		stack.extend(child for child in node.children if isinstance(child, DOMElementNode))
+
+	for node in state.selector_map.values():
+		# set while parsing
+		assert node._hash is not None and node._hash == walked_hash(node)
+
+
+def test_find_history_element_in_state():
+	state = make_state(2_000)
+	for element in history_elements(state, 20):
+		node = HistoryTreeProcessor.find_history_element_in_state(element, state)
+		assert node is not None
+		assert HistoryTreeProcessor.compare_history_element_and_dom_element(element, node)
+
+	missing = HistoryTreeProcessor.convert_dom_element_to_history_element(state.element_tree)
+	assert HistoryTreeProcessor.find_history_element_in_state(missing, state) is None
+
+
+def test_hash_index_reset_after_attribute_change():
+	state = make_state(500)
+	node = next(iter(state.selector_map.values()))
+	assert HistoryTreeProcessor.find_history_element_in_state(
+		HistoryTreeProcessor.convert_dom_element_to_history_element(node), state
+	)
+
+	# as DomService._apply_patch does for a patched element
+	node.attributes = {'id': 'changed'}
+	node._hash = None
+	state._hash_index = None
+	element = HistoryTreeProcessor.convert_dom_element_to_history_element(node)
+	assert HistoryTreeProcessor.find_history_element_in_state(element, state) is node
+
+
+# run with: pytest browser_use/dom/tests/hash_index_test.py -s -m slow
+@pytest.mark.slow
+@pytest.mark.parametrize('n_nodes', [10_000, 100_000])
+def test_rerun_lookup_benchmark(n_nodes: int):
+	"""Re-identifying the elements of a history step, as Agent._update_action_indices does on rerun"""
+	elements = history_elements(make_state(n_nodes), 50)
+
+	state = make_state(n_nodes)
+	start = time.perf_counter()
+	walked = [tree_walk_lookup(element, state.element_tree) for element in elements]
+	walk_time = time.perf_counter() - start
+
+	state = make_state(n_nodes)
+	start = time.perf_counter()
+	indexed = [HistoryTreeProcessor.find_history_element_in_state(element, state) for element in elements]
+	index_time = time.perf_counter() - start
+
+	print(
+		f'\n{n_nodes} nodes, {len(elements)} lookups - tree walk: {walk_time * 1000:.1f}ms, '
+		f'hash index: {index_time * 1000:.1f}ms, speedup: {walk_time / index_time:.1f}x'
+	)
+	assert all(node is not None for node in indexed)
+	assert [node.hash for node in walked] == [node.hash for node in indexed]  # type: ignore
+	assert index_time < walk_time
+
+
+# Previous implementation of the multi_act check: walk up and sha256 the path of every element
+def sha256_branch_path_hashes(state: DOMState) -> set[str]:
+	return set(
+		hashlib.sha256('/'.join(HistoryTreeProcessor._get_parent_branch_path(node)).encode()).hexdigest()
+		for node in state.selector_map.values()
+	)
+
+
+# run with: pytest browser_use/dom/tests/hash_index_test.py -s -m slow
+@pytest.mark.slow
+@pytest.mark.parametrize('n_nodes', [10_000, 100_000])
+def test_multi_act_hash_benchmark(n_nodes: int):
+	"""Branch path hashes of all highlighted elements, as Controller.multi_act compares them per action"""
+	state = make_state(n_nodes)
+
+	start = time.perf_counter()
+	sha256_branch_path_hashes(state)
+	walk_time = time.perf_counter() - start
+
+	start = time.perf_counter()
+	hashes = set(node.hash.branch_path_hash for node in state.selector_map.values())
+	rolling_time = time.perf_counter() - start
+
+	print(
+		f'\n{n_nodes} nodes, {len(state.selector_map)} elements - walk + sha256: {walk_time * 1000:.1f}ms, '
+		f'rolling: {rolling_time * 1000:.1f}ms, speedup: {walk_time / rolling_time:.1f}x'
+	)
+	assert len(hashes) == len(sha256_branch_path_hashes(state))
@@ -0,0 +1,33 @@
+from browser_use.browser.browser import Browser, BrowserConfig
+
+HTML = '<html><body>{}</body></html>'.format(''.join(f'<button>Button {i}</button>' for i in range(20)))
+
+LAYER_JS = """() => {
+	const container = document.getElementById('playwright-highlight-container');
+	return {
+		layers: container ? container.children.length : 0,
+		marked: document.querySelectorAll('[browser-user-highlight-id]').length,
+	};
+}"""
+
+
+async def test_highlights_single_layer():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+
+		# no screenshot, no highlights
+		await context.get_state(use_vision=False)
+		assert await page.evaluate(LAYER_JS) == {'layers': 0, 'marked': 0}
+
+		state = await context.get_state(use_vision=True)
+		layer = await page.evaluate(LAYER_JS)
+		assert layer['layers'] == 1
+		assert layer['marked'] == len(state.selector_map) > 0
+
+		await context.remove_highlights()
+		assert await page.evaluate(LAYER_JS) == {'layers': 0, 'marked': 0}
+
+	await browser.close()
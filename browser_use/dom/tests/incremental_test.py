@@ -0,0 +1,112 @@
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.service import DomService
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+HTML = """
+<html><body>
+	<button id="toggle" data-state="closed">Open menu</button>
+	<p id="status">Idle</p>
+	<ul id="list"><li><a href="#1">First</a></li></ul>
+</body></html>
+"""
+
+
+def _find_text(node: DOMElementNode, text: str) -> bool:
+	for child in node.children:
+		if isinstance(child, DOMTextNode) and child.text == text:
+			return True
+		if isinstance(child, DOMElementNode) and _find_text(child, text):
+			return True
+	return False
+
+
+async def test_incremental_dom_snapshots():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+
+		dom_service = DomService(page)
+		first = await dom_service.get_clickable_elements()
+
+		# unchanged page returns the cached state
+		second = await dom_service.get_clickable_elements()
+		assert second.element_tree is first.element_tree
+
+		# attribute and text changes are patched into the cached tree
+		await page.evaluate(
+			"""() => {
+				document.getElementById('toggle').setAttribute('data-state', 'open');
+				document.getElementById('status').firstChild.data = 'Busy';
+			}"""
+		)
+		patched = await dom_service.get_clickable_elements()
+		assert patched.element_tree is first.element_tree
+		button = next(n for n in patched.selector_map.values() if n.tag_name == 'button')
+		assert button.attributes['data-state'] == 'open'
+		assert _find_text(patched.element_tree, 'Busy')
+
+		# added nodes trigger a full extraction
+		await page.evaluate(
+			"""() => {
+				const li = document.createElement('li');
+				li.innerHTML = '<a href="#2">Second</a>';
+				document.getElementById('list').appendChild(li);
+			}"""
+		)
+		rebuilt = await dom_service.get_clickable_elements()
+		assert rebuilt.element_tree is not first.element_tree
+		assert len(rebuilt.selector_map) == len(first.selector_map) + 1
+
+	await browser.close()
+
+
+CSS_MENU_HTML = """
+<html><head><style>
+	.menu { display: none; }
+	#menu-toggle:checked + .menu { display: block; }
+</style></head><body>
+	<input type="checkbox" id="menu-toggle">
+	<ul class="menu"><li><a href="#settings">Settings</a></li></ul>
+</body></html>
+"""
+
+
+async def test_css_only_reveal_forces_full_extraction():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(CSS_MENU_HTML)
+
+		dom_service = DomService(page)
+		closed = await dom_service.get_clickable_elements()
+		assert not any(n.tag_name == 'a' for n in closed.selector_map.values())
+
+		# :checked shows the menu without any DOM mutation
+		await page.click('#menu-toggle')
+		opened = await dom_service.get_clickable_elements()
+		assert opened.element_tree is not closed.element_tree
+		assert any(n.tag_name == 'a' for n in opened.selector_map.values())
+
+	await browser.close()
+
+
+async def test_full_extraction_starts_a_new_version():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+
+		first_service, second_service = DomService(page), DomService(page)
+		first = await first_service.get_clickable_elements()
+		await second_service.get_clickable_elements()
+
+		# the other service renumbered the nodes, a patch against the first tree would be keyed wrongly
+		await page.evaluate("document.getElementById('toggle').setAttribute('data-state', 'open')")
+		state = await first_service.get_clickable_elements()
+		assert state.element_tree is not first.element_tree
+
+	await browser.close()
@@ -0,0 +1,34 @@
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.service import DomService
+
+
+async def _layout_count(cdp) -> float:
+	metrics = await cdp.send('Performance.getMetrics')
+	return next(m['value'] for m in metrics['metrics'] if m['name'] == 'LayoutCount')
+
+
+# run with: pytest browser_use/dom/tests/layout_test.py -s
+async def test_extraction_layout_count(rows_page):
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		# many highlighted elements with text, the case where interleaved highlighting forced a layout per element
+		await page.set_content(rows_page(500))
+
+		cdp = await page.context.new_cdp_session(page)
+		await cdp.send('Performance.enable')
+
+		before = await _layout_count(cdp)
+		state = await DomService(page).get_clickable_elements(highlight_elements=True, incremental=False)
+		layouts = await _layout_count(cdp) - before
+
+		stats = await page.evaluate('() => window.__browserUse.stats')
+		print(f'\nlayouts: {layouts:.0f} for {len(state.selector_map)} highlighted elements, stats: {stats}')
+
+		# reads and writes are no longer interleaved, so layouts do not grow with the element count
+		assert len(state.selector_map) > 0
+		assert layouts < 10
+		assert stats['highlights'] == len(state.selector_map)
+
+	await browser.close()
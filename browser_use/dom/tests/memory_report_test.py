@@ -0,0 +1,84 @@
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional
+
+import pytest
+
+from browser_use.dom.service import DomService
+from browser_use.dom.tests.parse_benchmark_test import make_tree
+
+
+# Previous node representation: regular dataclasses with a per-instance __dict__
+@dataclass
+class DictTextNode:
+	is_visible: bool
+	parent: Optional['DictElementNode']
+	text: str
+	type: str = 'TEXT_NODE'
+
+
+@dataclass
+class DictElementNode:
+	is_visible: bool
+	parent: Optional['DictElementNode']
+	tag_name: str
+	xpath: str
+	pyne_selector: str
+	attributes: dict[str, str]
+	children: list
+	is_interactive: bool = False
+	is_top_element: bool = False
+	shadow_root: bool = False
+	highlight_index: Optional[int] = None
+
+	@cached_property
+	def hash(self) -> str:
+		return ''
+
+
+def build_dict_nodes(node_data: dict, parent: Optional[DictElementNode] = None):
+	if node_data.get('type') == 'TEXT_NODE':
+		return DictTextNode(is_visible=node_data['isVisible'], parent=parent, text=node_data['text'])
+	node = DictElementNode(
+		is_visible=node_data.get('isVisible', False),
+		parent=parent,
+		tag_name=node_data['tagName'],
+		xpath=node_data['xpath'],
+		pyne_selector=node_data['pyneSelector'],
+		attributes=dict(node_data.get('attributes', {})),
+		children=[],
+		is_interactive=node_data.get('isInteractive', False),
+		is_top_element=node_data.get('isTopElement', False),
+		highlight_index=node_data.get('highlightIndex'),
+	)
+	node.children = [build_dict_nodes(child, node) for child in node_data['children']]
+	return node
+
+
+def measure(build) -> int:
+	gc.collect()
+	tracemalloc.start()
+	result = build()
+	size, _ = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	del result
+	return size
+
+
+# run with: pytest browser_use/dom/tests/memory_report_test.py -s -m slow
+@pytest.mark.slow
+def test_memory_per_10k_nodes():
+	n_nodes = 10_000
+	# payload strings are allocated before measuring, only the node objects are counted
+	tree = make_tree(n_nodes)
+
+	dict_nodes = measure(lambda: build_dict_nodes(tree))
+	slotted_nodes = measure(lambda: DomService(None)._build_dom_tree(tree))  # type: ignore
+
+	print(
+		f'\nmemory per {n_nodes} nodes - dict dataclasses: {dict_nodes / 1024:.0f} KiB, '
+		f'slotted + shared attributes: {slotted_nodes / 1024:.0f} KiB'
+	)
+	assert slotted_nodes < dict_nodes
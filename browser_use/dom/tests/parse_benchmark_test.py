@@ -0,0 +1,140 @@
+import gc
+import sys
+import time
+from typing import Optional
+
+import pytest
+
+from browser_use.dom.service import DomService
+from browser_use.dom.views import DOMBaseNode, DOMElementNode, DOMTextNode, SelectorMap
+
+
+def make_tree(n_nodes: int, branching: int = 6) -> dict:
+	"""Synthetic nested tree as returned by buildDomTree.js, every 5th element highlighted."""
+	root = {'tagName': 'body', 'xpath': 'body', 'pyneSelector': '', 'attributes': {}, 'children': []}
+	queue = [root]
+	count, highlight_index = 1, 0
+	while count < n_nodes:
+		parent = queue.pop(0)
+		for i in range(branching):
+			if count >= n_nodes:
+				break
+			if i == branching - 1:
+				child = {'type': 'TEXT_NODE', 'text': f'text {count}', 'isVisible': True}
+			else:
+				child = {
+					'tagName': 'div' if i % 2 else 'a',
+					'xpath': f'div[{i + 1}]',
+					'pyneSelector': '',
+					'attributes': {'class': f'c{i}'},
+					'isVisible': True,
+					'isInteractive': i % 2 == 0,
+					'isTopElement': True,
+					'children': [],
+				}
+				if count % 5 == 0:
+					child['highlightIndex'] = highlight_index
+					highlight_index += 1
+				queue.append(child)
+			parent['children'].append(child)
+			count += 1
+	return root
+
+
+def make_deep_tree(depth: int) -> dict:
+	root = {'tagName': 'body', 'xpath': 'body', 'pyneSelector': '', 'attributes': {}, 'children': []}
+	node = root
+	for i in range(depth):
+		child = {'tagName': 'div', 'xpath': 'div', 'pyneSelector': '', 'attributes': {}, 'children': []}
+		node['children'].append(child)
+		node = child
+	return root
+
+
+# Previous implementation: recursive parse followed by a second walk for the selector map
+def recursive_parse(node_data: dict, parent: Optional[DOMElementNode] = None) -> Optional[DOMBaseNode]:
+	if node_data.get('type') == 'TEXT_NODE':
+		return DOMTextNode(text=node_data['text'], is_visible=node_data['isVisible'], parent=parent)
+
+	element_node = DOMElementNode(
+		tag_name=node_data['tagName'],
+		xpath=node_data['xpath'],
+		pyne_selector=node_data['pyneSelector'],
+		attributes=node_data.get('attributes', {}),
+		children=[],
+		is_visible=node_data.get('isVisible', False),
+		is_interactive=node_data.get('isInteractive', False),
+		is_top_element=node_data.get('isTopElement', False),
+		highlight_index=node_data.get('highlightIndex'),
+		shadow_root=node_data.get('shadowRoot', False),
+		parent=parent,
+	)
+	element_node.children = [
+		child_node
+		for child in node_data.get('children', [])
+		if child is not None and (child_node := recursive_parse(child, element_node)) is not None
+	]
+	return element_node
+
+
+def recursive_selector_map(element_tree: DOMElementNode) -> SelectorMap:
+	selector_map = {}
+
+	def process_node(node: DOMBaseNode):
+		if isinstance(node, DOMElementNode):
+			if node.highlight_index is not None:
+				selector_map[node.highlight_index] = node
+			for child in node.children:
+				process_node(child)
+
+	process_node(element_tree)
+	return selector_map
+
+
+def test_single_pass_parse_matches_recursive_parse():
+	tree = make_tree(2_000)
+	old_tree = recursive_parse(tree)
+	old_map = recursive_selector_map(old_tree)  # type: ignore
+
+	new_tree, new_map = DomService(None)._build_dom_tree(tree)  # type: ignore
+
+	assert new_tree.clickable_elements_to_string() == old_tree.clickable_elements_to_string()  # type: ignore
+	assert [n.xpath for n in new_map.values()] == [n.xpath for n in old_map.values()]
+
+
+def test_deep_tree_is_truncated_instead_of_crashing():
+	tree = make_deep_tree(sys.getrecursionlimit() * 2)
+
+	element_tree, _ = DomService(None)._build_dom_tree(tree)  # type: ignore
+
+	depth, node = 0, element_tree
+	while node.children:
+		node = node.children[0]
+		depth += 1
+	assert depth < sys.getrecursionlimit()
+
+
+def best_time(parse, repeat: int = 3) -> float:
+	best = float('inf')
+	for _ in range(repeat):
+		start = time.perf_counter()
+		result = parse()
+		best = min(best, time.perf_counter() - start)
+		del result
+		gc.collect()
+	return best
+
+
+# run with: pytest browser_use/dom/tests/parse_benchmark_test.py -s -m slow
+@pytest.mark.slow
+# The single pass also hashes the elements and shares attribute dicts, which the old parse did not.
+# Small trees hardly trigger collections, the gain shows on large pages
+@pytest.mark.parametrize('n_nodes, max_ratio', [(10_000, 1.25), (100_000, 0.8), (500_000, 0.8)])
+def test_parse_benchmark(n_nodes: int, max_ratio: float):
+	tree = make_tree(n_nodes)
+
+	old = best_time(lambda: recursive_selector_map(recursive_parse(tree)))  # type: ignore
+	new = best_time(lambda: DomService(None)._build_dom_tree(tree))  # type: ignore
+
+	print(f'\n{n_nodes} nodes - recursive + selector map walk: {old:.3f}s, single pass: {new:.3f}s')
+	assert new < old * max_ratio
@@ -0,0 +1,79 @@
+from browser_use.browser.browser import Browser, BrowserConfig
+
+HTML = '<html><body>{}</body></html>'.format(
+	''.join(f'<button class="btn b{i}" onclick="this.textContent = \'clicked\'">Button {i}</button>' for i in range(10))
+)
+
+
+async def test_locate_element_through_registry():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+		state = await context.get_state()
+		button = state.selector_map[3]
+
+		# the selector built from the class attribute no longer matches, the registry still knows the element
+		await page.evaluate("document.querySelector('.b3').className = 'changed'")
+		handle = await context.get_locate_element(button)
+		assert handle is not None
+		assert await handle.text_content() == 'Button 3'
+
+		await context._click_element_node(button)
+		assert await page.evaluate("document.querySelectorAll('button')[3].textContent") == 'clicked'
+
+		# elements that are gone are not resolved from the registry
+		await page.evaluate("document.querySelectorAll('button')[3].remove()")
+		assert await context._get_registered_element(page, button) is None
+
+	await browser.close()
+
+
+async def test_element_cache_per_state():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+		await context.get_state()
+
+		handle = await context.get_element_by_index(2)
+		assert handle is not None
+		assert await context.get_element_by_index(2) is handle
+		assert not await context.is_file_uploader(await context.get_dom_element_by_index(2))  # type: ignore
+		assert context._element_cache.file_uploaders == {2: False}
+
+		# a new state starts a new cache
+		await context.get_state()
+		assert await context.get_element_by_index(2) is not handle
+
+		# so does a navigation
+		handle = await context.get_element_by_index(2)
+		await page.goto('about:blank')
+		assert context._element_cache.handles == {}
+
+	await browser.close()
+
+
+async def test_element_cache_survives_child_frame_navigation():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML + '<iframe srcdoc="<button>Framed</button>"></iframe>')
+		await page.wait_for_load_state()
+		await context.get_state()
+
+		handle = await context.get_element_by_index(2)
+		selector_map = context.session.cached_state.selector_map  # type: ignore
+		framed = next(i for i, node in selector_map.items() if node.frame is not None)
+		framed_handle = await context.get_element_by_index(framed)
+		assert framed_handle is not None
+
+		# an ad or widget frame that navigates keeps the handles of the main document
+		async with page.expect_event('framenavigated'):
+			await page.evaluate("document.querySelector('iframe').srcdoc = '<a href=\"#\">Other</a>'")
+		assert context._element_cache.handles == {2: handle}
+
+	await browser.close()
@@ -0,0 +1,41 @@
+import time
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.service import DomService
+
+# Button heavy page, every button needs the full XPath candidate search to get a unique selector
+HTML = '<html><body>{}</body></html>'.format(
+	''.join('<div class="card"><button class="btn">Buy</button></div>' for _ in range(300))
+)
+
+
+# run with: pytest browser_use/dom/tests/selector_test.py -s
+async def test_pyne_selectors_on_demand():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+
+		dom_service = DomService(page)
+		start = time.perf_counter()
+		state = await dom_service.get_clickable_elements(incremental=False)
+		print(f'\nextraction: {(time.perf_counter() - start) * 1000:.1f}ms')
+
+		# nothing is generated during extraction
+		assert all(not node.pyne_selector for node in state.selector_map.values())
+
+		index = next(iter(state.selector_map))
+		selectors = await dom_service.get_pyne_selectors([index, 10**6])
+		assert list(selectors) == [index]
+		assert state.selector_map[index].pyne_selector == selectors[index]
+
+		# the selector points to the element
+		tag = await page.evaluate(
+			'(xpath) => document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null)'
+			'.singleNodeValue?.tagName.toLowerCase()',
+			selectors[index],
+		)
+		assert tag == state.selector_map[index].tag_name
+
+	await browser.close()
@@ -0,0 +1,132 @@
+import random
+import time
+from typing import Optional
+
+import pytest
+
+from browser_use.dom.views import DOMBaseNode, DOMElementNode, DOMTextNode
+
+INCLUDE_ATTRIBUTES = ['title', 'type', 'aria-label']
+
+
+def make_tree(
+	n_nodes: int, seed: int = 0, max_depth: int = 60, chain: float = 0.7, highlight_ratio: float = 0.3
+) -> DOMElementNode:
+	"""Random tree with nested highlighted elements, text nodes at every level and deep chains."""
+	rng = random.Random(seed)
+	root = DOMElementNode(
+		tag_name='body', xpath='body', pyne_selector='', attributes={}, children=[], is_visible=True, parent=None
+	)
+	elements = [(root, 0)]
+	highlight_index = 0
+	for i in range(n_nodes):
+		parent, depth = elements[-1] if rng.random() < chain else rng.choice(elements)
+		if depth >= max_depth:
+			parent, depth = rng.choice(elements[: len(elements) // 2 + 1])
+		if rng.random() < 0.35:
+			parent.children.append(DOMTextNode(text=f' text {i} ', is_visible=True, parent=parent))
+			continue
+		node = DOMElementNode(
+			tag_name=rng.choice(['div', 'a', 'button', 'span']),
+			xpath=f'div[{i}]',
+			pyne_selector='',
+			attributes={rng.choice(['title', 'type', 'class', 'aria-label']): f'v{i}'},
+			children=[],
+			is_visible=True,
+			parent=parent,
+		)
+		if rng.random() < highlight_ratio:
+			node.highlight_index = highlight_index
+			highlight_index += 1
+		parent.children.append(node)
+		elements.append((node, depth + 1))
+	return root
+
+
+# Previous implementation: re-walks the subtree of every highlighted element and the
+# ancestors of every text node
+def reference_text(element: DOMElementNode) -> str:
+	text_parts = []
+
+	def collect_text(node: DOMBaseNode) -> None:
+		if isinstance(node, DOMElementNode) and node is not element and node.highlight_index is not None:
+			return
+		if isinstance(node, DOMTextNode):
+			text_parts.append(node.text)
+		elif isinstance(node, DOMElementNode):
+			for child in node.children:
+				collect_text(child)
+
+	collect_text(element)
+	return '\n'.join(text_parts).strip()
+
+
+def reference_clickable_elements_to_string(root: DOMElementNode, include_attributes: list[str] = []) -> str:
+	formatted_text = []
+
+	def process_node(node: DOMBaseNode) -> None:
+		if isinstance(node, DOMElementNode):
+			if node.highlight_index is not None:
+				attributes_str = ''
+				if include_attributes:
+					attributes_str = ' ' + ' '.join(
+						f'{key}="{value}"' for key, value in node.attributes.items() if key in include_attributes
+					)
+				formatted_text.append(
+					f'{node.highlight_index}[:]<{node.tag_name}{attributes_str}>{reference_text(node)}</{node.tag_name}>'
+				)
+			for child in node.children:
+				process_node(child)
+		elif isinstance(node, DOMTextNode):
+			if not node.has_parent_with_highlight_index():
+				formatted_text.append(f'_[:]{node.text}')
+
+	process_node(root)
+	return '\n'.join(formatted_text)
+
+
+def first_highlighted(node: DOMElementNode) -> Optional[DOMElementNode]:
+	stack = [node]
+	while stack:
+		current = stack.pop()
+		if current.highlight_index is not None and current.children:
+			return current
+		stack.extend(c for c in current.children if isinstance(c, DOMElementNode))
+	return None
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_serializer_matches_reference(seed: int):
+	tree = make_tree(500, seed=seed)
+
+	assert tree.clickable_elements_to_string() == reference_clickable_elements_to_string(tree)
+	assert tree.clickable_elements_to_string(INCLUDE_ATTRIBUTES) == reference_clickable_elements_to_string(
+		tree, INCLUDE_ATTRIBUTES
+	)
+
+	# subtrees below a highlighted element do not list their text separately
+	subtree = first_highlighted(tree)
+	assert subtree is not None
+	for child in subtree.children:
+		if isinstance(child, DOMElementNode):
+			assert child.clickable_elements_to_string() == reference_clickable_elements_to_string(child)
+			assert child.get_all_text_till_next_clickable_element() == reference_text(child)
+
+
+# run with: pytest browser_use/dom/tests/serializer_test.py -s -m slow
+@pytest.mark.slow
+@pytest.mark.parametrize('n_nodes', [10_000, 50_000])
+def test_serializer_benchmark(n_nodes: int):
+	# deep chains with few highlighted elements are the worst case for the per node walks
+	tree = make_tree(n_nodes, max_depth=400, chain=0.98, highlight_ratio=0.01)
+
+	start = time.perf_counter()
+	expected = reference_clickable_elements_to_string(tree, INCLUDE_ATTRIBUTES)
+	old = time.perf_counter() - start
+
+	start = time.perf_counter()
+	result = tree.clickable_elements_to_string(INCLUDE_ATTRIBUTES)
+	new = time.perf_counter() - start
+
+	assert result == expected
+	print(f'\n{n_nodes} nodes - per element re-walks: {old:.3f}s, single pass: {new:.3f}s')
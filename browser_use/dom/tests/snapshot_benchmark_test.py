@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.service import DomService
+
+N_RUNS = 5
+
+
+# run with: pytest browser_use/dom/tests/snapshot_benchmark_test.py -s
+@pytest.mark.parametrize('n_rows', [100, 1_000, 5_000])
+async def test_snapshot_backend_benchmark(rows_page, n_rows: int):
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(rows_page(n_rows))
+
+		timings = {}
+		states = {}
+		for backend in ('js', 'cdp'):
+			dom_service = DomService(page, backend=backend)
+			start = time.perf_counter()
+			for _ in range(N_RUNS):
+				states[backend] = await dom_service.get_clickable_elements(
+					highlight_elements=False, incremental=False
+				)
+			timings[backend] = (time.perf_counter() - start) / N_RUNS
+
+		print(
+			f'\n{n_rows} rows - js: {timings["js"] * 1000:.1f}ms, cdp: {timings["cdp"] * 1000:.1f}ms, '
+			f'speedup: {timings["js"] / timings["cdp"]:.1f}x'
+		)
+
+		# both backends find the same elements on the fixture page
+		js_elements = [(node.tag_name, node.xpath) for node in states['js'].selector_map.values()]
+		cdp_elements = [(node.tag_name, node.xpath) for node in states['cdp'].selector_map.values()]
+		assert js_elements == cdp_elements
+
+	await browser.close()
@@ -0,0 +1,170 @@
+from typing import Optional
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.history_tree_processor.service import HistoryTreeProcessor
+from browser_use.dom.service import DomService
+from browser_use.dom.snapshot import SNAPSHOT_COMPUTED_STYLES, Viewport, parse_dom_snapshot
+from browser_use.dom.views import DOMElementNode, DOMTextNode
+
+VIEWPORT = Viewport(scroll_x=0, scroll_y=0, width=800, height=600)
+
+
+def el(tag: str, bounds: Optional[list[float]] = None, children: list = [], styles: dict = {}, **attributes):
+	return {'tag': tag, 'bounds': bounds, 'children': children, 'styles': styles, 'attributes': attributes}
+
+
+def text(value: str, bounds: Optional[list[float]] = None):
+	return {'text': value, 'bounds': bounds}
+
+
+def make_snapshot(body_children: list) -> dict:
+	"""Minimal DOMSnapshot.captureSnapshot result, paint order follows document order"""
+	strings: list[str] = []
+
+	def string(value: str) -> int:
+		if value not in strings:
+			strings.append(value)
+		return strings.index(value)
+
+	nodes = {
+		'parentIndex': [],
+		'nodeType': [],
+		'nodeName': [],
+		'nodeValue': [],
+		'backendNodeId': [],
+		'attributes': [],
+	}
+	layout = {'nodeIndex': [], 'styles': [], 'bounds': [], 'paintOrders': []}
+
+	def add(spec: dict, parent: int) -> None:
+		i = len(nodes['parentIndex'])
+		nodes['parentIndex'].append(parent)
+		nodes['backendNodeId'].append(100 + i)
+		if 'text' in spec:
+			nodes['nodeType'].append(3)
+			nodes['nodeName'].append(string('#text'))
+			nodes['nodeValue'].append(string(spec['text']))
+			nodes['attributes'].append([])
+		else:
+			nodes['nodeType'].append(1)
+			nodes['nodeName'].append(string(spec['tag'].upper()))
+			nodes['nodeValue'].append(-1)
+			nodes['attributes'].append(
+				[string(part) for name, value in spec['attributes'].items() for part in (name, value)]
+			)
+		if spec['bounds'] is not None:
+			styles = {'display': 'block', 'visibility': 'visible', 'opacity': '1', 'pointer-events': 'auto'}
+			styles.update(spec.get('styles', {}))
+			layout['nodeIndex'].append(i)
+			layout['styles'].append([string(styles[name]) for name in SNAPSHOT_COMPUTED_STYLES])
+			layout['bounds'].append(spec['bounds'])
+			layout['paintOrders'].append(len(layout['paintOrders']))
+		for child in spec.get('children', []):
+			add(child, i)
+
+	nodes['parentIndex'].append(-1)
+	nodes['nodeType'].append(9)
+	nodes['nodeName'].append(string('#document'))
+	nodes['nodeValue'].append(-1)
+	nodes['backendNodeId'].append(1)
+	nodes['attributes'].append([])
+	add(el('html', [0, 0, 800, 600], [el('body', [0, 0, 800, 600], body_children)]), 0)
+
+	return {'documents': [{'nodes': nodes, 'layout': layout}], 'strings': strings}
+
+
+def test_snapshot_elements():
+	snapshot = make_snapshot(
+		[
+			el('div', [0, 0, 800, 50], [text('  Title  ', [10, 10, 100, 20])]),
+			el('div', [0, 50, 800, 50], [el('button', [10, 60, 100, 30], [text('Buy', [20, 65, 30, 20])])]),
+			el('svg', [0, 100, 20, 20], [el('a', [0, 100, 20, 20], href='#')]),
+			el('a', [0, 200, 100, 20], styles={'visibility': 'hidden'}, href='#hidden'),
+			el('span', [0, 300, 100, 20], onclick='go()'),
+		]
+	)
+	result = parse_dom_snapshot(snapshot, VIEWPORT)
+	assert result is not None
+
+	body = result.element_tree
+	assert body.tag_name == 'body'
+	assert [child.tag_name for child in body.children if isinstance(child, DOMElementNode)] == [
+		'div',
+		'div',
+		'a',
+		'span',
+	]
+	title = body.children[0].children[0]  # type: ignore
+	assert isinstance(title, DOMTextNode) and title.text == 'Title'
+
+	assert [node.tag_name for node in result.selector_map.values()] == ['button', 'span']
+	button = result.selector_map[0]
+	assert button.xpath == 'html/body/div[2]/button'
+	assert button.parent is body.children[1]
+	assert result.backend_node_ids == [106, 111]
+	# branch path hashes are computed while converting, equal to the walked ones
+	assert button._branch_path_hash == HistoryTreeProcessor._parent_branch_path_hash(['div', 'button'])
+
+
+def test_snapshot_covered_element_is_not_top():
+	snapshot = make_snapshot(
+		[
+			el('button', [10, 10, 100, 30]),
+			# painted later over the button
+			el('div', [0, 0, 800, 600]),
+			el('button', [10, 100, 100, 30], styles={'pointer-events': 'none'}),
+		]
+	)
+	result = parse_dom_snapshot(snapshot, VIEWPORT)
+	assert result is not None
+	assert result.selector_map == {}
+
+
+def test_snapshot_viewport_expansion():
+	snapshot = make_snapshot(
+		[
+			el('button', [10, 10, 100, 30]),
+			el('div', [0, 2000, 800, 100], [el('button', [10, 2010, 100, 30]), el('a', [10, 2050, 100, 30])]),
+		]
+	)
+	result = parse_dom_snapshot(snapshot, VIEWPORT, viewport_expansion=100)
+	assert result is not None
+	assert len(result.selector_map) == 1
+	assert (result.elements_above, result.elements_below) == (0, 2)
+
+
+async def test_snapshot_backend_reuses_resolved_elements():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(''.join(f'<button>B{i}</button>' for i in range(20)))
+
+		dom_service = DomService(page, backend='cdp')
+		cdp = await dom_service.get_cdp_session()
+		send = cdp.send
+		calls: list[str] = []
+
+		async def counting_send(method: str, params=None):
+			calls.append(method)
+			return await send(method, params)
+
+		cdp.send = counting_send  # type: ignore
+
+		first = await dom_service.get_clickable_elements(highlight_elements=False)
+		assert calls.count('DOM.resolveNode') == 20
+
+		# the elements are still there, none of them is resolved again
+		calls.clear()
+		await page.evaluate("document.body.insertAdjacentHTML('beforeend', '<button>New</button>')")
+		second = await dom_service.get_clickable_elements(highlight_elements=False)
+		assert calls.count('DOM.resolveNode') == 1
+		assert len(second.selector_map) == len(first.selector_map) + 1
+
+		# a new document invalidates the objects, the registry is rebuilt from fresh ones
+		await page.set_content('<html><body><button>Other</button></body></html>')
+		third = await dom_service.get_clickable_elements(highlight_elements=False)
+		assert len(third.selector_map) == 1
+		assert await page.evaluate('() => window.__browserUse.elementAt(0)?.textContent') == 'Other'
+
+	await browser.close()
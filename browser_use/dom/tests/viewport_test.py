@@ -0,0 +1,35 @@
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.dom.service import DomService
+
+# 100 rows of 100px, the viewport shows the first few of them
+HTML = '<html><body style="margin: 0">{}</body></html>'.format(
+	''.join(
+		f'<div style="height: 100px"><button>Row {i}</button></div>' for i in range(100)
+	)
+)
+
+
+async def test_viewport_scoped_extraction():
+	browser = Browser(config=BrowserConfig(headless=True))
+
+	async with await browser.new_context() as context:
+		page = await context.get_current_page()
+		await page.set_content(HTML)
+
+		full = await DomService(page).get_clickable_elements(incremental=False)
+		assert len(full.selector_map) == 100
+		assert full.elements_above == 0 and full.elements_below == 0
+
+		dom_service = DomService(page, viewport_expansion=0)
+		top = await dom_service.get_clickable_elements(incremental=False)
+		assert 0 < len(top.selector_map) < 100
+		assert top.elements_above == 0
+		assert len(top.selector_map) + top.elements_below == 100
+
+		# scrolling pages through the document
+		await page.evaluate('() => window.scrollTo(0, 5000)')
+		middle = await dom_service.get_clickable_elements()
+		assert middle.elements_above > 0 and middle.elements_below > 0
+		assert middle.elements_above + len(middle.selector_map) + middle.elements_below == 100
+
+	await browser.close()
@@ -1,22 +1,26 @@
-from dataclasses import dataclass
-from functools import cached_property
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Dict, List, Optional
 
 from browser_use.dom.history_tree_processor.view import HashedDomElement
 
 # Avoid circular import issues
 if TYPE_CHECKING:
+	from playwright.async_api import Frame
+
 	from .views import DOMElementNode
 
 
-@dataclass(frozen=False)
+# Nodes are slotted: a page produces tens of thousands of them per step and histories keep them alive.
+# DomService interns tag names / attribute names and shares identical attribute dicts between nodes,
+# so `attributes` must be treated as read-only (replace the dict instead of mutating it).
+@dataclass(frozen=False, slots=True)
 class DOMBaseNode:
 	is_visible: bool
 	# Use None as default and set parent later to avoid circular reference issues
 	parent: Optional['DOMElementNode']
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, slots=True)
 class DOMTextNode(DOMBaseNode):
 	text: str
 	type: str = 'TEXT_NODE'
@@ -30,7 +34,7 @@ class DOMTextNode(DOMBaseNode):
 		return False
 
 
-@dataclass(frozen=False)
+@dataclass(frozen=False, slots=True)
 class DOMElementNode(DOMBaseNode):
 	"""
 	xpath: the xpath of the element from the last root node (shadow root or iframe OR document if no shadow root or iframe).
@@ -46,6 +50,15 @@ class DOMElementNode(DOMBaseNode):
 	is_top_element: bool = False
 	shadow_root: bool = False
 	highlight_index: Optional[int] = None
+	# Child frame the element was extracted from, None for the main frame
+	frame: Optional['Frame'] = field(default=None, repr=False, compare=False)
+	_hash: Optional[HashedDomElement] = field(default=None, init=False, repr=False, compare=False)
+	# Rolling hash of the tag path, set by DomService while parsing (see HistoryTreeProcessor)
+	_branch_path_hash: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+	# Tag path and attributes in the page of elements listed away from their place in the DOM
+	# (ax backend), histories record these so they replay with any backend
+	_page_branch_path: Optional[List[str]] = field(default=None, init=False, repr=False, compare=False)
+	_page_attributes: Optional[Dict[str, str]] = field(default=None, init=False, repr=False, compare=False)
 
 	def __repr__(self) -> str:
 		tag_str = f'<{self.tag_name}'
@@ -71,65 +84,88 @@ class DOMElementNode(DOMBaseNode):
 
 		return tag_str
 
-	@cached_property
+	@property
 	def hash(self) -> HashedDomElement:
-		from browser_use.dom.history_tree_processor.service import (
-			HistoryTreeProcessor,
-		)
+		"""Computed once per node, reset `_hash` to None when the attributes change."""
+		if self._hash is None:
+			from browser_use.dom.history_tree_processor.service import (
+				HistoryTreeProcessor,
+			)
 
-		return HistoryTreeProcessor._hash_dom_element(self)
+			self._hash = HistoryTreeProcessor._hash_dom_element(self)
+		return self._hash
 
 	def get_all_text_till_next_clickable_element(self) -> str:
 		text_parts = []
 
-		def collect_text(node: DOMBaseNode) -> None:
-			# Skip this branch if we hit a highlighted element (except for the current node)
-			if (
-				isinstance(node, DOMElementNode)
-				and node != self
-				and node.highlight_index is not None
-			):
-				return
-
+		stack: list[DOMBaseNode] = [self]
+		while stack:
+			node = stack.pop()
 			if isinstance(node, DOMTextNode):
 				text_parts.append(node.text)
 			elif isinstance(node, DOMElementNode):
-				for child in node.children:
-					collect_text(child)
+				# Skip this branch if we hit a highlighted element (except for the current node)
+				if node is not self and node.highlight_index is not None:
+					continue
+				stack.extend(reversed(node.children))
 
-		collect_text(self)
 		return '\n'.join(text_parts).strip()
 
 	def clickable_elements_to_string(self, include_attributes: list[str] = []) -> str:
-		"""Convert the processed DOM content to HTML."""
-		formatted_text = []
-
-		def process_node(node: DOMBaseNode, depth: int) -> None:
-			if isinstance(node, DOMElementNode):
-				# Add element with highlight_index
-				if node.highlight_index is not None:
-					attributes_str = ''
-					if include_attributes:
-						attributes_str = ' ' + ' '.join(
-							f'{key}="{value}"'
-							for key, value in node.attributes.items()
-							if key in include_attributes
-						)
-					formatted_text.append(
-						f'{node.highlight_index}[:]<{node.tag_name}{attributes_str}>{node.get_all_text_till_next_clickable_element()}</{node.tag_name}>'
-					)
-
-				# Process children regardless
-				for child in node.children:
-					process_node(child, depth + 1)
+		"""Convert the processed DOM content to HTML.
+
+		Single pass over the tree: every text node is added to the text of its innermost
+		highlighted ancestor, highlighted lines are joined once their subtree has been walked.
+		"""
+		# str for plain text lines, (start tag, text parts, end tag) for highlighted elements
+		formatted_text: list[str | tuple[str, list[str], str]] = []
+
+		# Text is only listed if no ancestor is highlighted, including the ancestors of self
+		inside_highlighted = False
+		ancestor = self.parent
+		while ancestor is not None and not inside_highlighted:
+			inside_highlighted = ancestor.highlight_index is not None
+			ancestor = ancestor.parent
+
+		# (node, text parts of the innermost highlighted ancestor, inside a highlighted element)
+		stack: list[tuple[DOMBaseNode, Optional[list[str]], bool]] = [(self, None, inside_highlighted)]
+		while stack:
+			node, text_parts, inside_highlighted = stack.pop()
 
-			elif isinstance(node, DOMTextNode):
+			if isinstance(node, DOMTextNode):
+				if text_parts is not None:
+					text_parts.append(node.text)
 				# Add text only if it doesn't have a highlighted parent
-				if not node.has_parent_with_highlight_index():
+				if not inside_highlighted:
 					formatted_text.append(f'_[:]{node.text}')
-
-		process_node(self, 0)
-		return '\n'.join(formatted_text)
+				continue
+
+			if not isinstance(node, DOMElementNode):
+				continue
+
+			# Add element with highlight_index
+			if node.highlight_index is not None:
+				attributes_str = ''
+				if include_attributes:
+					attributes_str = ' ' + ' '.join(
+						f'{key}="{value}"'
+						for key, value in node.attributes.items()
+						if key in include_attributes
+					)
+				text_parts = []
+				inside_highlighted = True
+				formatted_text.append(
+					(f'{node.highlight_index}[:]<{node.tag_name}{attributes_str}>', text_parts, f'</{node.tag_name}>')
+				)
+
+			# Process children regardless
+			for child in reversed(node.children):
+				stack.append((child, text_parts, inside_highlighted))
+
+		return '\n'.join(
+			line if isinstance(line, str) else line[0] + '\n'.join(line[1]).strip() + line[2]
+			for line in formatted_text
+		)
 
 	def get_file_upload_element(self, check_siblings: bool = True) -> Optional['DOMElementNode']:
 		# Check if current element is a file input
@@ -184,3 +220,21 @@ SelectorMap = dict[int, DOMElementNode]
 class DOMState:
 	element_tree: DOMElementNode
 	selector_map: SelectorMap
+	# Interactive elements outside of the extracted viewport range, see DomService viewport_expansion
+	elements_above: int = field(default=0, kw_only=True)
+	elements_below: int = field(default=0, kw_only=True)
+	_hash_index: Optional[Dict[HashedDomElement, DOMElementNode]] = field(
+		default=None, init=False, repr=False, compare=False
+	)
+
+	def get_element_by_hash(self, hashed: HashedDomElement) -> Optional[DOMElementNode]:
+		"""
+		Highlighted element with this hash, the first one in document order if several match.
+		The index is built on first use; set `_hash_index` to None when nodes change.
+		"""
+		if self._hash_index is None:
+			index: Dict[HashedDomElement, DOMElementNode] = {}
+			for node in self.selector_map.values():
+				index.setdefault(node.hash, node)
+			self._hash_index = index
+		return self._hash_index.get(hashed)